@@ -0,0 +1,87 @@
+"""
+Cold start benchmark for the Lambda handlers.
+
+Every sample imports one handler's app.py in a fresh interpreter, the way a new Lambda
+container does, with the utils layer on the path, and records the import time and the
+resident memory of the process afterwards.
+
+Usage:
+    python benchmarks/cold_start.py [--repeat 5] [--json results.json] [handler ...]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def template_handlers() -> list:
+    """ Returns the CodeUri directory of every function in template.yaml """
+    with open(os.path.join(ROOT_DIR, "template.yaml")) as template:
+        return sorted(re.findall(r"^\s+CodeUri:\s*(\w+)/?\s*$", template.read(), re.MULTILINE))
+
+
+HANDLERS = template_handlers()
+
+# runs inside the child interpreter
+_PROBE = """
+import json, resource, sys, time
+baseline_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+import app
+import_ms = (time.perf_counter() - start) * 1000
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"import_ms": import_ms, "rss_mb": rss_kb / 1024, "import_rss_mb": (rss_kb - baseline_rss_kb) / 1024}))
+"""
+
+
+def measure(handler: str) -> dict:
+    handler_dir = os.path.join(ROOT_DIR, handler)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([handler_dir, os.path.join(ROOT_DIR, "utils_layer")])
+    # the layer reads these at import time; no AWS or API call is made by importing
+    env.setdefault("AWS_DEFAULT_REGION", "us-west-1")
+    env.setdefault("YouTubeApiKey", "benchmark")
+    env.setdefault("OpenAIKey", "benchmark")
+
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=handler_dir, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {handler}/app.py failed:\n{result.stderr}")
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("handlers", nargs="*", default=HANDLERS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'handler':<18}{'import ms (median)':>20}{'import ms (max)':>18}{'rss MB':>10}{'import MB':>12}")
+    for handler in args.handlers:
+        samples = [measure(handler) for _ in range(args.repeat)]
+        import_ms = [sample["import_ms"] for sample in samples]
+        results[handler] = {
+            "import_ms_median": statistics.median(import_ms),
+            "import_ms_max": max(import_ms),
+            "rss_mb": statistics.median(sample["rss_mb"] for sample in samples),
+            "import_rss_mb": statistics.median(sample["import_rss_mb"] for sample in samples),
+            "samples": args.repeat,
+        }
+        row = results[handler]
+        print(f"{handler:<18}{row['import_ms_median']:>20.1f}{row['import_ms_max']:>18.1f}{row['rss_mb']:>10.1f}{row['import_rss_mb']:>12.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as output:
+            json.dump({"python": sys.version.split()[0], "handlers": results}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Validations per second for the /collect request check: the validators compiled once from
+collect/data_types.yaml (focus_utils.schema) against the per-request YAML load and scan
+collect/app.py used before.
+
+Usage:
+    python benchmarks/collect_validation.py [--number 20000]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import yaml # type: ignore
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT_DIR, "utils_layer"))
+
+from focus_utils.schema import compile_data_types
+
+DATA_TYPES_PATH = os.path.join(ROOT_DIR, "collect", "data_types.yaml")
+BODY = {
+    "prolificId": "participant-1",
+    "timestamp": "2025-06-01T12:00:00.000Z",
+    "stage": 1,
+    "type": "post_stage_rating_survey",
+}
+
+
+def legacy_validate(body):
+    """ The check as it was in collect/app.py (returns the first error, or None) """
+    with open(DATA_TYPES_PATH) as stream:
+        valid_data_types = yaml.safe_load(stream)['data_types']
+    valid_data_type_values_map = {'string': str, 'int': int, 'float': float, 'bool': bool}
+    valid_data_type_values_map.update({k + "?": v for k, v in valid_data_type_values_map.items()})
+
+    for key, values in valid_data_types.items():
+        if key == body["type"]:
+            for val, val_type in values.items():
+                if val not in body.keys() and val_type[-1] != "?":
+                    return f"Missing the value: {val}"
+                if val in body.keys() and not isinstance(body[val], valid_data_type_values_map[val_type]):
+                    return f"Invalid value type for value: {val}. Should be {val_type}"
+            return None
+    return f"The data type key, {body['type']}, is not a valid data type"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    with open(DATA_TYPES_PATH) as stream:
+        validators = compile_data_types(yaml.safe_load(stream)['data_types'])
+
+    def compiled_validate(body):
+        return validators[body["type"]].validate(body)
+
+    legacy_number = max(1, args.number // 100)
+    for name, fn, number in (("legacy", legacy_validate, legacy_number), ("compiled", compiled_validate, args.number)):
+        seconds = min(timeit.repeat(lambda: fn(BODY), number=number, repeat=5))
+        print(f"{name:<9} {number / seconds:12,.0f} validations/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Micro-benchmarks of the CPU-bound focus_utils code that runs on every request, with JSON
+baselines to compare against.
+
+The inputs are built from the sample API Gateway events in events/ (categorize.json,
+collect.json); the video category lookup is stubbed with the bundled snapshot.
+
+Usage:
+    python benchmarks/hot_paths.py run [--repeat 7] [--json results.json] [benchmark ...]
+    python benchmarks/hot_paths.py run --save             # write benchmarks/baselines/hot_paths.json
+    python benchmarks/hot_paths.py compare [--baseline benchmarks/baselines/hot_paths.json]
+        [--threshold 0.25] [results.json]
+
+Each benchmark is timed alternately with calibration_loop, a fixed mix of the dict, string and
+list work the cases do, and stored relative to it ("relative": µs per call / calibration µs
+per call). compare runs the suite (or reads results.json) and exits with status 1 when a
+benchmark's relative time is more than threshold above the baseline's, so a baseline recorded
+on a faster or slower host still compares; the absolute µs are kept for reading only.
+
+To regenerate benchmarks/baselines/hot_paths.json (after an intended change in speed, or when a
+benchmark is added), run `python benchmarks/hot_paths.py run --save` on an otherwise idle
+machine and commit the file.
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+
+import yaml # type: ignore
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT_DIR, "utils_layer"))
+
+# the layer reads these at import time; no AWS or API call is made
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-west-1")
+os.environ.setdefault("YouTubeApiKey", "benchmark")
+os.environ.setdefault("OpenAIKey", "benchmark")
+
+from focus_utils import youtube
+from focus_utils.common import generate_stage_schedule, generate_weekly_stage_start_times
+from focus_utils.preprocess import expand_intent_node_record, flatten_dict, parse_video_entry_to_record, preprocess_video_json_entry
+from focus_utils.prompt import build_prompt
+from focus_utils.schema import compile_data_types
+from focus_utils.stage import get_current_study_stage, is_study_over, locate_in_schedule
+
+BASELINE_PATH = os.path.join(ROOT_DIR, "benchmarks", "baselines", "hot_paths.json")
+EVENTS_DIR = os.path.join(ROOT_DIR, "events")
+DATA_TYPES_PATH = os.path.join(ROOT_DIR, "collect", "data_types.yaml")
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_REPEAT = 7
+
+# what fetch_youtube_data and the previous entries add to the request before preprocessing
+YOUTUBE_API_DATA = {
+    "id": "abc123",
+    "etag": "etag-1",
+    "snippet": {
+        "title": "Complete JavaScript Course for Beginners",
+        "description": "Learn everything from variables and functions to DOM manipulation and async code. " * 4,
+        "channelTitle": "Code Academy",
+        "categoryId": "27",
+    },
+    "statistics": {"viewCount": "1000", "likeCount": "50"},
+}
+PREVIOUS_ENTRIES = {
+    "focusMode_1": True, "categoryId_1": "27",
+    "focusMode_2": False, "categoryId_2": "20",
+    "focusMode_3": None, "categoryId_3": None,
+}
+FOCUS_CATEGORIES = ["Education", "Science and Technology"]
+STAGE_ORDER = [3, 1, 4, 2]
+
+
+def load_event_body(name: str) -> dict:
+    with open(os.path.join(EVENTS_DIR, f"{name}.json")) as event:
+        return json.loads(json.load(event)["body"])
+
+
+def stub_video_categories():
+    """ Serves the category lookup from the bundled snapshot instead of the YouTube API """
+    categories = youtube.load_video_category_snapshot()
+    # preprocess_video_json_entry looks the categories up through the module
+    youtube.get_cached_video_categories = lambda: categories
+
+
+def make_cases() -> dict:
+    """ {benchmark name: zero-argument callable}; the category lookup must be stubbed first """
+    categorize_body = load_event_body("categorize")
+    categorize_body["newPreferenceData"].update(copy.deepcopy(PREVIOUS_ENTRIES), youTubeApiData=copy.deepcopy(YOUTUBE_API_DATA))
+    row = preprocess_video_json_entry(categorize_body)
+    row["focus_categories"] = FOCUS_CATEGORIES
+    record = parse_video_entry_to_record(categorize_body)
+
+    start = "2025-06-01T09:00:00"
+    stage_start_times = generate_weekly_stage_start_times(start, STAGE_ORDER)
+    stage_schedule = generate_stage_schedule(start, STAGE_ORDER)
+    last_active = "2025-06-17T12:30:00"
+
+    with open(DATA_TYPES_PATH) as stream:
+        validators = compile_data_types(yaml.safe_load(stream)["data_types"])
+    collect_body = load_event_body("collect")
+    validator = validators[collect_body["type"]]
+
+    cases = {
+        "build_prompt": lambda: build_prompt(row),
+        "preprocess_video_json_entry": lambda: preprocess_video_json_entry(categorize_body),
+        "flatten_dict": lambda: flatten_dict(categorize_body["newPreferenceData"]),
+        "expand_intent_node_record": lambda: expand_intent_node_record(record),
+        "get_current_study_stage": lambda: get_current_study_stage(stage_start_times, last_active),
+        "is_study_over": lambda: is_study_over(stage_start_times, STAGE_ORDER, last_active),
+        # what compute_stage_transition does instead of the two above
+        "locate_in_schedule": lambda: locate_in_schedule(stage_schedule, STAGE_ORDER, last_active),
+        "collect_validation": lambda: validator.validate(collect_body),
+    }
+
+    # the DataFrame version is only used by the offline helpers, and only when pandas is installed
+    try:
+        import pandas # type: ignore # noqa: F401
+        from focus_utils.preprocess import expand_intent_node, parse_video_entry_to_df
+        frame = parse_video_entry_to_df(categorize_body)
+        cases["expand_intent_node"] = lambda: expand_intent_node(frame)
+    except ImportError:
+        pass
+    return cases
+
+
+def calibration_loop():
+    """ The unit the benchmarks are measured in: plain dict, string and list work, no focus_utils code """
+    record = {}
+    for i in range(200):
+        key = f"field_{i % 20}"
+        record[key] = record.get(key, "") + str(i)
+    return sorted(record.items())
+
+
+def measure(fn, repeat: int) -> dict:
+    """ Runs fn and calibration_loop in turns, so each pair sees the same host load, and takes the
+    median ratio of the pairs; each run is sized to take at least 0.2s """
+    timer, calibration_timer = timeit.Timer(fn), timeit.Timer(calibration_loop)
+    number, _ = timer.autorange()
+    calibration_number, _ = calibration_timer.autorange()
+    seconds, calibration_seconds = [], []
+    for _ in range(repeat):
+        seconds.append(timer.timeit(number) / number)
+        calibration_seconds.append(calibration_timer.timeit(calibration_number) / calibration_number)
+    return {
+        "us_per_call": min(seconds) * 1e6,
+        "calibration_us_per_call": min(calibration_seconds) * 1e6,
+        "relative": statistics.median(case / calibration for case, calibration in zip(seconds, calibration_seconds)),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run(names: list = None, repeat: int = DEFAULT_REPEAT) -> dict:
+    stub_video_categories()
+    cases = make_cases()
+    unknown = set(names or []) - set(cases)
+    if unknown:
+        raise SystemExit(f"unknown benchmarks: {', '.join(sorted(unknown))} (available: {', '.join(cases)})")
+
+    results = {}
+    for name in names or cases:
+        results[name] = measure(cases[name], repeat)
+        print(f"{name:<30}{results[name]['us_per_call']:>12.2f} µs per call{results[name]['relative']:>10.3f} x calibration")
+    return {
+        "python": sys.version.split()[0],
+        "machine": f"{platform.system()} {platform.machine()} {platform.processor()}".strip(),
+        "calibration_us_per_call": min(result["calibration_us_per_call"] for result in results.values()),
+        "benchmarks": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """ Prints the change of every benchmark's relative time; returns the names that regressed by more than threshold """
+    if "calibration_us_per_call" not in baseline:
+        raise SystemExit("the baseline has no calibration (recorded by an older version), regenerate it with `run --save`")
+    if baseline.get("python") != current.get("python"):
+        print(f"warning: baseline is from Python {baseline.get('python')}, this run is Python {current.get('python')}")
+
+    regressions = []
+    print(f"{'benchmark':<30}{'baseline x':>14}{'current x':>14}{'change':>10}")
+    for name, result in current["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            print(f"{name:<30}{'-':>14}{result['relative']:>14.3f}{'new':>10}")
+            continue
+        before = baseline["benchmarks"][name]["relative"]
+        change = result["relative"] / before - 1
+        regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<30}{before:>14.3f}{result['relative']:>14.3f}{change:>+10.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("benchmarks", nargs="*")
+    run_parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    run_parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    run_parser.add_argument("--save", action="store_true", help=f"write the results as the baseline ({os.path.relpath(BASELINE_PATH, ROOT_DIR)})")
+
+    compare_parser = commands.add_parser("compare", help="fail when a benchmark regressed against the baseline")
+    compare_parser.add_argument("results", nargs="?", help="results of an earlier run (default: run the suite now)")
+    compare_parser.add_argument("--baseline", default=BASELINE_PATH)
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown, 0.25 = 25%% (default)")
+    compare_parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = run(args.benchmarks, args.repeat)
+        for path in filter(None, (args.json_path, BASELINE_PATH if args.save else None)):
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w") as output:
+                json.dump(results, output, indent=2)
+                output.write("\n")
+        return
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    if args.results:
+        with open(args.results) as results_file:
+            current = json.load(results_file)
+    else:
+        current = run(None, args.repeat)
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
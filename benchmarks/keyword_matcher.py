@@ -0,0 +1,53 @@
+"""
+Micro-benchmark of the focus keyword lookup: the precompiled token trie (focus_utils.keywords)
+against the per-keyword list scan build_prompt used before.
+
+Usage:
+    python benchmarks/keyword_matcher.py [--number 2000]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils_layer"))
+
+from focus_utils.keywords import get_keyword_matcher
+from focus_utils.prompt import CATEGORY_KEYWORDS
+
+FOCUS_CATEGORIES = ["Education", "Science and Technology", "Music", "Howto & Style"]
+TITLE = "Complete Machine Learning Course - Lecture 1: Intro to AI and Robotics"
+DESCRIPTION = (
+    "In this lecture we study the basics of machine learning, run an experiment with a small robot, "
+    "and review the music video dataset used throughout the course. " * 6
+)
+
+
+def legacy_key_hits(categories_list, title, desc):
+    """ The lookup as it was in build_prompt """
+    user_kw_list = []
+    for cat_str in categories_list:
+        user_kw_list.extend(CATEGORY_KEYWORDS.get(cat_str, []))
+    user_kw_list = list({kw.lower() for kw in user_kw_list})
+    return [kw for kw in user_kw_list
+            if kw in title.lower().split(" ") or kw in desc.lower().split(" ")]
+
+
+def matcher_key_hits(categories_list, title, desc):
+    return get_keyword_matcher(categories_list).find(title, desc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"legacy hits:  {sorted(legacy_key_hits(FOCUS_CATEGORIES, TITLE, DESCRIPTION))}")
+    print(f"matcher hits: {sorted(matcher_key_hits(FOCUS_CATEGORIES, TITLE, DESCRIPTION))}")
+    for name, fn in (("legacy", legacy_key_hits), ("matcher", matcher_key_hits)):
+        seconds = min(timeit.repeat(lambda: fn(FOCUS_CATEGORIES, TITLE, DESCRIPTION), number=args.number, repeat=5))
+        print(f"{name:<8} {seconds / args.number * 1e6:8.1f} µs per call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Load driver for the API handlers: replays a mix of requests against collect, categorize,
+onboard, stage, updateWatchTime and videoRecordLog through the local harness (tests/harness),
+with DynamoDB, OpenAI and YouTube replaced by in-memory stand-ins of configurable latency.
+
+Reports, per handler, the requests and status codes, throughput, p50/p95/p99 latency and the
+DynamoDB calls per request. The participants are onboarded before the measured run.
+
+Usage:
+    python benchmarks/load.py [--requests 2000] [--participants 50] [--concurrency 8]
+        [--dynamodb-latency-ms 5] [--openai-latency-ms 400] [--youtube-latency-ms 80]
+        [--mix categorize=15,updateWatchTime=35,...] [--queued] [--seed 0] [--json results.json]
+
+--queued sends watch-time deltas and async categorize requests through local queues, and
+drains them through watchTimeConsumer and categorizeWorker after the run.
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import sys
+import time
+import uuid
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_DIR)
+
+from tests.harness import HandlerHarness
+from tests.harness.dynamodb import REQUEST_CALLS
+
+HANDLERS = ["categorize", "collect", "onboard", "stage", "updateWatchTime", "videoRecordLog"]
+# roughly what the extension sends: watch time ticks and video events dominate
+DEFAULT_MIX = {
+    "updateWatchTime": 35,
+    "videoRecordLog": 25,
+    "categorize": 15,
+    "stage": 15,
+    "collect": 8,
+    "onboard": 2,
+}
+VIDEO_POOL_SIZE = 200
+FOCUS_CATEGORIES = "Education;Science and Technology"
+SEARCH_QUERIES = ["javascript tutorial", "linear algebra", "lofi music", "minecraft", "news today", "cooking pasta", "physics lecture"]
+INTENT_SOURCES = ["/SearchPage", "/SearchPage", "/HomePage", "/ChannelPage", "/WatchPage"]
+VIDEO_EVENTS = ["play", "pause", "seek", "ended"]
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        handler, _, weight = part.partition("=")
+        if handler not in HANDLERS:
+            raise argparse.ArgumentTypeError(f"unknown handler {handler!r}, expected one of {', '.join(HANDLERS)}")
+        mix[handler] = float(weight)
+    return mix
+
+
+def percentile(samples: list, q: float) -> float:
+    """ Nearest-rank percentile of samples (0 when there are none) """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class EventFactory:
+    """ Builds API Gateway events for the handlers, for a fixed set of participants """
+
+    def __init__(self, rng: random.Random, participants: list, use_async: bool = False):
+        self.rng = rng
+        self.participants = participants
+        self.use_async = use_async
+        self.videos = [f"video{i:04d}" for i in range(VIDEO_POOL_SIZE)]
+        self.new_participants = 0
+        self.clock = time.time()
+
+    def timestamp(self) -> str:
+        self.clock += self.rng.uniform(0.5, 5)
+        return time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(self.clock))
+
+    def make(self, handler: str) -> dict:
+        return getattr(self, handler)(self.rng.choice(self.participants))
+
+    def onboard(self, participant: str) -> dict:
+        # mostly participants reinstalling the extension, sometimes a new one
+        if self.rng.random() < 0.5:
+            self.new_participants += 1
+            participant = f"load-new-{self.new_participants}"
+        return {"queryStringParameters": {"id": participant, "focusmode_categories": FOCUS_CATEGORIES}}
+
+    def stage(self, participant: str) -> dict:
+        return {"queryStringParameters": {"id": participant}}
+
+    def collect(self, participant: str) -> dict:
+        return {"body": json.dumps({
+            "prolificId": participant,
+            "type": "daily_survey",
+            "timestamp": self.timestamp(),
+            "stage": self.rng.randint(1, 4),
+            "distraction": self.rng.randint(1, 5),
+            "enjoyment": self.rng.randint(1, 5),
+            "userAgency": self.rng.randint(1, 5),
+        })}
+
+    def updateWatchTime(self, participant: str) -> dict:
+        return {"body": json.dumps({
+            "prolificId": participant,
+            "stage": self.rng.randint(1, 4),
+            "watchTimeDelta": self.rng.randint(5, 30),
+            "idempotencyKey": str(uuid.UUID(int=self.rng.getrandbits(128))),
+        })}
+
+    def videoRecordLog(self, participant: str) -> dict:
+        records = [{
+            "youTubeID": self.rng.choice(self.videos),
+            "event": self.rng.choice(VIDEO_EVENTS),
+            "timestamp": self.timestamp(),
+            "videoTime": self.rng.randint(0, 600),
+        } for _ in range(self.rng.randint(1, 10))]
+        if len(records) == 1:
+            return {"body": json.dumps({"prolificId": participant, **records[0]})}
+        return {"body": json.dumps({"prolificId": participant, "records": records})}
+
+    def categorize(self, participant: str) -> dict:
+        source = self.rng.choice(INTENT_SOURCES)
+        body = {"prolificId": participant, "newPreferenceData": {
+            "sessionId": f"{participant}-session-{self.rng.randint(1, 3)}",
+            "youTubeID": self.rng.choice(self.videos),
+            "timestamp": self.timestamp(),
+            "intentNode": json.dumps({
+                "curr_intent_source": source,
+                "curr_intent_data": self.rng.choice(SEARCH_QUERIES) if source == "/SearchPage" else "",
+            }),
+            "isSubscribed": self.rng.random() < 0.2,
+        }}
+        if self.use_async:
+            body["async"] = True
+        return {"body": json.dumps(body)}
+
+
+def call(handler_module, event: dict) -> tuple:
+    """ Runs one request; returns (status code or "error", seconds, DynamoDB calls) """
+    calls = Counter()
+    token = REQUEST_CALLS.set(calls)
+    started = time.perf_counter()
+    try:
+        status = handler_module.lambda_handler(event, None).get("statusCode")
+    except Exception as e:
+        status = f"error: {type(e).__name__}"
+    finally:
+        elapsed = time.perf_counter() - started
+        REQUEST_CALLS.reset(token)
+    return status, elapsed, sum(calls.values())
+
+
+def summarize(samples: list, wall_seconds: float) -> dict:
+    latencies_ms = [elapsed * 1000 for _, elapsed, _ in samples]
+    return {
+        "requests": len(samples),
+        "statuses": dict(Counter(str(status) for status, _, _ in samples)),
+        "throughput_rps": len(samples) / wall_seconds if wall_seconds else 0.0,
+        "p50_ms": percentile(latencies_ms, 50),
+        "p95_ms": percentile(latencies_ms, 95),
+        "p99_ms": percentile(latencies_ms, 99),
+        "dynamodb_calls_per_request": sum(calls for _, _, calls in samples) / len(samples) if samples else 0.0,
+    }
+
+
+def run_load(requests: int = 2000, participants: int = 50, concurrency: int = 8, mix: dict = None,
+             dynamodb_latency: float = 0.005, openai_latency: float = 0.4, youtube_latency: float = 0.08,
+             queued: bool = False, seed: int = 0) -> dict:
+    """ Runs the load and returns {"handlers": {handler: summary}, "total": summary, ...} """
+    mix = {handler: weight for handler, weight in (mix or DEFAULT_MIX).items() if weight > 0}
+    rng = random.Random(seed)
+    participant_ids = [f"load-participant-{i}" for i in range(participants)]
+
+    with HandlerHarness(dynamodb_latency, openai_latency, youtube_latency, queued=queued) as harness:
+        modules = {handler: harness.load_handler(handler) for handler in HANDLERS}
+        for participant in participant_ids:
+            modules["onboard"].lambda_handler({"queryStringParameters": {"id": participant, "focusmode_categories": FOCUS_CATEGORIES}}, None)
+        harness.dynamodb.calls.clear()
+
+        factory = EventFactory(rng, participant_ids, use_async=queued)
+        handlers = rng.choices(list(mix), weights=list(mix.values()), k=requests)
+        events = [(handler, factory.make(handler)) for handler in handlers]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda job: (job[0],) + call(modules[job[0]], job[1]), events))
+        wall_seconds = time.perf_counter() - started
+
+        report = {
+            "handlers": {
+                handler: summarize([result[1:] for result in results if result[0] == handler], wall_seconds)
+                for handler in HANDLERS if handler in mix
+            },
+            "total": summarize([result[1:] for result in results], wall_seconds),
+            "wall_seconds": wall_seconds,
+            "openai_calls": harness.openai.calls,
+            "youtube_calls": harness.youtube.calls,
+        }
+
+        if queued:
+            calls_before = harness.dynamodb.call_count()
+            report["consumers"] = {
+                "failures": harness.drain(),
+                "dynamodb_calls": harness.dynamodb.call_count() - calls_before,
+            }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--participants", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--dynamodb-latency-ms", type=float, default=5)
+    parser.add_argument("--openai-latency-ms", type=float, default=400)
+    parser.add_argument("--youtube-latency-ms", type=float, default=80)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="handler=weight,... (default: %(default)s)")
+    parser.add_argument("--queued", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="show the handlers' logs")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args()
+
+    logs = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with logs:
+        report = run_load(
+            args.requests, args.participants, args.concurrency, args.mix,
+            args.dynamodb_latency_ms / 1000, args.openai_latency_ms / 1000, args.youtube_latency_ms / 1000,
+            args.queued, args.seed,
+        )
+
+    print(f"{'handler':<18}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ddb/req':>10}  statuses")
+    for handler, row in list(report["handlers"].items()) + [("total", report["total"])]:
+        statuses = " ".join(f"{status}:{count}" for status, count in sorted(row["statuses"].items()))
+        print(f"{handler:<18}{row['requests']:>10}{row['throughput_rps']:>10.1f}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+              f"{row['p99_ms']:>10.1f}{row['dynamodb_calls_per_request']:>10.2f}  {statuses}")
+    print(f"OpenAI calls: {report['openai_calls']}, YouTube calls: {report['youtube_calls']}")
+    if "consumers" in report:
+        print(f"Consumers: {report['consumers']['dynamodb_calls']} DynamoDB calls, failures {report['consumers']['failures']}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as output:
+            json.dump({"python": sys.version.split()[0], "args": {k: v for k, v in vars(args).items() if k != "json_path"}, **report}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,16 @@
-import os
 import json
-import requests # type: ignore
 import random
 import time
-from focus_utils import CORS_HEADERS, update_last_active_time, update_user_stage, fetch_youtube_data, decimal_to_int, preprocess_video_json_entry, fetch_and_insert_user_entry, update_user_with_focus_status, user_table, build_prompt
-
+from focus_utils import CORS_HEADERS, UserContext, LatencyTrace, fetch_youtube_data, decimal_to_int, preprocess_video_json_entry, get_previous_entries, apply_previous_entries, insert_user_entry, record_pending_entry, update_user_with_focus_status, get_cached_video_categories, build_prompt_messages, decide_locally, LOCAL_RULES_ENABLED, get_decision_fingerprint, get_cached_decision, remember_decision, get_decision_cache_stats, RetryScheduler, request_categorization, OPENAI_MAX_ATTEMPTS, DEFAULT_CATEGORIZATION, get_categorize_job_queue, make_categorize_job, instrument_handler
 
+@instrument_handler("categorize")
 def lambda_handler(event, context):
     """Returns the categorization of a YouTube search query into 'focus' or 'regular' with an explanation 
 
+    With "async": true in the body, a request the rules and the decision cache can't settle is
+    queued for categorizeWorker instead: the response is a 202 with a jobId to poll
+    /categorizeStatus with (when no job queue is configured it is answered synchronously).
+
     Parameters
     ----------
     event: dict, required
@@ -50,30 +52,37 @@ def lambda_handler(event, context):
     id: str = req_body.get("prolificId")
     new_entry = req_body.get("newPreferenceData")
 
-    # get env variables
-    OPENAI_KEY = os.environ["OpenAIKey"]
-    
-    # update the last active timestamp for user
-    update_last_active_time(id)
+    # The independent I/O runs concurrently on the worker pool once the user is known
+    # (unknown ids are rejected before any YouTube quota is spent):
+    #   user_load ─┬─ save
+    #              ├─ history ─┐
+    #              ├─ youtube ─┴─ insert, pending_entry (after save)
+    #              └─ categories ─ preprocess (after history) ─ decision ─ focus_update (after insert)
+    trace = LatencyTrace("categorize")
+
+    # load the user row once for the whole invocation
+    user_context = UserContext(id)
+    trace.run("user_load", user_context.load)
+    missing_id_message = user_context.check_id()
+    if missing_id_message:
+        return missing_id_message
 
-    # update the stgae info if it in time stamp.
-    Stage_Status_Response = update_user_stage(id)
-    parsed_body = json.loads(Stage_Status_Response["body"]) 
+    video_id = new_entry.get("youTubeID")
+    youtube_future = trace.submit("youtube", fetch_youtube_data, video_id) if video_id else None
+    categories_future = trace.submit("categories", get_cached_video_categories)
 
-    # extract stage info data from respose body
-    data = parsed_body["data"]
-    message = parsed_body["message"]
+    # update the last active timestamp and the stgae info if it in time stamp.
+    data, message = user_context.touch_and_advance()
+    save_future = trace.submit("save", user_context.save)
+    history_future = trace.submit("history", get_previous_entries, id, new_entry, user_context)
 
-    # Fetch the user details fom user table
-    user_data = user_table.get_item(Key={"User_Id": id})
-    user_data = user_data["Item"]
-    user_focus_categories = user_data["FocusMode_Categories"]
+    user_focus_categories = user_context.item["FocusMode_Categories"]
 
     # Fetch the YouTube video data and append into request
-    video_id = new_entry.get("youTubeID")
-    if video_id:
-        youtube_data = fetch_youtube_data(video_id)
+    if youtube_future is not None:
+        youtube_data = youtube_future.result()
         if youtube_data is None:
+            save_future.result()
             return {
             "statusCode": 500,
             "headers": CORS_HEADERS,
@@ -82,151 +91,115 @@ def lambda_handler(event, context):
         new_entry["youTubeApiData"] = youtube_data
     
     entry_id = f"{int(time.time() * 1000)}-{random.randint(1000, 9999)}"
-    _, new_entry = fetch_and_insert_user_entry(id, new_entry, entry_id)
+    apply_previous_entries(new_entry, history_future.result())
+    insert_future = trace.submit("insert", insert_user_entry, id, dict(new_entry), entry_id)
+
+    # the entry goes on the Recent_Decisions ring alongside the insert, so the next requests see it
+    # even if no decision gets recorded; after save(), which replaces the loaded user row
+    def record_pending(entry):
+        save_future.result()
+        return record_pending_entry(user_context, id, entry, entry_id)
+    pending_future = trace.submit("pending_entry", record_pending, dict(new_entry))
 
     # print("JSON to be parsed")
     # print(req_body)
-    prompt_data = preprocess_video_json_entry(req_body)
+    categories_future.result()
+    prompt_data = trace.run("preprocess", preprocess_video_json_entry, req_body)
     prompt_data["focus_categories"] = user_focus_categories
 
     # print("Parsed data")
     # print(prompt_data)
-    
-    try:
-        url = 'https://api.openai.com/v1/chat/completions'
-        
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f"Bearer {OPENAI_KEY}"
-        }
 
-        #prompt = f"I want you to act as a YouTube query classifier. I will provide a YouTube search query and you will respond with one word, either 'focus' or 'regular'. A focus mode involves informative, specific educationally content and research, whereas a regular mode is not merely focused on gaining a skill and is more aligning with popular forms of entertainment. The search query is: {query}"
-        prompt = build_prompt(prompt_data)
-        # print("Prompt : ")
-        # print(prompt)
-
-        body = {
-            'model': 'gpt-4o-mini',
-            'messages': [
-                {'role': 'user', 'content': prompt}
-            ],
-            'response_format': {
-                'type': 'json_schema',
-                'json_schema': {
-                    "name": "categorization",
-                    "schema": {
-                    "type": "object",
-                    "properties": {
-                        "category": { "type": "string" },
-                        "explanation": { "type": "string" },
-                        "explanation_summary": { "type": "string" }
-                    },
-                    "required": ["category", "explanation", "explanation_summary"],
-                    "additionalProperties": False
-                    },
-                    "strict": True
-                }
-            }
+    # the decision is written to the preference row inserted above and to the user row saved above
+    def record_focus_status(focus, decision_path):
+        insert_future.result()
+        pending_future.result()
+        trace.run("focus_update", update_user_with_focus_status, entry_id, id, focus, user_context, new_entry, decision_path)
+
+    # a decisive strong signal settles it without asking the model
+    result = trace.run("rules", decide_locally, prompt_data) if LOCAL_RULES_ENABLED else None
+    if result is not None:
+        decision_path = result.pop("decision_path")
+        print(f"Decided locally by {decision_path}")
+        record_focus_status(result["category"], decision_path)
+        return {
+            "statusCode": 200,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({
+                "stage_status": data,
+                "stage_status_message": message,
+                "result": result,
+                "metadata": {"decision_path": decision_path, "trace": trace.log()}
+            }, default=decimal_to_int),
         }
 
-        max_retries = 3
-        for i in range(max_retries):
-            try:
-                response = requests.post(url, headers=headers, json=body, timeout=30)
-
-                if response.status_code == 200:
-                    json_response = response.json()
-                    result = json.loads(json_response['choices'][0]['message']['content'])
-
-                    summary = result.get("explanation_summary", "")
-
-                    # Split the summary into parts
-                    if "|" in summary:
-                        parts = summary.split("|")
-                        if len(parts) == 2:
-                            confidence_part = parts[0].strip()
-                            evidence_part = parts[1].strip()
-
-                            # Remove the "Key Evidence:" prefix safely
-                            if evidence_part.lower().startswith("key evidence:"):
-                                evidence_text = evidence_part[len("key evidence:"):].strip()
-
-                                # Truncate to 20 words
-                                words = evidence_text.split()
-                                if len(words) > 20:
-                                    evidence_text = " ".join(words[:20]) + "..."
-
-                                # Rebuild the summary
-                                summary = f"{confidence_part} | Key Evidence: {evidence_text}"
-
-                    result["explanation_summary"] = summary
-
-                    # ✅ Extract focus status
-                    focus_status = result.get("category")
-                    update_user_with_focus_status(entry_id, id, focus_status)
-                    break  # ✅ Success, exit loop
-
-                elif response.status_code == 429:
-                    # Rate limit
-                    wait_time = 2 ** i
-                    print(f"🔁 Rate limit hit. Waiting {wait_time}s before retry...")
-                    time.sleep(wait_time)
-                    continue
-
-                elif response.status_code == 502:
-                    # Bad Gateway
-                    wait_time = 2 ** i
-                    print(f"502 Bad Gateway. Retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                    continue
-
-                else:
-                    # Other non-retryable errors
-                    print(f"❌ Unexpected status code {response.status_code}: {response.text}")
-                    break
-            except (requests.exceptions.ReadTimeout, requests.exceptions.Timeout) as e:
-                wait_time = 2 ** i
-                print(f"⏳ Read timeout. Retrying in {wait_time}s...")
-                time.sleep(wait_time)
-                continue
-            except Exception as e:
-                if "rate_limit" in str(e).lower():
-                    wait_time = 2 ** i
-                    print(f"🔁 Rate limit exception. Waiting {wait_time}s...")
-                    time.sleep(wait_time)
-                    continue
-                print(f"❌ Exception: {str(e)}")
-                break
-        else:
-            # This runs only if no break occurred
-            update_user_with_focus_status(entry_id, id, False)
-            # For failure
-            result = {
-                "category": "false",
-                "explanation": "Max retries reached. Could not retrieve prediction from the model. Setting it too default false",
-                "explanation_summary": "Confidence: 50% | Key Evidence: Max retries reached. Could not retrieve prediction from the model. Setting it too default false"
-            }
+    # the same context was already decided by the model (e.g. the video was reloaded)
+    fingerprint = get_decision_fingerprint(prompt_data)
+    result = trace.run("decision_cache", get_cached_decision, fingerprint)
+    if result is not None:
+        record_focus_status(result["category"], "cache")
+        return {
+            "statusCode": 200,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({
+                "stage_status": data,
+                "stage_status_message": message,
+                "result": result,
+                "metadata": {"decision_path": "cache", "decision_cache": get_decision_cache_stats(), "trace": trace.log()}
+            }, default=decimal_to_int),
+        }
+    
+    # async mode: the model call runs in categorizeWorker, and the client polls /categorizeStatus
+    job_queue = get_categorize_job_queue() if req_body.get("async") is True else None
+    if job_queue is not None:
+        # the worker updates the preference row and the pending ring entry, so they have to exist first
+        insert_future.result()
+        pending_future.result()
+        try:
+            trace.run("enqueue", job_queue.send, make_categorize_job(entry_id, id, new_entry, prompt_data, fingerprint))
             return {
-                "statusCode": 200,
+                "statusCode": 202,
                 "headers": CORS_HEADERS,
                 "body": json.dumps({
                     "stage_status": data,
                     "stage_status_message": message,
-                    
-                    "result": result
-                }),
+                    "jobId": entry_id,
+                    "status": "pending",
+                    "metadata": {"decision_path": "queued", "trace": trace.log()}
+                }, default=decimal_to_int),
             }
-    except requests.RequestException as e:
-        # Send some context about this error to Lambda Logs
-        print(e)
-        raise e
+        except Exception as e:
+            print(f"Categorize job enqueue failed, answering synchronously: {str(e)}")
+
+    # static prefix (cacheable by OpenAI) as the system message, the per-request part as the user message
+    messages = build_prompt_messages(prompt_data)
+    # attempts and backoff are budgeted against the Lambda deadline, keeping time for the fallback below
+    retry = RetryScheduler.from_lambda_context(context, max_attempts=OPENAI_MAX_ATTEMPTS)
+    result = request_categorization(messages, trace, retry)
+
+    if result is None:
+        # no usable answer within the attempts / time left
+        record_focus_status(False, "default")
+        return {
+            "statusCode": 200,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({
+                "stage_status": data,
+                "stage_status_message": message,
+                "result": dict(DEFAULT_CATEGORIZATION),
+                "metadata": {"decision_path": "default", "decision_cache": get_decision_cache_stats(), "trace": trace.log()}
+            }, default=decimal_to_int),
+        }
 
+    record_focus_status(result.get("category"), "llm")
+    remember_decision(fingerprint, result)
     return {
         "statusCode": 200,
         "headers": CORS_HEADERS,
         "body": json.dumps({
             "stage_status": data,
             "stage_status_message": message,
-            "result": result
-        }),
+            "result": result,
+            "metadata": {"decision_path": "llm", "decision_cache": get_decision_cache_stats(), "trace": trace.log()}
+        }, default=decimal_to_int),
     }
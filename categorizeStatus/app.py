@@ -0,0 +1,60 @@
+import json
+import time
+from focus_utils import CORS_HEADERS, decimal_to_int, check_query_parameters, get_categorize_job_status, CATEGORIZE_STATUS_MAX_WAIT_SECONDS, CATEGORIZE_STATUS_POLL_SECONDS, instrument_handler
+
+
+@instrument_handler("categorizeStatus")
+def lambda_handler(event, context):
+    """Returns the status, and once decided the result, of an async categorize job
+
+    Query parameters: id (the prolificId), jobId (from the /categorize 202 response) and an
+    optional wait, the seconds (at most CATEGORIZE_STATUS_MAX_WAIT_SECONDS) to hold the request
+    while the job is still pending, so a client can long-poll instead of polling in a tight loop.
+
+    Parameters
+    ----------
+    event: dict, required
+        API Gateway Lambda Proxy Input Format
+
+        Event doc: https://docs.aws.amazon.com/apigateway/latest/developerguide/set-up-lambda-proxy-integrations.html#api-gateway-simple-proxy-for-lambda-input-format
+
+    context: object, required
+        Lambda Context runtime methods and attributes
+
+        Context doc: https://docs.aws.amazon.com/lambda/latest/dg/python-context-object.html
+
+    Returns
+    ------
+    API Gateway Lambda Proxy Output Format: dict
+
+        Return doc: https://docs.aws.amazon.com/apigateway/latest/developerguide/set-up-lambda-proxy-integrations.html
+    """
+    missing_parameters_message = check_query_parameters(event["queryStringParameters"], ["id", "jobId"])
+    if missing_parameters_message:
+        return missing_parameters_message
+
+    id: str = event["queryStringParameters"]["id"]
+    job_id: str = event["queryStringParameters"]["jobId"]
+    try:
+        wait = min(max(float(event["queryStringParameters"].get("wait") or 0), 0), CATEGORIZE_STATUS_MAX_WAIT_SECONDS)
+    except ValueError:
+        wait = 0
+
+    deadline = time.monotonic() + wait
+    status = get_categorize_job_status(id, job_id)
+    while status is not None and status["status"] == "pending" and time.monotonic() + CATEGORIZE_STATUS_POLL_SECONDS <= deadline:
+        time.sleep(CATEGORIZE_STATUS_POLL_SECONDS)
+        status = get_categorize_job_status(id, job_id)
+
+    if status is None:
+        return {
+            "statusCode": 404,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({"message": f"No categorize job {job_id} for this user"}),
+        }
+
+    return {
+        "statusCode": 200,
+        "headers": CORS_HEADERS,
+        "body": json.dumps(status, default=decimal_to_int),
+    }
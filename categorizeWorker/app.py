@@ -0,0 +1,42 @@
+import json
+from focus_utils import run_categorize_job, instrument_handler
+
+
+@instrument_handler("categorizeWorker")
+def lambda_handler(event, context):
+    """Runs the model call of the categorize jobs that /categorize queued in async mode
+
+    Parameters
+    ----------
+    event: dict, required
+        SQS event with the jobs (see focus_utils.jobs.make_categorize_job)
+
+        Event doc: https://docs.aws.amazon.com/lambda/latest/dg/with-sqs.html
+
+    context: object, required
+        Lambda Context runtime methods and attributes
+
+        Context doc: https://docs.aws.amazon.com/lambda/latest/dg/python-context-object.html
+
+    Returns
+    ------
+    Partial batch response: dict
+
+        Jobs that failed are reported so that SQS redelivers only those: https://docs.aws.amazon.com/lambda/latest/dg/services-sqs-errorhandling.html
+    """
+    failures = []
+    for record in event["Records"]:
+        try:
+            job = json.loads(record["body"])
+        except (ValueError, TypeError) as e:
+            print(f"Dropping categorize job {record.get('messageId')}: {str(e)}")
+            continue
+
+        try:
+            result, decision_path = run_categorize_job(job, context)
+            print(f"Categorize job {job.get('jobId')} decided by {decision_path}")
+        except Exception as e:
+            print(f"Categorize job {job.get('jobId')} failed: {str(e)}")
+            failures.append({"itemIdentifier": record["messageId"]})
+
+    return {"batchItemFailures": failures}
@@ -1,9 +1,9 @@
 import json
 import random
-import boto3
-from focus_utils import CORS_HEADERS, USER_TABLE_NAME, check_query_parameters, get_current_datetime_str, update_last_active_time, generate_weekly_stage_start_times, generate_verification_code
+from focus_utils import CORS_HEADERS, tables, check_query_parameters, get_current_datetime_str, UserContext, generate_weekly_stage_start_times, generate_stage_schedule, generate_verification_code, instrument_handler
 
 
+@instrument_handler("onboard")
 def lambda_handler(event, context):
     """Onboard a user into the FocusMode study and return the User info
 
@@ -36,25 +36,17 @@ def lambda_handler(event, context):
     focusmode_categories: list[str] = event["queryStringParameters"]["focusmode_categories"].split(";")
     
     # check to see if the participant has onboarded before
-    dynamodb = boto3.resource("dynamodb")
-    user_table = dynamodb.Table(USER_TABLE_NAME)
+    user_table = tables.user_table
 
-    user_item = user_table.get_item(Key={"User_Id": id})
+    user_context = UserContext(id, table=user_table)
     
     # if user exists
-    if 'Item' in user_item:
-        update_last_active_time(id)
+    if user_context.load():
+        user_context.touch()
 
         # only update a focus mode categories
-        response = user_table.update_item(
-                Key={"User_Id": id},
-                UpdateExpression="SET FocusMode_Categories = :focusmode_categories",
-                ExpressionAttributeValues={
-                    ":focusmode_categories": focusmode_categories
-                },
-                ReturnValues="ALL_NEW"
-            )
-        response = response["Attributes"]
+        user_context.set_attribute("FocusMode_Categories", value=focusmode_categories)
+        response = user_context.save()
         data = {
             "user_Id": str(response.get("User_Id")),
             "current_stage": int(response.get("Current_Stage")),
@@ -92,6 +84,7 @@ def lambda_handler(event, context):
                     "Verification_Code": verification_code,
                     "Last_Active_At_Time": current_timestamp,
                     "Stage_Start_Times" : generate_weekly_stage_start_times(current_timestamp, stage_order),
+                    "Stage_Schedule": generate_stage_schedule(current_timestamp, stage_order),
                     "User_Completed_Stages": [],
                     "Current_Stage": stage_order[0],
                     "FocusMode_Categories": focusmode_categories,
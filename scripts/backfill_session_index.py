@@ -0,0 +1,71 @@
+"""
+Backfills the SessionTimestampIndex keys (sessionKey, sessionTimestamp) on user preference rows
+written before the index existed, so fetch_and_insert_user_entry sees their whole history.
+
+Safe to re-run: rows that already have both keys are skipped and every write is conditional on
+the row still existing.
+
+Usage:
+    python scripts/backfill_session_index.py [--table NAME] [--segments 4] [--dry-run]
+"""
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, "..", "utils_layer"))
+sys.path.insert(0, SCRIPTS_DIR)
+
+import parallel_scan
+from focus_utils.common import USER_PREFERENCE_DATA_TABLE_NAME
+from focus_utils.preferences import SESSION_KEY_ATTRIBUTE, SESSION_TIMESTAMP_ATTRIBUTE, get_session_index_keys
+
+SCAN_KWARGS = {
+    "ProjectionExpression": "#pid, #id, #sid, #ts, #sk, #st",
+    "ExpressionAttributeNames": {
+        "#pid": "prolificId",
+        "#id": "Id",
+        "#sid": "sessionId",
+        "#ts": "timestamp",
+        "#sk": SESSION_KEY_ATTRIBUTE,
+        "#st": SESSION_TIMESTAMP_ATTRIBUTE,
+    },
+}
+
+
+def plan_update(item: dict):
+    """ The update_item kwargs that set the index keys on a row missing them """
+    if SESSION_KEY_ATTRIBUTE in item and SESSION_TIMESTAMP_ATTRIBUTE in item:
+        return parallel_scan.SKIPPED
+
+    index_keys = None
+    if "sessionId" in item and "timestamp" in item:
+        index_keys = get_session_index_keys(item["prolificId"], item["sessionId"], item["timestamp"])
+    if index_keys is None:
+        print(f"skipping {item['prolificId']}/{item['Id']}: missing sessionId or invalid timestamp")
+        return parallel_scan.INVALID
+
+    return {
+        "Key": {"prolificId": item["prolificId"], "Id": item["Id"]},
+        "UpdateExpression": "SET #sk = :sk, #st = :st",
+        "ConditionExpression": "attribute_exists(Id)",
+        "ExpressionAttributeNames": {"#sk": SESSION_KEY_ATTRIBUTE, "#st": SESSION_TIMESTAMP_ATTRIBUTE},
+        "ExpressionAttributeValues": {
+            ":sk": index_keys[SESSION_KEY_ATTRIBUTE],
+            ":st": index_keys[SESSION_TIMESTAMP_ATTRIBUTE],
+        },
+    }
+
+
+def backfill(table, total_segments: int = 1, dry_run: bool = False) -> dict:
+    return parallel_scan.backfill(table, SCAN_KWARGS, plan_update, total_segments, dry_run)
+
+
+def main():
+    parallel_scan.main(
+        __doc__, USER_PREFERENCE_DATA_TABLE_NAME, backfill,
+        "already indexed", "without a usable sessionId/timestamp"
+    )
+
+
+if __name__ == "__main__":
+    main()
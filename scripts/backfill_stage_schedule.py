@@ -0,0 +1,70 @@
+"""
+Backfills Stage_Schedule (the epoch boundaries of a participant's stages, see
+focus_utils.common.generate_stage_schedule) on user rows onboarded before it was stored.
+
+Not strictly required: UserContext.update_stage builds the schedule from Stage_Start_Times
+and writes it the next time the participant is seen. Running this moves every row over at once.
+
+Safe to re-run: rows that already have a schedule are skipped and every write is conditional
+on the row still existing without one (rows that got one since the scan count as skipped).
+Rows whose Stage_Start_Times aren't one week apart in Stage_Order_List order are left on the
+old lookup and reported.
+
+Usage:
+    python scripts/backfill_stage_schedule.py [--table NAME] [--segments 4] [--dry-run]
+"""
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, "..", "utils_layer"))
+sys.path.insert(0, SCRIPTS_DIR)
+
+import parallel_scan
+from focus_utils.common import USER_TABLE_NAME
+from focus_utils.stage import stage_schedule_from_start_times
+
+SCAN_KWARGS = {
+    "ProjectionExpression": "#uid, #times, #order, #schedule",
+    "ExpressionAttributeNames": {
+        "#uid": "User_Id",
+        "#times": "Stage_Start_Times",
+        "#order": "Stage_Order_List",
+        "#schedule": "Stage_Schedule",
+    },
+}
+
+
+def plan_update(item: dict):
+    """ The update_item kwargs that set Stage_Schedule on a row missing it """
+    if "Stage_Schedule" in item:
+        return parallel_scan.SKIPPED
+
+    schedule = None
+    if item.get("Stage_Start_Times") and item.get("Stage_Order_List"):
+        schedule = stage_schedule_from_start_times(item["Stage_Start_Times"], item["Stage_Order_List"])
+    if schedule is None:
+        print(f"skipping {item['User_Id']}: Stage_Start_Times don't follow Stage_Order_List week by week")
+        return parallel_scan.INVALID
+
+    return {
+        "Key": {"User_Id": item["User_Id"]},
+        "UpdateExpression": "SET Stage_Schedule = :schedule",
+        "ConditionExpression": "attribute_exists(User_Id) AND attribute_not_exists(Stage_Schedule)",
+        "ExpressionAttributeValues": {":schedule": schedule},
+    }
+
+
+def backfill(table, total_segments: int = 1, dry_run: bool = False) -> dict:
+    return parallel_scan.backfill(table, SCAN_KWARGS, plan_update, total_segments, dry_run)
+
+
+def main():
+    parallel_scan.main(
+        __doc__, USER_TABLE_NAME, backfill,
+        "already have a schedule", "left on Stage_Start_Times"
+    )
+
+
+if __name__ == "__main__":
+    main()
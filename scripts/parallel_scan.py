@@ -0,0 +1,79 @@
+"""
+The parallel scan driver shared by the backfill scripts.
+
+A backfill script only provides the scan projection and plan_update(item), which returns the
+update_item kwargs for a row, or SKIPPED / INVALID when the row is left alone. Everything else
+(segments, LastEvaluatedKey paging, dry runs, counts and the command line) lives here.
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError # type: ignore
+
+SKIPPED = "skipped"
+INVALID = "invalid"
+
+
+def empty_counts() -> dict:
+    return {"scanned": 0, "updated": 0, SKIPPED: 0, INVALID: 0}
+
+
+def backfill_segment(table, scan_kwargs: dict, plan_update, segment: int = 0, total_segments: int = 1, dry_run: bool = False) -> dict:
+    """ Scans one parallel scan segment and applies plan_update's write to every row it returns one for """
+    counts = empty_counts()
+    scan_kwargs = dict(scan_kwargs)
+    if total_segments > 1:
+        scan_kwargs.update(Segment=segment, TotalSegments=total_segments)
+
+    while True:
+        response = table.scan(**scan_kwargs)
+        for item in response.get("Items", []):
+            counts["scanned"] += 1
+            update = plan_update(item)
+            if update in (SKIPPED, INVALID):
+                counts[update] += 1
+                continue
+
+            if not dry_run:
+                try:
+                    table.update_item(**update)
+                except ClientError as e:
+                    if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                        raise
+                    # the row changed (or was deleted) between the scan and the write
+                    counts[SKIPPED] += 1
+                    continue
+            counts["updated"] += 1
+
+        if "LastEvaluatedKey" not in response:
+            return counts
+        scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def backfill(table, scan_kwargs: dict, plan_update, total_segments: int = 1, dry_run: bool = False) -> dict:
+    """ Runs backfill_segment on every segment concurrently and adds up the counts """
+    with ThreadPoolExecutor(max_workers=total_segments) as executor:
+        results = executor.map(
+            lambda segment: backfill_segment(table, scan_kwargs, plan_update, segment, total_segments, dry_run),
+            range(total_segments)
+        )
+        totals = empty_counts()
+        for counts in results:
+            for key, value in counts.items():
+                totals[key] += value
+    return totals
+
+
+def main(description: str, default_table: str, run_backfill, skipped_label: str, invalid_label: str):
+    """ The command line of a backfill script; run_backfill(table, total_segments, dry_run) returns the totals """
+    parser = argparse.ArgumentParser(description=description, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--table", default=default_table)
+    parser.add_argument("--segments", type=int, default=1, help="parallel scan segments")
+    parser.add_argument("--dry-run", action="store_true", help="only count the rows that would be updated")
+    args = parser.parse_args()
+
+    import boto3 # type: ignore
+    table = boto3.resource("dynamodb").Table(args.table)
+    totals = run_backfill(table, args.segments, args.dry_run)
+    print(("would update" if args.dry_run else "updated") + f" {totals['updated']} of {totals['scanned']} rows "
+          f"({totals[SKIPPED]} {skipped_label}, {totals[INVALID]} {invalid_label})")
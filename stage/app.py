@@ -1,8 +1,8 @@
 import json
-import boto3
-from focus_utils import CORS_HEADERS, check_query_parameters, update_last_active_time, update_user_stage
+from focus_utils import CORS_HEADERS, UserContext, check_query_parameters, decimal_to_int, instrument_handler
 
 
+@instrument_handler("stage")
 def lambda_handler(event, context):
     """Returns the current stage status for the user. 
 
@@ -33,16 +33,15 @@ def lambda_handler(event, context):
     # get query parameters and body
     id: str = event["queryStringParameters"]["id"]
 
-    # update the last active timestamp for user
-    update_last_active_time(id)
+    # check to see if the Prolific ID is valid
+    user_context = UserContext(id)
+    missing_id_message = user_context.check_id()
+    if missing_id_message:
+        return missing_id_message
 
-    # update the stgae info if it in time stamp.
-    response = update_user_stage(id)
-    parsed_body = json.loads(response["body"]) 
-
-    # Now you can safely access "data"
-    data = parsed_body["data"]
-    message = parsed_body["message"]
+    # update the last active timestamp and the stgae info if it in time stamp.
+    data, message = user_context.touch_and_advance()
+    user_context.save()
     # print()
     # print("----------------------------------")
     # print("Stage update response: ")
@@ -63,6 +62,6 @@ def lambda_handler(event, context):
         "body": json.dumps({
             "Stage_Status": data,
             "message": f"Received: {message}",
-        }),
+        }, default=decimal_to_int),
     }
     
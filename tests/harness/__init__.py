@@ -0,0 +1,185 @@
+"""
+Local harness that runs the real handlers against in-memory stand-ins for DynamoDB, OpenAI,
+YouTube and the SQS queues:
+
+    with HandlerHarness(dynamodb_latency=0.005, openai_latency=0.4) as harness:
+        stage = harness.load_handler("stage")
+        harness.add_participant("participant-1")
+        stage.lambda_handler({"queryStringParameters": {"id": "participant-1"}}, None)
+        harness.dynamodb.calls  # {(table name, operation): count}
+
+Used by the end-to-end handler tests and by benchmarks/load.py; load_handler and
+make_participant_item are what the unit tests use to load handlers and build user rows.
+"""
+import contextvars
+import importlib.util
+import os
+import sys
+
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# the handlers import focus_utils from the layer, so make it importable the same way Lambda does
+if os.path.join(ROOT_DIR, "utils_layer") not in sys.path:
+    sys.path.insert(0, os.path.join(ROOT_DIR, "utils_layer"))
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-west-1")
+os.environ.setdefault("YouTubeApiKey", "harness-youtube-key")
+os.environ.setdefault("OpenAIKey", "harness-openai-key")
+
+from focus_utils import common, decisions, generate_stage_schedule, generate_weekly_stage_start_times, get_current_datetime_str, jobs, llm, queues, tables, tracing, watch_time, youtube # noqa: E402
+from focus_utils.queues import LocalQueue # noqa: E402
+
+from tests.harness.dynamodb import FakeDynamoDB # noqa: E402
+from tests.harness.services import FakeOpenAI, FakeYouTube # noqa: E402
+
+
+# tables attribute -> (hash key, range key, GSIs), as in template.yaml
+TABLE_KEYS = {
+    "user_table": ("User_Id", None, {}),
+    # SimpleTable without a PrimaryKey
+    "admin_table": ("id", None, {}),
+    "user_pref_data_table": ("prolificId", "Id", {"SessionTimestampIndex": ("sessionKey", "sessionTimestamp")}),
+    "video_record_log_table": ("prolificId", "Id", {}),
+    "video_metadata_table": ("video_id", None, {}),
+    "decision_cache_table": ("fingerprint", None, {}),
+    "daily_survey_data_table": ("prolificId", "Id", {}),
+    "post_stage_survey_data_table": ("prolificId", "Id", {}),
+    "post_study_survey_data_table": ("prolificId", "Id", {}),
+    "post_stage_rating_survey_data_table": ("prolificId", "Id", {}),
+}
+WATCH_TIME_QUEUE_URL = "local://watch-time"
+CATEGORIZE_JOB_QUEUE_URL = "local://categorize-jobs"
+
+
+def load_handler(function_dir: str):
+    """ Imports <function_dir>/app.py under a unique module name (every handler is called app) """
+    spec = importlib.util.spec_from_file_location(
+        f"{function_dir}_app", os.path.join(ROOT_DIR, function_dir, "app.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_participant_item(user_id: str = "participant-1", stage_order: list = None, focus_categories: list = None, start: str = None) -> dict:
+    """ A user row the way /onboard writes it; the study starts now unless start is given """
+    stage_order = stage_order or [1, 2, 3, 4]
+    start = start or get_current_datetime_str()
+    return {
+        "User_Id": user_id,
+        "Stage_Order_List": stage_order,
+        "Verification_Code": common.generate_verification_code(user_id),
+        "Last_Active_At_Time": start,
+        "Stage_Start_Times": generate_weekly_stage_start_times(start, stage_order),
+        "Stage_Schedule": generate_stage_schedule(start, stage_order),
+        "User_Completed_Stages": [],
+        "Current_Stage": stage_order[0],
+        "FocusMode_Categories": focus_categories or ["Education", "Science and Technology"],
+        "StageWatchTimes": {"1": 0, "2": 0, "3": 0, "4": 0},
+    }
+
+
+class ContextExecutor(ThreadPoolExecutor):
+    """ Runs each task in the submitter's contextvars, so per-request counters follow the worker pool """
+
+    def submit(self, fn, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class HandlerHarness:
+    """
+    Context manager that points the layer at the stand-ins and puts everything back on exit.
+
+    With queued=True the watch-time and categorize job queues are LocalQueues
+    (harness.watch_time_queue, harness.categorize_job_queue) that drain() hands to the
+    consumer functions; otherwise deltas are written directly and async categorize
+    requests are answered synchronously, as when the queue URLs aren't configured.
+    """
+
+    def __init__(self, dynamodb_latency: float = 0.0, openai_latency: float = 0.0, youtube_latency: float = 0.0,
+                 queued: bool = False, openai_category: str = "true"):
+        self.dynamodb = FakeDynamoDB(dynamodb_latency)
+        self.openai = FakeOpenAI(openai_latency, category=openai_category)
+        self.youtube = FakeYouTube(youtube_latency)
+        self.queued = queued
+        self.watch_time_queue = LocalQueue() if queued else None
+        self.categorize_job_queue = LocalQueue() if queued else None
+        self.tables = {}
+        self._saved = []
+        self._consumers = {}
+
+    def _replace(self, target, name: str, value):
+        namespace = vars(target)
+        self._saved.append((namespace, name, namespace.get(name, _ABSENT)))
+        namespace[name] = value
+
+    def __enter__(self):
+        for name, (hash_key, range_key, indexes) in TABLE_KEYS.items():
+            table_name = tables._TABLE_NAMES.get(name) or f"harness-{name}"
+            self.tables[name] = self.dynamodb.create_table(table_name, hash_key, range_key, indexes)
+            self._replace(tables, name, self.tables[name])
+        self._replace(tables, "dynamodb", self.dynamodb)
+
+        self._replace(llm, "get_session", lambda host: self.openai)
+        self._replace(youtube, "youtube_session", self.youtube)
+        # the category list comes from the bundled snapshot instead of googleapiclient
+        self._replace(youtube, "get_unique_video_categories", youtube.load_video_category_snapshot)
+
+        if self.queued:
+            self._replace(watch_time, "WATCH_TIME_QUEUE_URL", WATCH_TIME_QUEUE_URL)
+            self._replace(jobs, "CATEGORIZE_JOB_QUEUE_URL", CATEGORIZE_JOB_QUEUE_URL)
+            self._replace(queues, "_queues", {
+                WATCH_TIME_QUEUE_URL: self.watch_time_queue,
+                CATEGORIZE_JOB_QUEUE_URL: self.categorize_job_queue,
+            })
+
+        self._executor = ContextExecutor(max_workers=tracing.WORKER_POOL_SIZE, thread_name_prefix="harness")
+        self._replace(tracing, "_executor", self._executor)
+        self.reset_caches()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._executor.shutdown(wait=True)
+        for namespace, name, value in reversed(self._saved):
+            if value is _ABSENT:
+                namespace.pop(name, None)
+            else:
+                namespace[name] = value
+        self._saved = []
+        self.reset_caches()
+        return False
+
+    def reset_caches(self):
+        youtube.reset_video_metadata_cache()
+        youtube.reset_video_category_cache()
+        decisions.reset_decision_cache()
+
+    def load_handler(self, function_dir: str):
+        return load_handler(function_dir)
+
+    def add_participant(self, user_id: str, stage_order: list = None, focus_categories: list = None, start: str = None) -> dict:
+        """ Writes make_participant_item's row to the user table """
+        item = make_participant_item(user_id, stage_order, focus_categories, start)
+        self.tables["user_table"].put_item(Item=item)
+        return item
+
+    def drain(self) -> dict:
+        """ Hands everything queued so far to watchTimeConsumer and categorizeWorker; returns their batchItemFailures """
+        failures = {}
+        if self.watch_time_queue is not None and self.watch_time_queue.messages:
+            consumer = self._consumer("watchTimeConsumer")
+            failures["watchTimeConsumer"] = consumer.lambda_handler({"Records": self.watch_time_queue.receive()}, None)["batchItemFailures"]
+        if self.categorize_job_queue is not None and self.categorize_job_queue.messages:
+            worker = self._consumer("categorizeWorker")
+            failures["categorizeWorker"] = worker.lambda_handler({"Records": self.categorize_job_queue.receive()}, None)["batchItemFailures"]
+        return failures
+
+    def _consumer(self, function_dir: str):
+        if function_dir not in self._consumers:
+            self._consumers[function_dir] = load_handler(function_dir)
+        return self._consumers[function_dir]
+
+
+_ABSENT = object()
@@ -0,0 +1,553 @@
+"""
+In-memory stand-in for the DynamoDB Table operations focus_utils uses.
+
+FakeTable implements get_item, put_item, update_item, query, scan and (through
+table.meta.client) batch_write_item, with the expression syntax the layer writes:
+SET/REMOVE/ADD/DELETE with if_not_exists and list_append, condition and filter expressions
+with AND/OR/NOT, comparisons, attribute_exists/attribute_not_exists/begins_with/contains/size,
+projections, and boto3 Key/Attr condition objects. Like boto3, numbers come back as Decimal
+and floats are rejected, and a failed condition raises ClientError
+ConditionalCheckFailedException.
+
+Every call is counted in FakeDynamoDB.calls, as {(table name, operation): count}, and in the
+Counter set in REQUEST_CALLS, which a load driver sets per request to attribute calls to it.
+Calls are also recorded as "dynamodb" spans of the running invocation (focus_utils.tracing),
+as the botocore hooks do for the real client.
+"""
+import contextvars
+import copy
+import re
+import threading
+import time
+
+from collections import Counter
+from decimal import Decimal
+
+from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder # type: ignore
+from botocore.exceptions import ClientError # type: ignore
+
+from focus_utils.tracing import span
+
+
+_TOKEN = re.compile(r"\s*(?:(<>|<=|>=|[=<>()\[\],.+-])|(#[A-Za-z0-9_]+)|(:[A-Za-z0-9_]+)|([A-Za-z_][A-Za-z0-9_]*)|(\d+))")
+_KEYWORDS = {"SET", "REMOVE", "ADD", "DELETE", "AND", "OR", "NOT", "BETWEEN", "IN"}
+_MISSING = object()
+_NOT_FOUND = object()
+
+# Counter of the calls made by the current request (None: not counted per request)
+REQUEST_CALLS = contextvars.ContextVar("dynamodb_request_calls", default=None)
+
+
+def client_error(code: str, message: str, operation: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": message}}, operation)
+
+
+def to_dynamodb(value):
+    """ A deep copy of value as boto3 stores it: int -> Decimal, float rejected """
+    if isinstance(value, bool) or value is None or isinstance(value, (str, bytes, Decimal)):
+        return value
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, float):
+        raise TypeError("Float types are not supported. Use Decimal types instead.")
+    if isinstance(value, dict):
+        return {key: to_dynamodb(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_dynamodb(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return {to_dynamodb(item) for item in value}
+    raise TypeError(f"Unsupported type {type(value)} for value {value!r}")
+
+
+def tokenize(expression: str) -> list:
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if not match:
+            raise ValueError(f"Can't parse {expression[position:]!r} in {expression!r}")
+        tokens.append(next(group for group in match.groups() if group is not None))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """ Recursive descent over the tokens of an update, condition or projection expression """
+
+    def __init__(self, expression: str, names: dict, values: dict):
+        self.tokens = tokenize(expression)
+        self.position = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    def peek(self, offset=0):
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def take(self, expected=None):
+        token = self.peek()
+        if expected is not None and (token is None or token.upper() != expected):
+            raise ValueError(f"Expected {expected}, got {token!r} in {' '.join(self.tokens)}")
+        self.position += 1
+        return token
+
+    def done(self):
+        return self.position >= len(self.tokens)
+
+    # paths and operands -------------------------------------------------------------------
+
+    def name(self, token):
+        if token.startswith("#"):
+            if token not in self.names:
+                raise client_error("ValidationException", f"Unknown attribute name placeholder {token}", "Expression")
+            return self.names[token]
+        return token
+
+    def path(self) -> list:
+        segments = [self.name(self.take())]
+        while self.peek() in (".", "["):
+            if self.take() == ".":
+                segments.append(self.name(self.take()))
+            else:
+                segments.append(int(self.take()))
+                self.take("]")
+        return segments
+
+    def operand(self):
+        """ Returns a function item -> value """
+        token = self.peek()
+        if token.startswith(":"):
+            self.take()
+            if token not in self.values:
+                raise client_error("ValidationException", f"Unknown attribute value placeholder {token}", "Expression")
+            value = to_dynamodb(self.values[token])
+            return lambda item: value
+        if self.peek(1) == "(" and token in ("if_not_exists", "list_append", "size"):
+            self.take()
+            self.take("(")
+            if token == "size":
+                path = self.path()
+                self.take(")")
+                return lambda item: Decimal(len(get_path(item, path)))
+            first = self.operand()
+            self.take(",")
+            second = self.operand()
+            self.take(")")
+            if token == "if_not_exists":
+                return lambda item: value_or(lambda: first(item), lambda: second(item))
+            return lambda item: list(first(item)) + list(second(item))
+        path = self.path()
+        return lambda item: get_path(item, path)
+
+    def value(self):
+        """ operand, or operand + operand / operand - operand (SET) """
+        left = self.operand()
+        if self.peek() in ("+", "-"):
+            operator = self.take()
+            right = self.operand()
+            if operator == "+":
+                return lambda item: left(item) + right(item)
+            return lambda item: left(item) - right(item)
+        return left
+
+    # conditions ---------------------------------------------------------------------------
+
+    def condition(self):
+        left = self.conjunction()
+        while self.peek() is not None and self.peek().upper() == "OR":
+            self.take()
+            right = self.conjunction()
+            left = (lambda a, b: lambda item: a(item) or b(item))(left, right)
+        return left
+
+    def conjunction(self):
+        left = self.negation()
+        while self.peek() is not None and self.peek().upper() == "AND":
+            self.take()
+            right = self.negation()
+            left = (lambda a, b: lambda item: a(item) and b(item))(left, right)
+        return left
+
+    def negation(self):
+        if self.peek() is not None and self.peek().upper() == "NOT":
+            self.take()
+            inner = self.negation()
+            return lambda item: not inner(item)
+        return self.comparison()
+
+    def comparison(self):
+        token = self.peek()
+        if token == "(":
+            self.take()
+            inner = self.condition()
+            self.take(")")
+            return inner
+        if self.peek(1) == "(" and token in ("attribute_exists", "attribute_not_exists", "begins_with", "contains"):
+            self.take()
+            self.take("(")
+            path = self.path()
+            if token == "attribute_exists":
+                self.take(")")
+                return lambda item: get_path(item, path, _NOT_FOUND) is not _NOT_FOUND
+            if token == "attribute_not_exists":
+                self.take(")")
+                return lambda item: get_path(item, path, _NOT_FOUND) is _NOT_FOUND
+            self.take(",")
+            argument = self.operand()
+            self.take(")")
+            if token == "begins_with":
+                return lambda item: isinstance(get_path(item, path, None), str) and get_path(item, path).startswith(argument(item))
+            return lambda item: contains(get_path(item, path, None), argument(item))
+
+        left = self.operand()
+        operator = self.take()
+        if operator.upper() == "BETWEEN":
+            low = self.operand()
+            self.take("AND")
+            high = self.operand()
+            return lambda item: compare(low(item), "<=", left(item)) and compare(left(item), "<=", high(item))
+        right = self.operand()
+        return lambda item: compare(left(item), operator, right(item))
+
+
+def get_path(item, path: list, default=_MISSING):
+    node = item
+    for segment in path:
+        try:
+            node = node[segment]
+        except (KeyError, IndexError, TypeError):
+            if default is _MISSING:
+                raise KeyError(segment)
+            return default
+    return node
+
+
+def value_or(get, fallback):
+    try:
+        return get()
+    except KeyError:
+        return fallback()
+
+
+def contains(container, value):
+    if container is None:
+        return False
+    try:
+        return value in container
+    except TypeError:
+        return False
+
+
+def compare(left, operator, right):
+    try:
+        if operator == "=":
+            return left == right
+        if operator == "<>":
+            return left != right
+        if operator == "<":
+            return left < right
+        if operator == "<=":
+            return left <= right
+        if operator == ">":
+            return left > right
+        if operator == ">=":
+            return left >= right
+    except (TypeError, KeyError):
+        return False
+    raise ValueError(f"Unknown comparator {operator}")
+
+
+def safe(condition):
+    """ A condition that is False instead of raising on a missing attribute """
+    def evaluate(item):
+        try:
+            return condition(item)
+        except KeyError:
+            return False
+    return evaluate
+
+
+def parse_condition(expression, names=None, values=None, is_key_condition=False):
+    """ A function item -> bool for a condition string or a boto3 Key/Attr condition """
+    names = dict(names or {})
+    values = dict(values or {})
+    if isinstance(expression, ConditionBase):
+        built = ConditionExpressionBuilder().build_expression(expression, is_key_condition=is_key_condition)
+        expression = built.condition_expression
+        names.update(built.attribute_name_placeholders)
+        values.update(built.attribute_value_placeholders)
+    parser = _Parser(expression, names, values)
+    condition = parser.condition()
+    if not parser.done():
+        raise ValueError(f"Unexpected {parser.peek()!r} in {expression!r}")
+    return safe(condition)
+
+
+def parse_projection(expression: str, names=None) -> list:
+    parser = _Parser(expression, names, {})
+    paths = [parser.path()]
+    while not parser.done():
+        parser.take(",")
+        paths.append(parser.path())
+    return paths
+
+
+def project(item: dict, paths: list) -> dict:
+    projected = {}
+    for path in paths:
+        value = get_path(item, path, _NOT_FOUND)
+        if value is _NOT_FOUND:
+            continue
+        node = projected
+        for segment in path[:-1]:
+            node = node.setdefault(segment, {})
+        node[path[-1]] = copy.deepcopy(value)
+    return projected
+
+
+def set_path(item: dict, path: list, value):
+    node = item
+    for segment in path[:-1]:
+        try:
+            node = node[segment]
+        except (KeyError, IndexError, TypeError):
+            raise client_error("ValidationException", "The document path provided in the update expression is invalid for update", "UpdateItem")
+    if isinstance(node, list) and isinstance(path[-1], int) and path[-1] >= len(node):
+        node.append(value)
+    else:
+        node[path[-1]] = value
+
+
+def remove_path(item: dict, path: list):
+    node = get_path(item, path[:-1], None)
+    if isinstance(node, dict):
+        node.pop(path[-1], None)
+    elif isinstance(node, list) and path[-1] < len(node):
+        del node[path[-1]]
+
+
+def apply_update(item: dict, expression: str, names=None, values=None) -> dict:
+    """ Returns a copy of item with the update expression applied (operands read the old item) """
+    parser = _Parser(expression, names, values)
+    actions = []
+    clause = None
+    while not parser.done():
+        token = parser.peek()
+        if token.upper() in ("SET", "REMOVE", "ADD", "DELETE"):
+            clause = parser.take().upper()
+        elif token == ",":
+            parser.take()
+        path = parser.path()
+        if clause == "SET":
+            parser.take("=")
+            actions.append((clause, path, parser.value()))
+        elif clause == "REMOVE":
+            actions.append((clause, path, None))
+        elif clause in ("ADD", "DELETE"):
+            actions.append((clause, path, parser.operand()))
+        else:
+            raise ValueError(f"Update expression must start with SET, REMOVE, ADD or DELETE: {expression!r}")
+
+    try:
+        resolved = [(clause, path, operand(item) if operand is not None else None) for clause, path, operand in actions]
+    except KeyError as e:
+        raise client_error("ValidationException", f"The provided expression refers to an attribute that does not exist in the item: {e}", "UpdateItem")
+
+    updated = copy.deepcopy(item)
+    for clause, path, value in resolved:
+        if clause == "SET":
+            set_path(updated, path, copy.deepcopy(value))
+        elif clause == "REMOVE":
+            remove_path(updated, path)
+        elif clause == "ADD":
+            if len(path) != 1:
+                raise client_error("ValidationException", "ADD can only be used on top-level attributes", "UpdateItem")
+            current = updated.get(path[0])
+            if current is None:
+                updated[path[0]] = copy.deepcopy(value)
+            elif isinstance(current, set):
+                updated[path[0]] = current | value
+            else:
+                updated[path[0]] = current + value
+        else:
+            if path[0] in updated:
+                updated[path[0]] = updated[path[0]] - value
+    return updated
+
+
+class FakeClient:
+    """ The low-level client calls that go through table.meta.client """
+
+    def __init__(self, database):
+        self.database = database
+
+    def batch_write_item(self, RequestItems: dict, **kwargs):
+        if sum(len(requests) for requests in RequestItems.values()) > 25:
+            raise client_error("ValidationException", "Too many items requested for the BatchWriteItem call", "BatchWriteItem")
+        for table_name, requests in RequestItems.items():
+            table = self.database.tables[table_name]
+            table.record("batch_write_item")
+            keys = set()
+            for request in requests:
+                if "PutRequest" in request:
+                    item = request["PutRequest"]["Item"]
+                    key = table.key_of(item)
+                    if key in keys:
+                        raise client_error("ValidationException", "Provided list of item keys contains duplicates", "BatchWriteItem")
+                    keys.add(key)
+            with self.database.lock:
+                for request in requests:
+                    if "PutRequest" in request:
+                        table.store(request["PutRequest"]["Item"])
+                    else:
+                        table.items.pop(table.key_of(request["DeleteRequest"]["Key"]), None)
+        return {"UnprocessedItems": {}}
+
+
+class FakeMeta:
+    def __init__(self, client):
+        self.client = client
+
+
+class FakeTable:
+    """
+    One table: hash_key and optional range_key, plus GSIs as {index name: (hash, range)}.
+    Items are stored by key; reads return copies.
+    """
+
+    def __init__(self, database, name: str, hash_key: str, range_key: str = None, indexes: dict = None):
+        self.database = database
+        self.name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.indexes = indexes or {}
+        self.items = {}
+        self.meta = FakeMeta(database.client)
+
+    def record(self, operation: str):
+        self.database.record(self.name, operation)
+
+    def key_of(self, item: dict):
+        try:
+            key = (item[self.hash_key],) + ((item[self.range_key],) if self.range_key else ())
+        except KeyError as e:
+            raise client_error("ValidationException", f"One of the required keys was not given a value: {e}", "PutItem")
+        return tuple(to_dynamodb(part) for part in key)
+
+    def store(self, item: dict):
+        self.items[self.key_of(item)] = to_dynamodb(item)
+
+    def check(self, current, condition, names, values, operation):
+        if condition is None:
+            return
+        if not parse_condition(condition, names, values)(current or {}):
+            raise client_error("ConditionalCheckFailedException", "The conditional request failed", operation)
+
+    def get_item(self, Key: dict, ProjectionExpression: str = None, ExpressionAttributeNames: dict = None, ConsistentRead: bool = False, **kwargs):
+        self.record("get_item")
+        with self.database.lock:
+            item = self.items.get(self.key_of(Key))
+            if item is None:
+                return {}
+            if ProjectionExpression:
+                return {"Item": project(item, parse_projection(ProjectionExpression, ExpressionAttributeNames))}
+            return {"Item": copy.deepcopy(item)}
+
+    def put_item(self, Item: dict, ConditionExpression=None, ExpressionAttributeNames=None, ExpressionAttributeValues=None, **kwargs):
+        self.record("put_item")
+        with self.database.lock:
+            self.check(self.items.get(self.key_of(Item)), ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues, "PutItem")
+            self.store(Item)
+        return {}
+
+    def update_item(self, Key: dict, UpdateExpression: str, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ReturnValues: str = "NONE", **kwargs):
+        self.record("update_item")
+        with self.database.lock:
+            key = self.key_of(Key)
+            current = self.items.get(key)
+            self.check(current, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues, "UpdateItem")
+            updated = apply_update(current if current is not None else to_dynamodb(Key), UpdateExpression,
+                                   ExpressionAttributeNames, ExpressionAttributeValues)
+            self.items[key] = updated
+
+            if ReturnValues == "ALL_NEW":
+                return {"Attributes": copy.deepcopy(updated)}
+            if ReturnValues == "ALL_OLD":
+                return {"Attributes": copy.deepcopy(current)} if current is not None else {}
+            if ReturnValues in ("UPDATED_NEW", "UPDATED_OLD"):
+                source = updated if ReturnValues == "UPDATED_NEW" else (current or {})
+                changed = {name for name in set(updated) | set(current or {}) if updated.get(name) != (current or {}).get(name)}
+                return {"Attributes": {name: copy.deepcopy(source[name]) for name in changed if name in source}}
+            return {}
+
+    def _select(self, items, FilterExpression, ProjectionExpression, names, values, Limit):
+        if Limit is not None:
+            # DynamoDB applies the limit before the filter
+            items = items[:Limit]
+        if FilterExpression is not None:
+            condition = parse_condition(FilterExpression, names, values)
+            items = [item for item in items if condition(item)]
+        if ProjectionExpression:
+            paths = parse_projection(ProjectionExpression, names)
+            return [project(item, paths) for item in items]
+        return [copy.deepcopy(item) for item in items]
+
+    def query(self, KeyConditionExpression, IndexName: str = None, FilterExpression=None, ProjectionExpression: str = None,
+              ExpressionAttributeNames: dict = None, ExpressionAttributeValues: dict = None, ScanIndexForward: bool = True,
+              Limit: int = None, ConsistentRead: bool = False, **kwargs):
+        self.record("query")
+        hash_key, range_key = self.indexes[IndexName] if IndexName else (self.hash_key, self.range_key)
+        key_condition = parse_condition(KeyConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues, is_key_condition=True)
+        with self.database.lock:
+            # a GSI only holds the items that have its key attributes
+            items = [item for item in self.items.values()
+                     if hash_key in item and (range_key is None or range_key in item) and key_condition(item)]
+            if range_key is not None:
+                items.sort(key=lambda item: item[range_key], reverse=not ScanIndexForward)
+            selected = self._select(items, FilterExpression, ProjectionExpression, ExpressionAttributeNames, ExpressionAttributeValues, Limit)
+        return {"Items": selected, "Count": len(selected)}
+
+    def scan(self, FilterExpression=None, ProjectionExpression: str = None, ExpressionAttributeNames: dict = None,
+             ExpressionAttributeValues: dict = None, Segment: int = 0, TotalSegments: int = 1, Limit: int = None, **kwargs):
+        self.record("scan")
+        with self.database.lock:
+            items = [item for i, item in enumerate(self.items.values()) if i % TotalSegments == Segment]
+            selected = self._select(items, FilterExpression, ProjectionExpression, ExpressionAttributeNames, ExpressionAttributeValues, Limit)
+        return {"Items": selected, "Count": len(selected)}
+
+
+class FakeDynamoDB:
+    """
+    The tables of one fake account. latency_seconds is slept on every call, outside the lock,
+    so concurrent requests overlap the way they would against the service.
+    """
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.lock = threading.RLock()
+        self.client = FakeClient(self)
+        self.tables = {}
+        self.calls = Counter()
+
+    def create_table(self, name: str, hash_key: str, range_key: str = None, indexes: dict = None) -> FakeTable:
+        self.tables[name] = FakeTable(self, name, hash_key, range_key, indexes)
+        return self.tables[name]
+
+    def Table(self, name: str) -> FakeTable:
+        return self.tables[name]
+
+    def record(self, table_name: str, operation: str):
+        request_calls = REQUEST_CALLS.get()
+        with self.lock:
+            self.calls[(table_name, operation)] += 1
+            if request_calls is not None:
+                request_calls[operation] += 1
+        with span("dynamodb"):
+            if self.latency_seconds:
+                time.sleep(self.latency_seconds)
+
+    def call_count(self) -> int:
+        with self.lock:
+            return sum(self.calls.values())
@@ -0,0 +1,117 @@
+"""
+Stand-ins for the OpenAI and YouTube HTTP sessions, with configurable latency.
+
+They replace the requests.Session objects the layer calls (http_client.get_session(...)),
+so everything above the session (timeouts, retries, caching, parsing) runs unchanged.
+"""
+import hashlib
+import json
+import threading
+import time
+
+import requests # type: ignore
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, payload=None, headers: dict = None):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = headers or {}
+        self.text = json.dumps(payload) if payload is not None else ""
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error", response=self)
+
+
+class FakeSession:
+    """ Counts calls and sleeps latency_seconds on each one """
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _call(self):
+        with self._lock:
+            self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+
+class FakeOpenAI(FakeSession):
+    """
+    Answers chat completions with a categorization. category picks the answer ("true" or
+    "false"); status_code other than 200 makes every call fail with that status.
+    """
+
+    def __init__(self, latency_seconds: float = 0.0, category: str = "true", status_code: int = 200):
+        super().__init__(latency_seconds)
+        self.category = category
+        self.status_code = status_code
+
+    def post(self, url, headers=None, json=None, timeout=None, **kwargs):
+        self._call()
+        if self.status_code != 200:
+            return FakeResponse(self.status_code, {"error": {"message": "fake failure"}}, {"Retry-After": "0"})
+        content = {
+            "category": self.category,
+            "explanation": "The video matches the participant's focus categories.",
+            "explanation_summary": "Confidence: 80% | Key Evidence: title and category match the focus categories",
+        }
+        return FakeResponse(200, {
+            "choices": [{"message": {"content": _json_dumps(content)}}],
+            "usage": {"prompt_tokens": 1200, "completion_tokens": 60, "prompt_tokens_details": {"cached_tokens": 1024}},
+        })
+
+
+class FakeYouTube(FakeSession):
+    """
+    Answers videos.list. A video id listed in videos gets that snippet; any other id gets one
+    picked from SAMPLE_VIDEOS by a hash of the id, so the same id always looks the same.
+    """
+
+    SAMPLE_VIDEOS = [
+        {"title": "Complete JavaScript Course for Beginners", "channelTitle": "freeCodeCamp.org", "categoryId": "27"},
+        {"title": "Linear Algebra - Lecture 1", "channelTitle": "MIT OpenCourseWare", "categoryId": "27"},
+        {"title": "How Transistors Work", "channelTitle": "Veritasium", "categoryId": "28"},
+        {"title": "Top 10 Funniest Moments", "channelTitle": "Comedy Central", "categoryId": "23"},
+        {"title": "Minecraft Survival Let's Play #42", "channelTitle": "GamingWithJen", "categoryId": "20"},
+        {"title": "Official Music Video", "channelTitle": "VEVO", "categoryId": "10"},
+        {"title": "Morning Routine Vlog", "channelTitle": "Daily Vlogs", "categoryId": "22"},
+        {"title": "Breaking News Live", "channelTitle": "News Now", "categoryId": "25"},
+    ]
+
+    def __init__(self, latency_seconds: float = 0.0, videos: dict = None):
+        super().__init__(latency_seconds)
+        self.videos = videos or {}
+
+    def snippet(self, video_id: str) -> dict:
+        if video_id in self.videos:
+            return dict(self.videos[video_id])
+        index = int(hashlib.sha1(video_id.encode()).hexdigest(), 16) % len(self.SAMPLE_VIDEOS)
+        snippet = dict(self.SAMPLE_VIDEOS[index])
+        snippet["description"] = f"{snippet['title']} ({video_id})"
+        return snippet
+
+    def get(self, url, params=None, headers=None, timeout=None, **kwargs):
+        self._call()
+        video_id = (params or {}).get("id")
+        # like videos.list, If-None-Match is compared with the ETag of the whole response
+        etag = f'"list-{video_id}"'
+        if (headers or {}).get("If-None-Match") == etag:
+            return FakeResponse(304)
+        return FakeResponse(200, {"etag": etag, "items": [{
+            "id": video_id,
+            "etag": f'"{video_id}"',
+            "snippet": self.snippet(video_id),
+            "statistics": {"viewCount": "1000", "likeCount": "50"},
+        }]}, {"ETag": etag})
+
+
+def _json_dumps(value) -> str:
+    # the post() parameter named json shadows the module
+    return json.dumps(value)
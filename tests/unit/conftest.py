@@ -0,0 +1,10 @@
+import pytest
+
+# importing the harness makes focus_utils importable the way Lambda does and sets the
+# environment the layer reads at import time
+from tests.harness import load_handler
+
+
+@pytest.fixture()
+def app_loader():
+    return load_handler
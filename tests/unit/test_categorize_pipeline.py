@@ -0,0 +1,215 @@
+import json
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from focus_utils import llm, tables, youtube
+from focus_utils.queues import LocalQueue
+from tests.harness import make_participant_item
+
+IO_DELAY = 0.2
+CATEGORY_ID_TO_NAME = {"20": "Gaming", "27": "Education"}
+YOUTUBE_ITEM = {"id": "abc123", "snippet": {"title": "Complete JavaScript Course", "description": "Learn.", "categoryId": "27"}}
+
+
+def slow(value):
+    def call(*args, **kwargs):
+        time.sleep(IO_DELAY)
+        return value
+    return call
+
+
+@pytest.fixture()
+def categorize(app_loader, monkeypatch):
+    app = app_loader("categorize")
+
+    user_table = MagicMock()
+    user_table.get_item.side_effect = slow({"Item": make_participant_item(focus_categories=["Education"])})
+    user_table.update_item.side_effect = slow({"Attributes": make_participant_item(focus_categories=["Education"])})
+    pref_table = MagicMock()
+    pref_table.query.side_effect = slow({"Items": []})
+    pref_table.put_item.side_effect = slow({})
+    pref_table.update_item.return_value = {"Attributes": {}}
+    monkeypatch.setattr(tables, "user_table", user_table)
+    monkeypatch.setattr(tables, "user_pref_data_table", pref_table)
+
+    monkeypatch.setattr(app, "fetch_youtube_data", slow(YOUTUBE_ITEM))
+    get_categories = slow((set(CATEGORY_ID_TO_NAME.values()), CATEGORY_ID_TO_NAME))
+    monkeypatch.setattr(app, "get_cached_video_categories", get_categories)
+    monkeypatch.setattr(youtube, "get_cached_video_categories", lambda: (set(CATEGORY_ID_TO_NAME.values()), CATEGORY_ID_TO_NAME))
+    return app, pref_table
+
+
+def make_event():
+    return {"body": json.dumps({"prolificId": "participant-1", "newPreferenceData": {
+        "sessionId": "session-1",
+        "youTubeID": "abc123",
+        "timestamp": "2025-06-01T12:00:00.000Z",
+        "intentNode": json.dumps({"curr_intent_source": "/SearchPage", "curr_intent_data": "javascript"}),
+        "isSubscribed": False,
+    }})}
+
+
+def test_independent_io_overlaps(categorize):
+    app, pref_table = categorize
+
+    started = time.perf_counter()
+    response = app.lambda_handler(make_event(), None)
+    elapsed = time.perf_counter() - started
+
+    body = json.loads(response["body"])
+    assert response["statusCode"] == 200
+    assert body["metadata"]["decision_path"] == "rules:3"
+
+    stages = body["metadata"]["trace"]["stages"]
+    assert {"youtube", "categories", "user_load", "save", "history", "insert", "preprocess", "focus_update"} <= set(stages)
+    # youtube and categories only start once the user row says the id is known, alongside save/history
+    user_load_end = stages["user_load"]["start_ms"] + stages["user_load"]["duration_ms"]
+    assert all(user_load_end <= stages[name]["start_ms"] < user_load_end + IO_DELAY * 1000 / 2
+               for name in ("youtube", "categories", "save", "history"))
+    # in sequence: user_load + save/history + youtube + categories + insert = 5 delays;
+    # the critical path is user_load -> history -> insert (3 delays)
+    assert elapsed < IO_DELAY * 4.5
+
+    # the decision is only written after the row it updates was inserted
+    assert stages["focus_update"]["start_ms"] >= stages["insert"]["start_ms"] + stages["insert"]["duration_ms"]
+    item = pref_table.put_item.call_args.kwargs["Item"]
+    assert item["youTubeApiData"] == YOUTUBE_ITEM
+    assert item["focusMode_1"] is None
+
+
+def test_unknown_user_is_rejected(categorize, monkeypatch):
+    app, _ = categorize
+    monkeypatch.setattr(tables.user_table, "get_item", MagicMock(return_value={}))
+    fetch_youtube_data = MagicMock()
+    get_categories = MagicMock()
+    monkeypatch.setattr(app, "fetch_youtube_data", fetch_youtube_data)
+    monkeypatch.setattr(app, "get_cached_video_categories", get_categories)
+
+    response = app.lambda_handler(make_event(), None)
+
+    assert response["statusCode"] == 401
+    # no YouTube quota is spent on ids that aren't enrolled
+    fetch_youtube_data.assert_not_called()
+    get_categories.assert_not_called()
+
+
+def test_rate_limited_openai_falls_back_within_the_deadline(categorize, monkeypatch):
+    app, pref_table = categorize
+    monkeypatch.setattr(app, "decide_locally", lambda row: None)
+    monkeypatch.setattr(app, "get_cached_decision", lambda fingerprint: None)
+
+    rate_limited = MagicMock(status_code=429, headers={"Retry-After": "30"}, text="slow down")
+    openai_session = MagicMock()
+    openai_session.post.return_value = rate_limited
+    monkeypatch.setattr(llm, "get_session", lambda host: openai_session)
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = 10_000
+
+    started = time.perf_counter()
+    response = app.lambda_handler(make_event(), context)
+
+    body = json.loads(response["body"])
+    assert body["metadata"]["decision_path"] == "default"
+    assert body["result"]["category"] == "false"
+    # Retry-After: 30 doesn't fit in the 10s left, so there is no second attempt and no sleep
+    assert openai_session.post.call_count == 1
+    assert time.perf_counter() - started < 5
+    read_timeout = openai_session.post.call_args.kwargs["timeout"][1]
+    assert read_timeout <= 10
+    assert pref_table.update_item.call_args.kwargs["ExpressionAttributeValues"][":decision_path"] == "default"
+
+
+MODEL_RESULT = {"category": "focus", "explanation": "A programming course.", "explanation_summary": "Confidence: 90% | Key Evidence: course"}
+
+
+def openai_answer():
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"choices": [{"message": {"content": json.dumps(MODEL_RESULT)}}], "usage": None}
+    session = MagicMock()
+    session.post.return_value = response
+    return session
+
+
+def test_async_categorize_is_queued_and_decided_by_the_worker(categorize, app_loader, monkeypatch):
+    app, pref_table = categorize
+    worker = app_loader("categorizeWorker")
+    queue = LocalQueue()
+    monkeypatch.setattr(app, "get_categorize_job_queue", lambda: queue)
+    monkeypatch.setattr(app, "decide_locally", lambda row: None)
+    monkeypatch.setattr(app, "get_cached_decision", lambda fingerprint: None)
+    openai_session = openai_answer()
+    monkeypatch.setattr(llm, "get_session", lambda host: openai_session)
+    event = make_event()
+    event["body"] = json.dumps(dict(json.loads(event["body"]), **{"async": True}))
+
+    response = app.lambda_handler(event, None)
+
+    body = json.loads(response["body"])
+    assert response["statusCode"] == 202
+    assert body["status"] == "pending"
+    assert body["jobId"] == pref_table.put_item.call_args.kwargs["Item"]["Id"]
+    openai_session.post.assert_not_called()
+    pref_table.update_item.assert_not_called()
+
+    pref_table.get_item.return_value = {"Item": {"Id": body["jobId"]}}
+    result = worker.lambda_handler({"Records": queue.receive()}, None)
+
+    assert result == {"batchItemFailures": []}
+    assert openai_session.post.call_count == 1
+    update_kwargs = pref_table.update_item.call_args_list[0].kwargs
+    assert update_kwargs["Key"] == {"prolificId": "participant-1", "Id": body["jobId"]}
+    assert update_kwargs["ExpressionAttributeValues"][":decision_path"] == "llm"
+    assert update_kwargs["ExpressionAttributeValues"][":result"] == MODEL_RESULT
+
+
+def test_async_categorize_without_a_queue_answers_synchronously(categorize, monkeypatch):
+    app, _ = categorize
+    monkeypatch.setattr(app, "decide_locally", lambda row: None)
+    monkeypatch.setattr(app, "get_cached_decision", lambda fingerprint: None)
+    monkeypatch.setattr(llm, "get_session", lambda host: openai_answer())
+    event = make_event()
+    event["body"] = json.dumps(dict(json.loads(event["body"]), **{"async": True}))
+
+    response = app.lambda_handler(event, None)
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["result"] == MODEL_RESULT
+
+
+def test_worker_skips_a_redelivered_job(categorize, app_loader, monkeypatch):
+    _, pref_table = categorize
+    worker = app_loader("categorizeWorker")
+    openai_session = openai_answer()
+    monkeypatch.setattr(llm, "get_session", lambda host: openai_session)
+    pref_table.get_item.return_value = {"Item": {"Id": "entry-1", "focus": "focus", "decisionPath": "llm", "categorizeResult": MODEL_RESULT}}
+    queue = LocalQueue()
+    queue.send({"jobId": "entry-1", "prolificId": "participant-1", "entry": {}, "promptData": {}, "fingerprint": "f"})
+
+    assert worker.lambda_handler({"Records": queue.receive()}, None) == {"batchItemFailures": []}
+    openai_session.post.assert_not_called()
+    pref_table.update_item.assert_not_called()
+
+
+def test_status_endpoint_long_polls_until_the_job_is_done(categorize, app_loader, monkeypatch):
+    _, pref_table = categorize
+    status = app_loader("categorizeStatus")
+    monkeypatch.setattr(status, "CATEGORIZE_STATUS_POLL_SECONDS", 0.01)
+    pending = {"Item": {"Id": "entry-1"}}
+    done = {"Item": {"Id": "entry-1", "focus": "focus", "decisionPath": "llm", "categorizeResult": MODEL_RESULT}}
+    pref_table.get_item.side_effect = [pending, pending, done]
+
+    response = status.lambda_handler({"queryStringParameters": {"id": "participant-1", "jobId": "entry-1", "wait": "2"}}, None)
+
+    assert json.loads(response["body"]) == {"jobId": "entry-1", "status": "done", "result": MODEL_RESULT, "decision_path": "llm"}
+    assert pref_table.get_item.call_args.kwargs["ConsistentRead"] is True
+
+    pref_table.get_item.side_effect = None
+    pref_table.get_item.return_value = pending
+    response = status.lambda_handler({"queryStringParameters": {"id": "participant-1", "jobId": "entry-1"}}, None)
+    assert json.loads(response["body"]) == {"jobId": "entry-1", "status": "pending"}
+
+    pref_table.get_item.return_value = {}
+    response = status.lambda_handler({"queryStringParameters": {"id": "participant-1", "jobId": "missing"}}, None)
+    assert response["statusCode"] == 404
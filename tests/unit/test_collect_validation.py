@@ -0,0 +1,93 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from focus_utils import tables
+from focus_utils.schema import DataTypeValidator, compile_data_types
+
+DAILY_SURVEY = {
+    "prolificId": "participant-1",
+    "timestamp": "2025-06-01T12:00:00.000Z",
+    "stage": 1,
+    "type": "daily_survey",
+    "distraction": 3,
+    "enjoyment": 4,
+    "userAgency": 5,
+}
+
+
+def test_all_field_errors_are_reported_in_order():
+    validator = DataTypeValidator("survey", {"prolificId": "string", "stage": "int", "score": "float", "done": "bool"})
+
+    errors = validator.validate({"prolificId": 7, "score": 1.5, "done": "yes"})
+
+    assert errors == [
+        "Invalid value type for value: prolificId. Should be string",
+        "Missing the value: stage",
+        "Invalid value type for value: done. Should be bool",
+    ]
+
+
+def test_optional_values_may_be_missing_but_are_type_checked():
+    validator = DataTypeValidator("survey", {"comment": "string?"})
+
+    assert validator.validate({}) == []
+    assert validator.validate({"comment": "ok"}) == []
+    assert validator.validate({"comment": 3}) == ["Invalid value type for value: comment. Should be string?"]
+
+
+def test_unknown_value_types_fail_at_compile_time():
+    with pytest.raises(ValueError, match="survey.when"):
+        compile_data_types({"survey": {"when": "date"}})
+
+
+@pytest.fixture()
+def collect(app_loader, monkeypatch):
+    app = app_loader("collect")
+    user_context = MagicMock()
+    user_context.check_id.return_value = None
+    user_context.touch_and_advance.return_value = ({"current_stage": 1}, "ok")
+    monkeypatch.setattr(app, "UserContext", lambda id: user_context)
+    table = MagicMock()
+    for name in tables.DATA_TYPE_TABLES.values():
+        monkeypatch.setattr(tables, name, table)
+    return app, table
+
+
+def post(app, body):
+    response = app.lambda_handler({"body": json.dumps(body)}, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_data_types_yaml_is_compiled_once(collect, monkeypatch):
+    app, table = collect
+    monkeypatch.setattr(app.yaml, "safe_load", MagicMock(side_effect=AssertionError("yaml parsed per request")))
+
+    status, body = post(app, DAILY_SURVEY)
+
+    assert status == 200
+    assert set(app.DATA_TYPE_VALIDATORS) == {"daily_survey", "post_stage_survey", "post_study_survey", "post_stage_rating_survey"}
+    assert table.put_item.call_count == 1
+
+
+def test_invalid_body_returns_every_error(collect):
+    app, table = collect
+    survey = dict(DAILY_SURVEY, stage="1")
+    del survey["enjoyment"]
+
+    status, body = post(app, survey)
+
+    assert status == 400
+    assert body["message"] == "Invalid value type for value: stage. Should be int"
+    assert body["errors"] == [body["message"], "Missing the value: enjoyment"]
+    table.put_item.assert_not_called()
+
+
+def test_unknown_data_type(collect):
+    app, _ = collect
+
+    status, body = post(app, dict(DAILY_SURVEY, type="weekly_survey"))
+
+    assert status == 400
+    assert body["message"] == "The data type key, weekly_survey, is not a valid data type"
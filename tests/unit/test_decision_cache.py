@@ -0,0 +1,82 @@
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from focus_utils import decisions, tables
+
+ROW = {
+    "title": "Complete JavaScript Course for Beginners",
+    "description": "Learn everything from variables to DOM manipulation.",
+    "video_category": "Gaming",
+    "categoryId_1": "Gaming", "focusMode_1": "false",
+    "categoryId_2": "Music", "focusMode_2": "false",
+    "categoryId_3": "Unknown", "focusMode_3": None,
+    "isSubscribed": True,
+    "curr_intent_source": "/SearchPage",
+    "focus_categories": ["Education"],
+}
+RESULT = {"category": "true", "explanation": "Course content.", "explanation_summary": "Confidence: 80% | Key Evidence: course", "rule": [True]}
+
+
+@pytest.fixture(autouse=True)
+def decision_cache(monkeypatch):
+    decisions.reset_decision_cache()
+    monkeypatch.setattr(tables, "decision_cache_table", None)
+    yield
+    decisions.reset_decision_cache()
+
+
+def test_fingerprint_ignores_fields_the_prompt_does_not_use():
+    replayed = dict(ROW, timestamp="2025-03-02T00:00:00Z", videoWatchTime=42, description=ROW["description"])
+
+    assert decisions.get_decision_fingerprint(replayed) == decisions.get_decision_fingerprint(ROW)
+    assert decisions.get_decision_fingerprint(dict(ROW, focusMode_1="true")) != decisions.get_decision_fingerprint(ROW)
+    assert decisions.get_decision_fingerprint(dict(ROW, focus_categories=["Music"])) != decisions.get_decision_fingerprint(ROW)
+
+
+def test_memory_hit_returns_a_copy_of_the_stored_fields():
+    fingerprint = decisions.get_decision_fingerprint(ROW)
+    assert decisions.get_cached_decision(fingerprint) is None
+
+    decisions.remember_decision(fingerprint, RESULT)
+    cached = decisions.get_cached_decision(fingerprint)
+    cached["category"] = "false"
+
+    assert decisions.get_cached_decision(fingerprint) == {k: RESULT[k] for k in decisions.DECISION_RESULT_FIELDS}
+    stats = decisions.get_decision_cache_stats()
+    assert (stats["memory_hits"], stats["misses"], stats["hit_ratio"]) == (2, 1, pytest.approx(2 / 3, abs=1e-4))
+
+
+def test_table_is_shared_between_containers(monkeypatch):
+    table = MagicMock()
+    monkeypatch.setattr(tables, "decision_cache_table", table)
+    fingerprint = decisions.get_decision_fingerprint(ROW)
+
+    decisions.remember_decision(fingerprint, RESULT)
+    stored = table.put_item.call_args.kwargs["Item"]
+    assert stored["expires_at"] == stored["decided_at"] + decisions.DECISION_CACHE_TTL_SECONDS
+
+    # a fresh container only has the table
+    decisions.reset_decision_cache()
+    table.get_item.return_value = {"Item": stored}
+    assert decisions.get_cached_decision(fingerprint)["category"] == "true"
+    assert decisions.decision_cache_stats["table_hits"] == 1
+
+
+def test_expired_entries_are_misses(monkeypatch):
+    fingerprint = decisions.get_decision_fingerprint(ROW)
+    decisions.remember_decision(fingerprint, RESULT)
+
+    monkeypatch.setattr(time, "time", lambda: 10 ** 12)
+
+    assert decisions.get_cached_decision(fingerprint) is None
+
+
+def test_table_errors_fall_back_to_a_miss(monkeypatch):
+    table = MagicMock()
+    table.get_item.side_effect = Exception("throttled")
+    monkeypatch.setattr(tables, "decision_cache_table", table)
+
+    assert decisions.get_cached_decision("missing") is None
+    assert decisions.decision_cache_stats["misses"] == 1
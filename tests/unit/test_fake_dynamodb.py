@@ -0,0 +1,93 @@
+from decimal import Decimal
+
+import pytest
+from boto3.dynamodb.conditions import Attr, Key # type: ignore
+from botocore.exceptions import ClientError # type: ignore
+
+from tests.harness.dynamodb import FakeDynamoDB
+
+
+@pytest.fixture()
+def database():
+    database = FakeDynamoDB()
+    database.create_table("users", "User_Id")
+    database.create_table("entries", "prolificId", "Id", {"SessionIndex": ("sessionKey", "sessionTimestamp")})
+    return database
+
+
+def test_update_expressions(database):
+    table = database.Table("users")
+    table.put_item(Item={"User_Id": "u", "Times": {"1": 5}, "Stages": [1], "Old": True})
+
+    response = table.update_item(
+        Key={"User_Id": "u"},
+        UpdateExpression="SET #t.#one = if_not_exists(#t.#one, :zero) + :d, #t.#two = if_not_exists(#t.#two, :zero) + :d, "
+                         "Stages = list_append(Stages, :more) REMOVE Old ADD Visits :d",
+        ConditionExpression="attribute_exists(User_Id) AND attribute_not_exists(Keys)",
+        ExpressionAttributeNames={"#t": "Times", "#one": "1", "#two": "2"},
+        ExpressionAttributeValues={":zero": 0, ":d": 10, ":more": [2]},
+        ReturnValues="ALL_NEW",
+    )
+
+    assert response["Attributes"] == {"User_Id": "u", "Times": {"1": 15, "2": 10}, "Stages": [1, 2], "Visits": 10}
+    assert isinstance(response["Attributes"]["Visits"], Decimal)
+
+
+def test_failed_condition_leaves_the_item(database):
+    table = database.Table("users")
+    table.put_item(Item={"User_Id": "u", "Current_Stage": 1})
+
+    with pytest.raises(ClientError) as error:
+        table.update_item(
+            Key={"User_Id": "u"}, UpdateExpression="SET Current_Stage = :new",
+            ConditionExpression="Current_Stage = :previous", ExpressionAttributeValues={":new": 3, ":previous": 2},
+        )
+
+    assert error.value.response["Error"]["Code"] == "ConditionalCheckFailedException"
+    assert table.get_item(Key={"User_Id": "u"})["Item"]["Current_Stage"] == 1
+
+
+def test_values_are_stored_like_boto3(database):
+    table = database.Table("users")
+
+    with pytest.raises(TypeError):
+        table.put_item(Item={"User_Id": "u", "watchTime": 1.5})
+    table.put_item(Item={"User_Id": "u", "watchTime": Decimal("1.5"), "stage": 2})
+
+    assert table.get_item(Key={"User_Id": "u"})["Item"] == {"User_Id": "u", "watchTime": Decimal("1.5"), "stage": Decimal(2)}
+    assert table.get_item(Key={"User_Id": "nobody"}) == {}
+
+
+def test_query_on_an_index(database):
+    table = database.Table("entries")
+    for i in range(5):
+        table.put_item(Item={"prolificId": "p", "Id": str(i), "sessionKey": "p#s", "sessionTimestamp": f"t{i}",
+                             "focus": i % 2 == 0, "youTubeApiData": {"snippet": {"categoryId": str(i), "title": "x"}}})
+    table.put_item(Item={"prolificId": "p", "Id": "no-index"})
+
+    response = table.query(
+        IndexName="SessionIndex", KeyConditionExpression=Key("sessionKey").eq("p#s"),
+        ProjectionExpression="#f, #y.#s.#c",
+        ExpressionAttributeNames={"#f": "focus", "#y": "youTubeApiData", "#s": "snippet", "#c": "categoryId"},
+        ScanIndexForward=False, Limit=3,
+    )
+    filtered = table.query(KeyConditionExpression=Key("prolificId").eq("p") & Key("Id").begins_with("1"), FilterExpression=Attr("focus").eq(False))
+
+    assert response["Items"] == [
+        {"focus": True, "youTubeApiData": {"snippet": {"categoryId": "4"}}},
+        {"focus": False, "youTubeApiData": {"snippet": {"categoryId": "3"}}},
+        {"focus": True, "youTubeApiData": {"snippet": {"categoryId": "2"}}},
+    ]
+    assert [item["Id"] for item in filtered["Items"]] == ["1"]
+
+
+def test_batch_write_and_call_counts(database):
+    table = database.Table("entries")
+    requests = [{"PutRequest": {"Item": {"prolificId": "p", "Id": str(i)}}} for i in range(3)]
+
+    table.meta.client.batch_write_item(RequestItems={"entries": requests})
+    with pytest.raises(ClientError):
+        table.meta.client.batch_write_item(RequestItems={"entries": requests + requests[:1]})
+
+    assert len(table.items) == 3
+    assert database.calls[("entries", "batch_write_item")] == 2
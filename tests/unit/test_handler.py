@@ -1,72 +1,179 @@
+import importlib.util
 import json
+import logging
+import os
 
 import pytest
 
-from hello_world import app
+from tests.harness import ROOT_DIR, HandlerHarness
 
 
 @pytest.fixture()
-def apigw_event():
-    """ Generates API GW Event"""
-
-    return {
-        "body": '{ "test": "body"}',
-        "resource": "/{proxy+}",
-        "requestContext": {
-            "resourceId": "123456",
-            "apiId": "1234567890",
-            "resourcePath": "/{proxy+}",
-            "httpMethod": "POST",
-            "requestId": "c6af9ac6-7b61-11e6-9a41-93e8deadbeef",
-            "accountId": "123456789012",
-            "identity": {
-                "apiKey": "",
-                "userArn": "",
-                "cognitoAuthenticationType": "",
-                "caller": "",
-                "userAgent": "Custom User Agent String",
-                "user": "",
-                "cognitoIdentityPoolId": "",
-                "cognitoIdentityId": "",
-                "cognitoAuthenticationProvider": "",
-                "sourceIp": "127.0.0.1",
-                "accountId": "",
-            },
-            "stage": "prod",
-        },
-        "queryStringParameters": {"foo": "bar"},
-        "headers": {
-            "Via": "1.1 08f323deadbeefa7af34d5feb414ce27.cloudfront.net (CloudFront)",
-            "Accept-Language": "en-US,en;q=0.8",
-            "CloudFront-Is-Desktop-Viewer": "true",
-            "CloudFront-Is-SmartTV-Viewer": "false",
-            "CloudFront-Is-Mobile-Viewer": "false",
-            "X-Forwarded-For": "127.0.0.1, 127.0.0.2",
-            "CloudFront-Viewer-Country": "US",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Upgrade-Insecure-Requests": "1",
-            "X-Forwarded-Port": "443",
-            "Host": "1234567890.execute-api.us-east-1.amazonaws.com",
-            "X-Forwarded-Proto": "https",
-            "X-Amz-Cf-Id": "aaaaaaaaaae3VYQb9jd-nvCd-de396Uhbp027Y2JvkCPNLmGJHqlaA==",
-            "CloudFront-Is-Tablet-Viewer": "false",
-            "Cache-Control": "max-age=0",
-            "User-Agent": "Custom User Agent String",
-            "CloudFront-Forwarded-Proto": "https",
-            "Accept-Encoding": "gzip, deflate, sdch",
-        },
-        "pathParameters": {"proxy": "/examplepath"},
-        "httpMethod": "POST",
-        "stageVariables": {"baz": "qux"},
-        "path": "/examplepath",
-    }
-
-
-def test_lambda_handler(apigw_event):
-
-    ret = app.lambda_handler(apigw_event, "")
-    data = json.loads(ret["body"])
-
-    assert ret["statusCode"] == 200
-    assert "message" in ret["body"]
-    assert data["message"] == "hello world"
+def harness():
+    with HandlerHarness() as harness:
+        harness.add_participant("participant-1")
+        harness.dynamodb.calls.clear()
+        yield harness
+
+
+def post(body: dict) -> dict:
+    return {"body": json.dumps(body)}
+
+
+def categorize_event(video_id="abc123", timestamp="2025-06-01T12:00:00.000Z", **extra) -> dict:
+    return post({"prolificId": "participant-1", **extra, "newPreferenceData": {
+        "sessionId": "session-1",
+        "youTubeID": video_id,
+        "timestamp": timestamp,
+        "intentNode": json.dumps({"curr_intent_source": "/SearchPage", "curr_intent_data": "lofi music"}),
+        "isSubscribed": False,
+    }})
+
+
+def test_onboard_creates_then_updates_the_user(harness):
+    onboard = harness.load_handler("onboard")
+    event = {"queryStringParameters": {"id": "participant-2", "focusmode_categories": "Education;Music"}}
+
+    first = onboard.lambda_handler(event, None)
+    event["queryStringParameters"]["focusmode_categories"] = "Gaming"
+    second = onboard.lambda_handler(event, None)
+
+    assert first["statusCode"] == 200
+    assert second["statusCode"] == 208
+    assert json.loads(second["body"])["data"]["current_stage"] == json.loads(first["body"])["data"]["current_stage"]
+    item = harness.tables["user_table"].get_item(Key={"User_Id": "participant-2"})["Item"]
+    assert item["FocusMode_Categories"] == ["Gaming"]
+    assert sorted(item["Stage_Order_List"]) == [1, 2, 3, 4]
+
+
+def test_stage_reports_the_current_stage(harness):
+    stage = harness.load_handler("stage")
+
+    response = stage.lambda_handler({"queryStringParameters": {"id": "participant-1"}}, None)
+    unknown = stage.lambda_handler({"queryStringParameters": {"id": "nobody"}}, None)
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["Stage_Status"]["current_stage"] == 1
+    assert unknown["statusCode"] == 401
+    # one read and one write of the user row, and one read for the unknown id
+    assert harness.dynamodb.call_count() == 3
+
+
+def test_stage_closes_a_finished_study(harness):
+    stage = harness.load_handler("stage")
+    harness.add_participant("participant-3", stage_order=[2, 1, 3, 4], start="2025-01-01T00:00:00")
+
+    response = stage.lambda_handler({"queryStringParameters": {"id": "participant-3"}}, None)
+
+    assert json.loads(response["body"])["Stage_Status"]["is_study_completed"] is True
+    item = harness.tables["user_table"].get_item(Key={"User_Id": "participant-3"})["Item"]
+    assert item["User_Completed_Stages"] == [2]
+
+
+def test_collect_saves_valid_responses_only(harness):
+    collect = harness.load_handler("collect")
+    body = {"prolificId": "participant-1", "type": "daily_survey", "timestamp": "2025-06-01T12:00:00.000Z",
+            "stage": 1, "distraction": 2, "enjoyment": 4, "userAgency": 3}
+
+    saved = collect.lambda_handler(post(body), None)
+    invalid = collect.lambda_handler(post({**body, "enjoyment": "a lot"}), None)
+
+    assert saved["statusCode"] == 200
+    assert invalid["statusCode"] == 400
+    items = list(harness.tables["daily_survey_data_table"].items.values())
+    assert len(items) == 1
+    assert items[0]["enjoyment"] == 4
+
+
+def test_watch_time_deltas_add_up_once_per_key(harness):
+    update_watch_time = harness.load_handler("updateWatchTime")
+
+    for key in ("tick-1", "tick-2", "tick-1"):
+        response = update_watch_time.lambda_handler(post({"prolificId": "participant-1", "stage": 2, "watchTimeDelta": 15, "idempotencyKey": key}), None)
+        assert response["statusCode"] == 200
+    absolute = update_watch_time.lambda_handler(post({"prolificId": "participant-1", "stage": 3, "watchTime": 120}), None)
+
+    assert absolute["statusCode"] == 200
+    item = harness.tables["user_table"].get_item(Key={"User_Id": "participant-1"})["Item"]
+    assert item["StageWatchTimes"] == {"1": 0, "2": 30, "3": 120, "4": 0}
+    assert item["Watch_Time_Idempotency_Keys"] == ["tick-1", "tick-2"]
+
+
+def test_video_records_are_written_in_one_batch(harness):
+    video_record_log = harness.load_handler("videoRecordLog")
+    records = [{"youTubeID": f"video{i}", "event": "play"} for i in range(12)]
+
+    response = video_record_log.lambda_handler(post({"prolificId": "participant-1", "records": records}), None)
+
+    assert response["statusCode"] == 200
+    assert len(harness.tables["video_record_log_table"].items) == 12
+    assert sum(count for (_, operation), count in harness.dynamodb.calls.items() if operation == "batch_write_item") == 1
+
+
+def test_categorize_records_the_model_decision(harness, monkeypatch):
+    categorize = harness.load_handler("categorize")
+    monkeypatch.setattr(categorize, "decide_locally", lambda row: None)
+
+    response = categorize.lambda_handler(categorize_event(), None)
+
+    body = json.loads(response["body"])
+    assert response["statusCode"] == 200
+    assert body["metadata"]["decision_path"] == "llm"
+    assert harness.openai.calls == 1
+    (row,) = harness.tables["user_pref_data_table"].items.values()
+    assert row["decisionPath"] == "llm"
+    assert row["youTubeApiData"]["snippet"] == harness.youtube.snippet("abc123")
+    user = harness.tables["user_table"].get_item(Key={"User_Id": "participant-1"})["Item"]
+    assert user["Recent_Decisions"]["session-1"][0]["entryId"] == row["Id"]
+
+
+def test_queued_requests_are_written_by_the_consumers(monkeypatch):
+    with HandlerHarness(queued=True) as harness:
+        harness.add_participant("participant-1")
+        update_watch_time = harness.load_handler("updateWatchTime")
+        categorize = harness.load_handler("categorize")
+        categorize_status = harness.load_handler("categorizeStatus")
+        monkeypatch.setattr(categorize, "decide_locally", lambda row: None)
+
+        for key in ("tick-1", "tick-2"):
+            response = update_watch_time.lambda_handler(post({"prolificId": "participant-1", "stage": 1, "watchTimeDelta": 10, "idempotencyKey": key}), None)
+            assert response["statusCode"] == 202
+        queued = categorize.lambda_handler(categorize_event(**{"async": True}), None)
+        assert queued["statusCode"] == 202
+        assert harness.openai.calls == 0
+
+        assert harness.drain() == {"watchTimeConsumer": [], "categorizeWorker": []}
+        item = harness.tables["user_table"].get_item(Key={"User_Id": "participant-1"})["Item"]
+        assert item["StageWatchTimes"]["1"] == 20
+        status = categorize_status.lambda_handler({"queryStringParameters": {
+            "id": "participant-1", "jobId": json.loads(queued["body"])["jobId"]
+        }}, None)
+        assert json.loads(status["body"])["status"] == "done"
+        assert harness.openai.calls == 1
+
+
+def test_load_driver_reports_every_handler(capsys):
+    spec = importlib.util.spec_from_file_location("load", os.path.join(ROOT_DIR, "benchmarks", "load.py"))
+    load = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(load)
+
+    report = load.run_load(requests=120, participants=5, concurrency=4, dynamodb_latency=0, openai_latency=0, youtube_latency=0)
+
+    assert set(report["handlers"]) == set(load.HANDLERS)
+    assert report["total"]["requests"] == 120
+    assert not [status for status in report["total"]["statuses"] if status.startswith("error")]
+    # every request reads the user row at least once
+    assert all(row["dynamodb_calls_per_request"] >= 1 for row in report["handlers"].values())
+
+
+def test_categorize_emits_dependency_metrics(harness, monkeypatch, caplog):
+    categorize = harness.load_handler("categorize")
+    monkeypatch.setattr(categorize, "decide_locally", lambda row: None)
+    caplog.set_level(logging.INFO, logger="focus_utils.tracing")
+
+    categorize.lambda_handler(categorize_event(), None)
+
+    documents = [record.__dict__ for record in caplog.records if record.getMessage() == "metrics"]
+    assert {document["Dependency"] for document in documents if "Dependency" in document} == {"dynamodb", "youtube", "openai"}
+    assert documents[0]["Service"] == "categorize"
+    assert documents[0]["VideoMetadataCacheMisses"] == 1
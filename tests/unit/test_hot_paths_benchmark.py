@@ -0,0 +1,53 @@
+import importlib.util
+import os
+
+import pytest
+
+from focus_utils import youtube
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+@pytest.fixture()
+def hot_paths(monkeypatch):
+    spec = importlib.util.spec_from_file_location("hot_paths", os.path.join(ROOT_DIR, "benchmarks", "hot_paths.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    categories = youtube.load_video_category_snapshot()
+    monkeypatch.setattr(youtube, "get_cached_video_categories", lambda: categories)
+    return module
+
+
+def results(calibration_us=1.0, **us_per_call):
+    return {
+        "python": "3.12", "machine": "test", "calibration_us_per_call": calibration_us,
+        "benchmarks": {name: {"us_per_call": us, "relative": us / calibration_us} for name, us in us_per_call.items()},
+    }
+
+
+def test_every_case_runs_on_the_sample_events(hot_paths):
+    cases = hot_paths.make_cases()
+
+    assert {"build_prompt", "preprocess_video_json_entry", "flatten_dict", "expand_intent_node_record",
+            "get_current_study_stage", "is_study_over", "collect_validation"} <= set(cases)
+    outputs = {name: case() for name, case in cases.items()}
+    assert "Complete JavaScript Course for Beginners" in outputs["build_prompt"]
+    assert outputs["preprocess_video_json_entry"]["video_category"] == "Education"
+    assert outputs["get_current_study_stage"] == 4
+    assert outputs["collect_validation"] == []
+
+
+def test_compare_reports_only_slowdowns_over_the_threshold(hot_paths, capsys):
+    baseline = results(build_prompt=50.0, flatten_dict=10.0, is_study_over=3.0)
+    current = results(build_prompt=70.0, flatten_dict=12.0, is_study_over=1.0, collect_validation=1.0)
+
+    assert hot_paths.compare(baseline, current, threshold=0.25) == ["build_prompt"]
+    assert "REGRESSION" in capsys.readouterr().out
+
+
+def test_a_slower_host_is_not_a_regression(hot_paths):
+    baseline = results(build_prompt=50.0, collect_validation=0.8)
+    # everything, the calibration loop included, takes 60% longer
+    current = results(calibration_us=1.6, build_prompt=80.0, collect_validation=1.28)
+
+    assert hot_paths.compare(baseline, current, threshold=0.25) == []
@@ -0,0 +1,116 @@
+import logging
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from focus_utils import http_client
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def server():
+    http_client.reset_sessions()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"localhost:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+    http_client.reset_sessions()
+
+
+def test_session_is_reused_per_host():
+    assert http_client.get_session("example.com") is http_client.get_session("example.com")
+    assert http_client.get_session("example.com") is not http_client.get_session("example.org")
+    http_client.reset_sessions()
+
+
+def test_warm_requests_reuse_the_connection(server, caplog):
+    session = http_client.get_session(server.split(":")[0])
+
+    with caplog.at_level(logging.INFO, logger=http_client.__name__):
+        first = session.get(f"http://{server}/")
+        second = session.get(f"http://{server}/")
+
+    assert first.json() == {"ok": True}
+    assert first.timings["new_connection"] is True
+    assert {"dns_ms", "connect_ms", "tls_ms", "ttfb_ms", "total_ms"} <= set(first.timings)
+    assert second.timings["new_connection"] is False
+    assert "dns_ms" not in second.timings
+    assert http_client.http_timing_stats["localhost"] == {"requests": 2, "new_connections": 1}
+
+    logged = [record.http_timing for record in caplog.records if hasattr(record, "http_timing")]
+    assert [timing["new_connection"] for timing in logged] == [True, False]
+    assert logged[0]["host"] == "localhost" and logged[0]["status"] == 200
+
+
+def test_the_next_address_is_tried_when_the_first_refuses(server):
+    port = int(server.split(":")[1])
+    # nothing listens on 127.0.0.2, the server is bound to 127.0.0.1 only
+    addresses = [
+        (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.2", port)),
+        (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", port)),
+    ]
+    real_getaddrinfo = socket.getaddrinfo
+
+    def getaddrinfo(host, *args, **kwargs):
+        return addresses if host == "localhost" else real_getaddrinfo(host, *args, **kwargs)
+
+    session = http_client.get_session("localhost")
+
+    with patch.object(http_client.socket, "getaddrinfo", side_effect=getaddrinfo):
+        response = session.get(f"http://{server}/")
+
+    assert response.json() == {"ok": True}
+    assert response.timings["new_connection"] is True
+
+
+def test_timing_stats_are_counted_from_many_threads():
+    http_client.reset_sessions()
+    request = SimpleNamespace(url="https://example.com/", method="GET")
+    response = SimpleNamespace(status_code=200, raw=None)
+
+    def log_many():
+        for _ in range(200):
+            http_client._log_timings(request, response, {"new_connection": False})
+
+    threads = [threading.Thread(target=log_many) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert http_client.http_timing_stats["example.com"] == {"requests": 1600, "new_connections": 0}
+    http_client.reset_sessions()
+
+
+def test_host_timeout_is_applied_when_none_is_given():
+    session = http_client.get_session(http_client.OPENAI_API_HOST)
+    adapter = session.get_adapter(f"https://{http_client.OPENAI_API_HOST}/v1/chat/completions")
+
+    with patch("requests.adapters.HTTPAdapter.send", side_effect=RuntimeError("stop")) as send:
+        with pytest.raises(RuntimeError):
+            session.post(f"https://{http_client.OPENAI_API_HOST}/v1/chat/completions", json={})
+
+    assert isinstance(adapter, http_client.TimedHTTPAdapter)
+    assert send.call_args.kwargs["timeout"] == http_client.HOST_SETTINGS[http_client.OPENAI_API_HOST]["timeout"]
+    assert adapter.max_retries.read == 0
+    http_client.reset_sessions()
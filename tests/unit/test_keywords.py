@@ -0,0 +1,47 @@
+import pytest
+
+from focus_utils.keywords import KeywordMatcher, get_keyword_matcher, tokenize
+
+
+def test_phrases_and_word_boundaries():
+    matcher = KeywordMatcher(["music video", "cat", "test drive", "song"])
+
+    hits = matcher.find("Official Music Video (4K)", "The cat's test drive: a song, about categories")
+
+    assert hits == ["music video", "test drive", "song"]
+
+
+def test_punctuation_inside_keywords():
+    matcher = KeywordMatcher(["let's play", "stand-up", "Q&A", "#shorts", "sci-fi"])
+
+    hits = matcher.find("Let's Play: episode 1 #shorts", "Stand-up comedy and a Q&A about sci-fi.")
+
+    assert hits == ["let's play", "#shorts", "stand-up", "q&a", "sci-fi"]
+
+
+def test_hits_are_unique_and_in_order_of_appearance():
+    matcher = KeywordMatcher(["course", "lecture"])
+
+    assert matcher.find("Lecture 3 of the course", "course notes, lecture slides") == ["lecture", "course"]
+
+
+def test_overlapping_phrases_all_match():
+    matcher = KeywordMatcher(["film", "short film", "film festival"])
+
+    assert matcher.find("A short film festival") == ["short film", "film", "film festival"]
+
+
+def test_matcher_is_memoized_per_category_combination():
+    first = get_keyword_matcher(["Education", "Music"])
+
+    assert get_keyword_matcher(["Music", "education", "Music"]) is first
+    assert get_keyword_matcher(["Education"]) is not first
+
+
+@pytest.mark.parametrize("category", ["Howto and Style", "Howto & Style"])
+def test_normalized_category_names_find_their_keywords(category):
+    assert get_keyword_matcher([category]).find("Easy DIY shelf") == ["diy"]
+
+
+def test_tokenize():
+    assert tokenize("Hello, World! It's 2024 #shorts") == ["hello", "world", "it's", "2024", "#shorts"]
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+HEAVY_MODULES = ["boto3", "googleapiclient", "pandas", "requests"]
+
+
+def imported_modules(code: str) -> set:
+    """ Runs code in a fresh interpreter (a cold start) and returns which heavy modules it loaded """
+    check = f"{code}\nimport sys\nprint(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    env = dict(os.environ, PYTHONPATH=os.path.join(ROOT_DIR, "utils_layer"))
+    output = subprocess.run([sys.executable, "-c", check], env=env, capture_output=True, text=True, check=True).stdout
+    return set(filter(None, output.strip().split(",")))
+
+
+def test_importing_the_layer_loads_nothing_heavy():
+    assert imported_modules("import focus_utils") == set()
+
+
+def test_stage_logic_does_not_load_youtube_or_pandas():
+    assert imported_modules("from focus_utils import UserContext, check_query_parameters, decimal_to_int") == set()
+
+
+def test_tables_are_created_on_first_use():
+    assert imported_modules("from focus_utils import user_table") == {"boto3"}
+
+
+def test_categorize_imports_still_resolve():
+    loaded = imported_modules(
+        "from focus_utils import CORS_HEADERS, UserContext, fetch_youtube_data, decimal_to_int, preprocess_video_json_entry, "
+        "fetch_and_insert_user_entry, update_user_with_focus_status, build_prompt"
+    )
+    assert "pandas" not in loaded
+    assert "googleapiclient" not in loaded
+
+
+def test_categorize_status_does_not_load_the_model_call():
+    loaded = imported_modules("from focus_utils import get_categorize_job_status, CATEGORIZE_STATUS_MAX_WAIT_SECONDS")
+    assert "requests" not in loaded
+    assert "googleapiclient" not in loaded
@@ -0,0 +1,208 @@
+import importlib.util
+import os
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from focus_utils import fetch_and_insert_user_entry, get_recent_decisions, record_recent_decision, tables, update_user_with_focus_status
+from focus_utils.preferences import (
+    RECENT_DECISIONS_MAX_SESSIONS, SESSION_INDEX_NAME, format_session_timestamp, get_session_index_keys, push_recent_decision
+)
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def load_backfill_script():
+    spec = importlib.util.spec_from_file_location(
+        "backfill_session_index", os.path.join(ROOT_DIR, "scripts", "backfill_session_index.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture()
+def pref_table(monkeypatch):
+    table = MagicMock()
+    table.query.return_value = {"Items": [
+        {"focus": "focus", "youTubeApiData": {"snippet": {"categoryId": "27"}}},
+        {"focus": "regular"},
+    ]}
+    monkeypatch.setattr(tables, "user_pref_data_table", table)
+    return table
+
+
+def test_queries_the_session_index_newest_first(pref_table):
+    new_entry = {"sessionId": "session-1", "timestamp": "2025-03-01T10:00:00Z"}
+
+    _, new_entry = fetch_and_insert_user_entry("participant-1", new_entry, "entry-1")
+
+    query = pref_table.query.call_args.kwargs
+    assert query["IndexName"] == SESSION_INDEX_NAME
+    assert query["ScanIndexForward"] is False
+    assert query["Limit"] == 3
+    assert "FilterExpression" not in query
+    assert new_entry["focusMode_1"] == "focus" and new_entry["categoryId_1"] == "27"
+    assert new_entry["focusMode_2"] == "regular" and new_entry["categoryId_2"] is None
+    assert new_entry["focusMode_3"] is None and new_entry["categoryId_3"] is None
+
+    item = pref_table.put_item.call_args.kwargs["Item"]
+    assert item["sessionKey"] == "participant-1#session-1"
+    assert item["sessionTimestamp"] == "2025-03-01T10:00:00.000000Z"
+
+
+def test_entry_without_timestamp_is_still_indexed(pref_table):
+    fetch_and_insert_user_entry("participant-1", {"sessionId": "session-1"}, "entry-1")
+
+    item = pref_table.put_item.call_args.kwargs["Item"]
+    assert item["sessionKey"] == "participant-1#session-1"
+    assert item["sessionTimestamp"].endswith("Z")
+
+
+def test_session_timestamp_sorts_like_time():
+    timestamps = ["2025-03-01T10:00:00.5Z", "2025-03-01T11:30:00+02:00", "2025-03-01T09:59:59.999999Z", "2025-03-01T10:00:00"]
+
+    by_string = sorted(timestamps, key=format_session_timestamp)
+
+    assert by_string == ["2025-03-01T11:30:00+02:00", "2025-03-01T09:59:59.999999Z", "2025-03-01T10:00:00", "2025-03-01T10:00:00.5Z"]
+    assert format_session_timestamp("not a timestamp") is None
+    assert get_session_index_keys("participant-1", "session-1", "not a timestamp") is None
+
+
+def test_backfill_pages_through_the_scan():
+    backfill_script = load_backfill_script()
+    table = MagicMock()
+    table.scan.side_effect = [
+        {"Items": [
+            {"prolificId": "p1", "Id": "1", "sessionId": "s1", "timestamp": "2025-03-01T10:00:00Z"},
+            {"prolificId": "p1", "Id": "2", "sessionId": "s1", "timestamp": "2025-03-01T10:00:00Z",
+             "sessionKey": "p1#s1", "sessionTimestamp": "2025-03-01T10:00:00.000000Z"},
+        ], "LastEvaluatedKey": {"prolificId": "p1", "Id": "2"}},
+        {"Items": [{"prolificId": "p2", "Id": "3", "sessionId": "s9"}]},
+    ]
+
+    totals = backfill_script.backfill(table)
+
+    assert totals == {"scanned": 3, "updated": 1, "skipped": 1, "invalid": 1}
+    assert table.scan.call_args_list[1].kwargs["ExclusiveStartKey"] == {"prolificId": "p1", "Id": "2"}
+    update = table.update_item.call_args.kwargs
+    assert update["Key"] == {"prolificId": "p1", "Id": "1"}
+    assert update["ExpressionAttributeValues"] == {":sk": "p1#s1", ":st": "2025-03-01T10:00:00.000000Z"}
+
+
+def test_backfill_dry_run_writes_nothing():
+    backfill_script = load_backfill_script()
+    table = MagicMock()
+    table.scan.return_value = {"Items": [{"prolificId": "p1", "Id": "1", "sessionId": "s1", "timestamp": "2025-03-01T10:00:00Z"}]}
+
+    totals = backfill_script.backfill(table, dry_run=True)
+
+    assert totals["updated"] == 1
+    table.update_item.assert_not_called()
+
+
+def make_user_context(item):
+    from focus_utils import UserContext
+
+    table = MagicMock()
+    table.get_item.return_value = {"Item": item}
+    return UserContext("participant-1", table=table)
+
+
+def test_recent_decisions_replace_the_query(pref_table):
+    user_context = make_user_context({"User_Id": "participant-1", "Recent_Decisions": {
+        "session-1": [{"entryId": "2", "categoryId": "10", "focus": "regular", "timestamp": "t2"},
+                      {"entryId": "1", "categoryId": "27", "focus": "focus", "timestamp": "t1"}],
+    }})
+
+    _, new_entry = fetch_and_insert_user_entry("participant-1", {"sessionId": "session-1"}, "entry-3", user_context)
+
+    pref_table.query.assert_not_called()
+    pref_table.put_item.assert_called_once()
+    assert (new_entry["focusMode_1"], new_entry["categoryId_1"]) == ("regular", "10")
+    assert (new_entry["focusMode_2"], new_entry["categoryId_2"]) == ("focus", "27")
+    assert (new_entry["focusMode_3"], new_entry["categoryId_3"]) == (None, None)
+
+
+def test_session_without_recent_decisions_falls_back_to_the_index(pref_table):
+    user_context = make_user_context({"User_Id": "participant-1"})
+
+    _, new_entry = fetch_and_insert_user_entry("participant-1", {"sessionId": "session-1"}, "entry-1", user_context)
+
+    pref_table.query.assert_called_once()
+    assert new_entry["focusMode_1"] == "focus"
+
+
+def test_focus_status_is_pushed_onto_a_bounded_ring(pref_table):
+    pref_table.update_item.return_value = {"Attributes": {}}
+    user_context = make_user_context({"User_Id": "participant-1"})
+    entry = {"sessionId": "session-1", "youTubeApiData": {"snippet": {"categoryId": "27"}}}
+
+    for i in range(5):
+        entry["timestamp"] = f"2025-03-01T10:00:0{i}Z"
+        update_user_with_focus_status(f"entry-{i}", "participant-1", "focus", user_context, entry)
+
+    ring = get_recent_decisions(user_context, "session-1")
+    assert [decision["entryId"] for decision in ring] == ["entry-4", "entry-3", "entry-2"]
+    assert ring[0] == {"entryId": "entry-4", "categoryId": "27", "focus": "focus", "timestamp": "2025-03-01T10:00:04.000000Z"}
+
+    first_write, last_write = user_context.table.update_item.call_args_list[0].kwargs, user_context.table.update_item.call_args_list[-1].kwargs
+    assert "attribute_not_exists(#rdv)" in first_write["ConditionExpression"]
+    assert last_write["ExpressionAttributeValues"][":version"] == 4
+    assert last_write["ExpressionAttributeValues"][":next_version"] == 5
+
+
+def test_only_the_latest_sessions_are_kept():
+    recent = {}
+    for i in range(RECENT_DECISIONS_MAX_SESSIONS + 2):
+        recent = push_recent_decision(recent, f"session-{i}", {"entryId": str(i), "timestamp": f"2025-03-0{i + 1}T00:00:00.000000Z"})
+
+    assert sorted(recent) == [f"session-{i}" for i in range(2, RECENT_DECISIONS_MAX_SESSIONS + 2)]
+
+
+def test_concurrent_decision_is_retried_on_the_fresh_ring():
+    user_context = make_user_context({"User_Id": "participant-1"})
+    conflict = ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem")
+    user_context.table.update_item.side_effect = [conflict, {}]
+    user_context.table.get_item.side_effect = [
+        {"Item": {"User_Id": "participant-1"}},
+        {"Item": {"Recent_Decisions": {"session-1": [{"entryId": "other", "timestamp": "t"}]}, "Recent_Decisions_Version": 1}},
+    ]
+
+    ring = record_recent_decision(user_context, "session-1", {"entryId": "mine", "timestamp": "t"})
+
+    assert [decision["entryId"] for decision in ring["session-1"]] == ["mine", "other"]
+    retry = user_context.table.update_item.call_args.kwargs
+    assert retry["ExpressionAttributeValues"][":version"] == 1
+    assert user_context.round_trips == 4
+
+
+def test_pending_entries_are_on_the_ring_in_session_timestamp_order(pref_table):
+    pref_table.update_item.return_value = {"Attributes": {}}
+    user_context = make_user_context({"User_Id": "participant-1"})
+    entries = {
+        entry_id: {"sessionId": "session-1", "timestamp": timestamp, "youTubeApiData": {"snippet": {"categoryId": category_id}}}
+        for entry_id, timestamp, category_id in [
+            ("entry-1", "2025-03-01T10:00:01Z", "27"),
+            ("entry-2", "2025-03-01T10:00:02Z", "10"),
+            ("entry-3", "2025-03-01T10:00:03Z", "20"),
+        ]
+    }
+    for entry_id, entry in entries.items():
+        fetch_and_insert_user_entry("participant-1", dict(entry), entry_id, user_context)
+    # entry-2 is still waiting for its (async) decision; entry-3 was decided before entry-1
+    update_user_with_focus_status("entry-3", "participant-1", "regular", user_context, entries["entry-3"])
+    update_user_with_focus_status("entry-1", "participant-1", "focus", user_context, entries["entry-1"])
+    # only the session's first entry had nothing on the ring to go by
+    assert pref_table.query.call_count == 1
+    pref_table.query.reset_mock()
+
+    _, new_entry = fetch_and_insert_user_entry("participant-1", {"sessionId": "session-1", "timestamp": "2025-03-01T10:00:04Z"}, "entry-4", user_context)
+
+    pref_table.query.assert_not_called()
+    assert [(new_entry[f"focusMode_{i}"], new_entry[f"categoryId_{i}"]) for i in range(1, 4)] == [
+        ("regular", "20"), (None, "10"), ("focus", "27"),
+    ]
+    ring = get_recent_decisions(user_context, "session-1")
+    assert [decision["entryId"] for decision in ring] == ["entry-4", "entry-3", "entry-2"]
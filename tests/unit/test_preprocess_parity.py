@@ -0,0 +1,109 @@
+import copy
+import json
+import math
+import warnings
+
+import pytest
+
+import focus_utils
+from focus_utils import youtube
+
+pytest.importorskip("pandas")
+
+CATEGORY_ID_TO_NAME = {"10": "Music", "20": "Gaming", "27": "Education", "28": "Science and Technology"}
+
+YOUTUBE_API_DATA = {
+    "kind": "youtube#video",
+    "etag": "etag-1",
+    "id": "abc123",
+    "snippet": {
+        "publishedAt": "2024-01-01T00:00:00Z",
+        "channelId": "channel-1",
+        "title": "Complete JavaScript Course for Beginners",
+        "description": "Learn everything from variables to DOM manipulation.",
+        "thumbnails": {"default": {"url": "https://i.ytimg.com/vi/abc123/default.jpg", "width": 120}},
+        "channelTitle": "Code Academy",
+        "tags": ["javascript", "course"],
+        "categoryId": "27",
+        "localized": {"title": "Complete JavaScript Course", "description": "Learn"},
+    },
+    "statistics": {"viewCount": "10", "likeCount": "2", "favoriteCount": "0", "commentCount": "1"},
+}
+
+
+def make_entry(intent_node, **preference_data):
+    new_preference_data = {
+        "sessionId": "session-1",
+        "youTubeID": "abc123",
+        "timestamp": "2025-06-01T12:00:00.000Z",
+        "intentNode": intent_node,
+        "youTubeApiData": copy.deepcopy(YOUTUBE_API_DATA),
+        "isSubscribed": True,
+        "focusMode_1": True,
+        "categoryId_1": "27",
+        "focusMode_2": False,
+        "categoryId_2": "20",
+        "focusMode_3": None,
+        "categoryId_3": None,
+    }
+    new_preference_data.update(preference_data)
+    return {"prolificId": "participant-1", "newPreferenceData": new_preference_data}
+
+
+ENTRIES = {
+    "search": make_entry(json.dumps({"curr_intent_source": "/SearchPage", "curr_intent_data": "learn javascript"})),
+    "channel": make_entry(json.dumps({"curr_intent_source": "/ChannelPage", "curr_intent_data": "@codeacademy"})),
+    "home": make_entry(json.dumps({"curr_intent_source": "/HomePage", "curr_intent_data": None, "depth": 2})),
+    "double_encoded": make_entry(json.dumps(json.dumps({"curr_intent_source": "/WatchPage"})), curr_intent_source="/WatchPage"),
+    "invalid_intent": make_entry("{not json", curr_intent_source="/HomePage"),
+    "missing_intent_data": make_entry(json.dumps({"curr_intent_source": "/SearchPage"})),
+    "null_source": make_entry(json.dumps({"curr_intent_source": None})),
+    "intent_overrides_title": make_entry(json.dumps({"curr_intent_source": "/HomePage", "title": "from intent"})),
+    "no_youtube_data": make_entry(json.dumps({"curr_intent_source": "/HomePage"}), youTubeApiData=None),
+    "list_intent": make_entry(json.dumps(["a", "b"]), curr_intent_source="/HomePage"),
+    "numeric_fields": make_entry(json.dumps({"curr_intent_source": "/HomePage", "score": 0.5, "rank": 3, "seen": False})),
+}
+
+
+def assert_same_record(actual, expected):
+    assert list(actual) == list(expected)
+    for key, value in expected.items():
+        if isinstance(value, float) and math.isnan(value):
+            assert isinstance(actual[key], float) and math.isnan(actual[key]), key
+        else:
+            assert actual[key] == value, key
+            assert type(actual[key]) is type(value), key
+
+
+@pytest.fixture(autouse=True)
+def category_map(monkeypatch):
+    monkeypatch.setattr(youtube, "get_cached_video_categories", lambda: (list(CATEGORY_ID_TO_NAME.values()), CATEGORY_ID_TO_NAME))
+
+
+@pytest.mark.parametrize("name", sorted(ENTRIES))
+def test_dict_pipeline_matches_dataframe_pipeline(name):
+    with warnings.catch_warnings():
+        # duplicate column names make DataFrame.to_dict warn
+        warnings.simplefilter("ignore", UserWarning)
+        expected = focus_utils.preprocess_video_json_entry_df(copy.deepcopy(ENTRIES[name]))
+
+    actual = focus_utils.preprocess_video_json_entry(copy.deepcopy(ENTRIES[name]))
+
+    assert_same_record(actual, expected)
+
+
+def test_missing_intent_source_fails_like_dataframe_pipeline():
+    entry = make_entry(json.dumps({"curr_intent_data": "x"}))
+
+    with pytest.raises(KeyError):
+        focus_utils.preprocess_video_json_entry_df(copy.deepcopy(entry))
+    with pytest.raises(KeyError):
+        focus_utils.preprocess_video_json_entry(copy.deepcopy(entry))
+
+
+def test_dict_pipeline_does_not_modify_the_request():
+    entry = copy.deepcopy(ENTRIES["search"])
+
+    focus_utils.preprocess_video_json_entry(entry)
+
+    assert entry == ENTRIES["search"]
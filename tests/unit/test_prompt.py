@@ -0,0 +1,69 @@
+import logging
+
+from focus_utils import prompt
+
+ROW = {
+    "title": "Intro to Rust Lifetimes",
+    "description": "A full lecture series. " * 20,
+    "video_category": "Gaming",
+    "categoryId_1": "Gaming", "focusMode_1": "false",
+    "categoryId_2": "Music", "focusMode_2": "true",
+    "categoryId_3": "Unknown", "focusMode_3": None,
+    "isSubscribed": True,
+    "curr_intent_source": "/SearchPage",
+    "focus_categories": ["Education"],
+}
+
+
+def test_static_prefix_is_byte_stable():
+    other_row = dict(ROW, title="Fortnite Funny Moments", video_category="Comedy", focus_categories=["Music"])
+
+    first, second = prompt.build_prompt_messages(ROW, mode="all"), prompt.build_prompt_messages(other_row, mode="all")
+
+    assert first[0] == second[0] == {"role": "system", "content": prompt.STATIC_PROMPT_PREFIX}
+    assert first[1]["content"] != second[1]["content"]
+    # nothing request specific leaks into the prefix
+    assert "Intro to Rust Lifetimes" not in prompt.STATIC_PROMPT_PREFIX
+
+
+def test_dynamic_section_carries_the_rule_inputs():
+    dynamic = prompt.build_dynamic_prompt(ROW)
+
+    assert '- Title: "Intro to Rust Lifetimes"' in dynamic
+    assert "2. categoryId_2=Music → focusMode_2=True" in dynamic
+    assert "7. User is subscribed → True" in dynamic
+    assert "8. Intent source contains Search/Channel → /searchpage" in dynamic
+    assert "10. Description >50 words AND has focus keywords → True" in dynamic
+    assert prompt.build_prompt(ROW) == prompt.STATIC_PROMPT_PREFIX + dynamic
+
+
+def test_few_shot_index_lists_every_example():
+    assert len(prompt.FEW_SHOT_INDEX) == 12
+    assert prompt.FEW_SHOT_INDEX[0]["rules"] == (True, True, True, True, True, False, True, True, True, True)
+    assert [example["outcome"] for example in prompt.FEW_SHOT_INDEX].count(False) == 4
+
+
+def test_similar_mode_keeps_both_outcomes():
+    all_true = (True,) * 10
+    selected = prompt.select_few_shot_examples(all_true, "Sports", k=3)
+
+    assert len(selected) == 3
+    assert {example["outcome"] for example in selected} == {True, False}
+    assert any(example["category"] == "Sports" for example in selected)
+
+    messages = prompt.build_prompt_messages(ROW, mode="similar", k=3)
+    assert messages[0]["content"].startswith(prompt.STATIC_INSTRUCTIONS)
+    assert messages[0]["content"].count("### Example ") == 3
+    assert len(messages[0]["content"]) < len(prompt.STATIC_PROMPT_PREFIX) / 2
+
+
+def test_token_usage_is_logged(caplog):
+    messages = prompt.build_prompt_messages(ROW)
+    usage = {"prompt_tokens": 2900, "completion_tokens": 80, "prompt_tokens_details": {"cached_tokens": 2688}}
+
+    with caplog.at_level(logging.INFO, logger=prompt.__name__):
+        prompt.log_prompt_usage("all", messages, usage)
+
+    logged = caplog.records[-1].prompt_usage
+    assert logged["cached_tokens"] == 2688 and logged["prompt_tokens"] == 2900 and logged["mode"] == "all"
+    assert logged["static_chars"] == len(prompt.STATIC_PROMPT_PREFIX)
@@ -0,0 +1,93 @@
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import pytest
+
+from focus_utils import RetryScheduler, get_retry_after
+from focus_utils.retry import FALLBACK_RESERVE_SECONDS, MIN_ATTEMPT_SECONDS
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_scheduler(remaining_seconds, random_value=1.0, **kwargs):
+    clock = FakeClock()
+    scheduler = RetryScheduler(remaining_seconds, clock=clock, sleep=clock.sleep, random=lambda: random_value, **kwargs)
+    return scheduler, clock
+
+
+def test_decorrelated_jitter_grows_up_to_the_cap():
+    scheduler, _ = make_scheduler(None, max_attempts=10, base_delay=0.5, max_delay=8.0)
+
+    delays = [scheduler.next_delay() for _ in range(4)]
+
+    assert delays == [1.5, 4.5, 8.0, 8.0]
+
+
+def test_jitter_stays_between_base_and_three_times_the_previous_delay():
+    scheduler, _ = make_scheduler(None, random_value=0.0, base_delay=0.5)
+
+    assert scheduler.next_delay() == 0.5
+
+
+def test_retry_after_is_a_lower_bound():
+    scheduler, clock = make_scheduler(60)
+
+    assert scheduler.wait(retry_after=7) is True
+    assert clock.now == 7
+
+
+def test_attempts_stop_when_the_deadline_is_near():
+    scheduler, clock = make_scheduler(10, max_attempts=5)
+
+    attempts = []
+    for attempt in scheduler.attempts():
+        attempts.append(attempt)
+        # each attempt runs into its full (capped) read timeout
+        clock.sleep(scheduler.request_timeout(3.05, 30)[1])
+
+    assert attempts == [0]
+    assert clock.now == pytest.approx(10 - FALLBACK_RESERVE_SECONDS)
+
+
+def test_wait_refuses_when_the_backoff_would_eat_the_reserve():
+    scheduler, clock = make_scheduler(FALLBACK_RESERVE_SECONDS + MIN_ATTEMPT_SECONDS + 1)
+
+    assert scheduler.wait(retry_after=5) is False
+    assert clock.now == 0
+
+
+def test_wait_refuses_after_the_last_attempt():
+    scheduler, _ = make_scheduler(None, max_attempts=2)
+
+    list(scheduler.attempts())
+
+    assert scheduler.wait() is False
+
+
+def test_from_lambda_context():
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = 12_000
+    scheduler = RetryScheduler.from_lambda_context(context, clock=lambda: 100.0)
+
+    assert scheduler.remaining() == pytest.approx(12 - FALLBACK_RESERVE_SECONDS)
+    assert RetryScheduler.from_lambda_context(None).remaining() == float("inf")
+
+
+def test_get_retry_after():
+    assert get_retry_after({"Retry-After": "3"}) == 3.0
+    assert get_retry_after({"retry-after-ms": "250", "Retry-After": "1"}) == 0.25
+    assert get_retry_after({"Retry-After": "soon"}) is None
+    assert get_retry_after({}) is None
+    http_date = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 < get_retry_after({"Retry-After": http_date}) <= 30
+
@@ -0,0 +1,81 @@
+import pytest
+
+from focus_utils import decide_locally, evaluate_rules
+
+
+def make_row(current, focus_categories, history, subscribed=False, intent_source="/home", title="", description=""):
+    row = {
+        "title": title,
+        "description": description,
+        "video_category": current,
+        "focus_categories": [", ".join(focus_categories)],
+        "isSubscribed": subscribed,
+        "curr_intent_source": intent_source,
+    }
+    for i, (category, focus) in enumerate(history, start=1):
+        row[f"categoryId_{i}"] = category
+        row[f"focusMode_{i}"] = "true" if focus else "false"
+    return row
+
+
+# rows and expected rules 1-8 taken from the few-shot examples in the prompt
+FEW_SHOT_CASES = [
+    pytest.param(
+        make_row("Education", ["Education", "Science and Technology"],
+                 [("Education", True), ("Gaming", False), ("Music", False)], True, "/search"),
+        [True, True, True, True, True, False, True, True], "rules:2", id="example-1"),
+    pytest.param(
+        make_row("Sports", ["Sports", "Entertainment"],
+                 [("Sports", False), ("Sports", False), ("Entertainment", False)]),
+        [False, False, True, True, False, True, False, False], "rules:3", id="example-2"),
+    pytest.param(
+        make_row("Documentary", ["Documentary"],
+                 [("Documentary", False), ("Documentary", False), ("Travel and Events", False)], False, "/channelPage"),
+        [False, False, True, True, False, True, False, True], "rules:3", id="example-8"),
+    pytest.param(
+        make_row("Gaming", ["Education"], [("Gaming", False), ("Entertainment", False), ("Gaming", False)]),
+        [False, False, False, True, False, True, False, False], None, id="example-9"),
+    pytest.param(
+        make_row("Film and Animation", ["Education"],
+                 [("Film and Animation", False), ("Entertainment", False), ("Film and Animation", False)], True),
+        [False, False, False, True, False, True, True, False], None, id="example-11"),
+]
+
+
+@pytest.mark.parametrize("row, expected_rules, expected_path", FEW_SHOT_CASES)
+def test_rules_match_the_few_shot_examples(row, expected_rules, expected_path):
+    rules = evaluate_rules(row)
+
+    assert [rules[number] for number in range(1, 9)] == expected_rules
+
+    result = decide_locally(row)
+    if expected_path is None:
+        assert result is None
+    else:
+        assert result["decision_path"] == expected_path
+        assert result["category"] == "true"
+        assert result["explanation_summary"].startswith("Confidence: ")
+
+
+def test_unknown_categories_never_match():
+    row = make_row("Unknown", ["Education"], [("Unknown", True), ("Unknown", True), ("Unknown", False)])
+
+    rules = evaluate_rules(row)
+
+    assert not rules[2] and not rules[4] and not rules[6]
+    assert decide_locally(row) is None
+
+
+def test_focus_category_match_ignores_ampersand_and_case():
+    row = make_row("Howto and Style", ["howto & style"], [])
+
+    assert decide_locally(row)["decision_path"] == "rules:3"
+
+
+def test_keyword_rules():
+    row = make_row("Education", ["Education"], [], title="Full lecture", description="course " + "word " * 60)
+
+    rules = evaluate_rules(row)
+
+    assert sorted(rules["key_hits"]) == ["course", "lecture"]
+    assert rules[9] and rules[10]
@@ -0,0 +1,173 @@
+import importlib.util
+import os
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from focus_utils import (
+    UserContext, compute_stage_transition, format_datetime_str, generate_stage_schedule, generate_weekly_stage_start_times,
+    get_current_study_stage, get_stage_schedule, getStageResponseObject, is_study_over, locate_in_schedule,
+    stage_schedule_from_start_times,
+)
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+EXAMPLES = 2000
+
+
+def random_participant(rng: random.Random):
+    """ (start, stage order, last active) with last active anywhere from before the study to after it, boundaries included """
+    start = datetime(2024, 1, 1) + timedelta(seconds=rng.randrange(3 * 365 * 24 * 60 * 60))
+    stage_order = rng.sample(range(1, 7), rng.randint(1, 6))
+    boundaries = [start + timedelta(days=7 * i) for i in range(len(stage_order) + 1)]
+    last_active = rng.choice([
+        rng.choice(boundaries) + timedelta(seconds=rng.choice([-1, 0, 1])),
+        start + timedelta(seconds=rng.uniform(-3, 7 * len(stage_order) + 3) * 24 * 60 * 60),
+    ])
+    if rng.random() < 0.5:
+        last_active = last_active.replace(microsecond=rng.randrange(1000000))
+    return format_datetime_str(start), stage_order, last_active.isoformat()
+
+
+def test_schedule_lookup_matches_the_start_time_functions():
+    rng = random.Random(20251018)
+    for _ in range(EXAMPLES):
+        start, stage_order, last_active = random_participant(rng)
+        stage_start_times = generate_weekly_stage_start_times(start, stage_order)
+        schedule = generate_stage_schedule(start, stage_order)
+
+        stage, week, is_completed = locate_in_schedule(schedule, stage_order, last_active)
+
+        assert stage == get_current_study_stage(stage_start_times, last_active), (start, stage_order, last_active)
+        assert is_completed == is_study_over(stage_start_times, stage_order, last_active), (start, stage_order, last_active)
+        assert week == (stage_order.index(stage) + 1 if stage else 0)
+        assert stage_schedule_from_start_times(stage_start_times, stage_order) == schedule
+
+
+def test_transitions_match_for_stored_and_migrated_schedules():
+    rng = random.Random(7)
+    for _ in range(EXAMPLES // 4):
+        start, stage_order, last_active = random_participant(rng)
+        legacy = {
+            "Stage_Order_List": stage_order,
+            "Stage_Start_Times": generate_weekly_stage_start_times(start, stage_order),
+            "Last_Active_At_Time": last_active,
+            "User_Completed_Stages": [],
+            "Current_Stage": rng.choice([None] + stage_order),
+        }
+        # DynamoDB hands numbers back as Decimal
+        stored = dict(legacy, Stage_Schedule=[Decimal(boundary) for boundary in generate_stage_schedule(start, stage_order)])
+
+        assert compute_stage_transition(stored, "participant-1") == compute_stage_transition(legacy, "participant-1")
+
+
+def test_the_located_week_matches_the_stage_order_lookup():
+    rng = random.Random(11)
+    for _ in range(EXAMPLES // 4):
+        start, stage_order, last_active = random_participant(rng)
+        item = {
+            "Stage_Order_List": stage_order,
+            "Stage_Start_Times": generate_weekly_stage_start_times(start, stage_order),
+            "Stage_Schedule": generate_stage_schedule(start, stage_order),
+            "Last_Active_At_Time": last_active,
+            "User_Completed_Stages": rng.choice([[], stage_order]),
+            "Current_Stage": rng.choice([None] + stage_order),
+        }
+
+        new_stage, _, is_stage_changed, is_study_completed, _, week = compute_stage_transition(item, "participant-1")
+        final = dict(item, Current_Stage=new_stage if new_stage is not None else item["Current_Stage"])
+
+        if week is not None:
+            assert getStageResponseObject(final, "participant-1", is_stage_changed, is_study_completed, week) == \
+                getStageResponseObject(final, "participant-1", is_stage_changed, is_study_completed)
+
+
+def test_irregular_start_times_keep_the_old_lookup():
+    stage_start_times = {"1": "2025-06-01T09:00:00", "2": "2025-06-10T09:00:00"}
+    item = {
+        "Stage_Order_List": [1, 2],
+        "Stage_Start_Times": stage_start_times,
+        "Last_Active_At_Time": "2025-06-09T09:00:00",
+        "User_Completed_Stages": [],
+        "Current_Stage": 1,
+    }
+
+    assert get_stage_schedule(item) is None
+    assert compute_stage_transition(item, "participant-1")[0] is None
+    assert compute_stage_transition(item, "participant-1")[-1] is None
+
+
+def test_update_stage_writes_the_schedule_of_an_older_row():
+    start = format_datetime_str(datetime.now() - timedelta(days=1))
+    item = {
+        "User_Id": "participant-1",
+        "Stage_Order_List": [2, 1, 3, 4],
+        "Stage_Start_Times": generate_weekly_stage_start_times(start, [2, 1, 3, 4]),
+        "Last_Active_At_Time": start,
+        "User_Completed_Stages": [],
+        "Current_Stage": 2,
+    }
+    table = MagicMock()
+    table.get_item.return_value = {"Item": item}
+    table.update_item.side_effect = lambda **kwargs: {"Attributes": item}
+    user_context = UserContext("participant-1", table=table)
+
+    data, _ = user_context.touch_and_advance()
+    user_context.save()
+
+    assert data["current_week"] == 1
+    assert generate_stage_schedule(start, [2, 1, 3, 4]) in table.update_item.call_args.kwargs["ExpressionAttributeValues"].values()
+
+
+def load_backfill_script():
+    spec = importlib.util.spec_from_file_location(
+        "backfill_stage_schedule", os.path.join(ROOT_DIR, "scripts", "backfill_stage_schedule.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.parametrize("dry_run", [False, True])
+def test_backfill_sets_missing_schedules(dry_run):
+    backfill_script = load_backfill_script()
+    start = "2025-06-01T09:00:00"
+    table = MagicMock()
+    table.scan.side_effect = [
+        {"Items": [
+            {"User_Id": "p1", "Stage_Order_List": [3, 1], "Stage_Start_Times": generate_weekly_stage_start_times(start, [3, 1])},
+            {"User_Id": "p2", "Stage_Order_List": [1], "Stage_Start_Times": {"1": start}, "Stage_Schedule": [1, 2]},
+        ], "LastEvaluatedKey": {"User_Id": "p2"}},
+        {"Items": [{"User_Id": "p3", "Stage_Order_List": [1, 2], "Stage_Start_Times": {"1": start}}]},
+    ]
+
+    totals = backfill_script.backfill(table, dry_run=dry_run)
+
+    assert totals == {"scanned": 3, "updated": 1, "skipped": 1, "invalid": 1}
+    if dry_run:
+        table.update_item.assert_not_called()
+    else:
+        update = table.update_item.call_args.kwargs
+        assert update["Key"] == {"User_Id": "p1"}
+        assert update["ExpressionAttributeValues"] == {":schedule": generate_stage_schedule(start, [3, 1])}
+
+
+def test_backfill_skips_rows_written_since_the_scan():
+    backfill_script = load_backfill_script()
+    start = "2025-06-01T09:00:00"
+    table = MagicMock()
+    table.scan.return_value = {"Items": [
+        {"User_Id": "p1", "Stage_Order_List": [1], "Stage_Start_Times": {"1": start}},
+        {"User_Id": "p2", "Stage_Order_List": [2], "Stage_Start_Times": {"2": start}},
+    ]}
+    table.update_item.side_effect = [
+        ClientError({"Error": {"Code": "ConditionalCheckFailedException", "Message": "conditional check failed"}}, "UpdateItem"),
+        {},
+    ]
+
+    totals = backfill_script.backfill(table)
+
+    assert totals == {"scanned": 2, "updated": 1, "skipped": 1, "invalid": 0}
@@ -0,0 +1,76 @@
+import json
+from unittest.mock import MagicMock
+
+import botocore.session # type: ignore
+import pytest
+
+from focus_utils import tables
+
+DAILY_SURVEY = {
+    "prolificId": "participant-1",
+    "timestamp": "2025-06-01T12:00:00.000Z",
+    "stage": 1,
+    "type": "daily_survey",
+    "distraction": 3,
+    "enjoyment": 4,
+    "userAgency": 5,
+}
+
+
+@pytest.fixture()
+def cold_registry(monkeypatch):
+    """ Forgets the container's resource and tables, and counts the botocore clients created from here on """
+    for name in ["dynamodb", *tables._TABLE_NAMES]:
+        monkeypatch.delitem(vars(tables), name, raising=False)
+
+    created = []
+    create_client = botocore.session.Session.create_client
+
+    def counting_create_client(self, *args, **kwargs):
+        created.append(args[0] if args else kwargs.get("service_name"))
+        return create_client(self, *args, **kwargs)
+
+    monkeypatch.setattr(botocore.session.Session, "create_client", counting_create_client)
+    return created
+
+
+def test_resource_is_tuned(cold_registry):
+    config = tables.dynamodb.meta.client.meta.config
+
+    assert config.max_pool_connections == tables.DYNAMODB_MAX_POOL_CONNECTIONS
+    assert config.tcp_keepalive is True
+    assert config.connect_timeout == tables.DYNAMODB_CONNECT_TIMEOUT
+    assert config.read_timeout == tables.DYNAMODB_READ_TIMEOUT
+
+
+def test_data_types_are_routed_to_their_tables(cold_registry):
+    table = tables.get_table_for_data_type("post_stage_rating_survey")
+
+    assert table.name == tables.POST_STAGE_RATING_SURVEY_DATA_TABLE_NAME
+    assert table is tables.post_stage_rating_survey_data_table
+    assert tables.get_table_for_data_type("weekly_survey") is None
+
+
+def test_no_client_is_constructed_on_the_hot_path(cold_registry, app_loader, monkeypatch):
+    collect = app_loader("collect")
+    onboard = app_loader("onboard")
+    user_context = MagicMock()
+    user_context.check_id.return_value = None
+    user_context.touch_and_advance.return_value = ({"current_stage": 1}, "ok")
+    monkeypatch.setattr(collect, "UserContext", lambda id: user_context)
+    # the real Table objects, with only the network calls replaced
+    for name in [*tables.DATA_TYPE_TABLES.values(), "user_table"]:
+        table = getattr(tables, name)
+        monkeypatch.setattr(table, "put_item", MagicMock(return_value={}))
+        monkeypatch.setattr(table, "get_item", MagicMock(return_value={}))
+    assert cold_registry == ["dynamodb"]
+
+    for _ in range(3):
+        for data_type in tables.DATA_TYPE_TABLES:
+            response = collect.lambda_handler({"body": json.dumps(dict(DAILY_SURVEY, type=data_type))}, None)
+            assert response["statusCode"] == 200, response["body"]
+        response = onboard.lambda_handler({"queryStringParameters": {"id": "participant-2", "focusmode_categories": "Education"}}, None)
+        assert response["statusCode"] == 200, response["body"]
+
+    assert cold_registry == ["dynamodb"]
+    assert tables.daily_survey_data_table.put_item.call_count == 3
@@ -0,0 +1,114 @@
+import logging
+
+import boto3 # type: ignore
+import pytest
+from botocore.stub import Stubber # type: ignore
+
+from focus_utils import tracing
+from focus_utils.tracing import LatencyTrace, add_count, instrument_handler, register_botocore_spans, span
+
+
+@pytest.fixture()
+def emitted(caplog, monkeypatch):
+    """ The EMF documents logged by instrumented handlers, as a list per invocation """
+    monkeypatch.setattr(tracing, "_cold_start", True)
+    monkeypatch.setattr(tracing, "METRICS_ENABLED", True)
+    caplog.set_level(logging.INFO, logger=tracing.logger.name)
+
+    def documents():
+        return [record.__dict__ for record in caplog.records if record.getMessage() == "metrics"]
+    return documents
+
+
+def metric_names(document: dict) -> list:
+    return [metric["Name"] for metric in document["_aws"]["CloudWatchMetrics"][0]["Metrics"]]
+
+
+def call_youtube():
+    with span("youtube"):
+        pass
+
+
+def test_handler_emits_spans_stages_and_counts(emitted):
+    @instrument_handler("categorize")
+    def handler(event, context):
+        trace = LatencyTrace("categorize")
+        with span("dynamodb"):
+            pass
+        trace.submit("youtube", call_youtube).result()
+        with span("dynamodb"):
+            trace.run("openai_1", lambda: None)
+            trace.run("openai_2", lambda: None)
+        add_count("OpenAIRetries")
+        add_count("VideoMetadataCacheHits", 2)
+        return {"statusCode": 200}
+
+    handler({}, None)
+    handler({}, None)
+
+    documents = emitted()
+    invocation, second = [document for document in documents if "InvocationLatency" in document]
+    assert invocation["Service"] == "categorize"
+    assert invocation["ColdStart"] == 1 and second["ColdStart"] == 0
+    assert invocation["StatusCode"] == 200
+    assert invocation["OpenAIRetries"] == 1 and invocation["VideoMetadataCacheHits"] == 2
+    assert set(metric_names(invocation)) == {"InvocationLatency", "ColdStart", "OpenAIRetries", "VideoMetadataCacheHits"}
+    assert invocation["_aws"]["CloudWatchMetrics"][0]["Namespace"] == tracing.METRICS_NAMESPACE
+
+    first_invocation = documents[:len(documents) // 2]
+    dependencies = {document["Dependency"]: document for document in first_invocation if "Dependency" in document}
+    assert len(dependencies["dynamodb"]["DependencyLatency"]) == 2
+    # the worker pool task ran in the handler's context
+    assert "youtube" in dependencies
+    assert dependencies["dynamodb"]["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [["Service", "Dependency"]]
+    stages = {document["Stage"]: document for document in first_invocation if "Stage" in document}
+    assert len(stages["openai"]["StageLatency"]) == 2
+
+
+def test_failed_invocations_are_emitted_too(emitted):
+    @instrument_handler("stage")
+    def handler(event, context):
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        handler({}, None)
+
+    (document,) = emitted()
+    assert document["StatusCode"] == "error"
+
+
+def test_long_span_lists_are_split(emitted):
+    metrics = tracing.InvocationMetrics("videoRecordLog")
+    for _ in range(tracing.EMF_MAX_VALUES + 5):
+        metrics.add_span("dynamodb", 1.0)
+
+    lengths = [len(document["DependencyLatency"]) for document in metrics.to_emf() if "DependencyLatency" in document]
+
+    assert lengths == [tracing.EMF_MAX_VALUES, 5]
+
+
+def test_spans_outside_a_handler_are_ignored(emitted):
+    with span("dynamodb"):
+        add_count("OpenAIRetries")
+
+    assert tracing.get_invocation_metrics() is None
+    assert emitted() == []
+
+
+def test_botocore_calls_are_recorded_as_spans(emitted):
+    client = boto3.client("dynamodb", region_name="us-west-1", aws_access_key_id="test", aws_secret_access_key="test")
+    register_botocore_spans(client, "dynamodb", "DynamoDBRetries")
+
+    @instrument_handler("stage")
+    def handler(event, context):
+        with Stubber(client) as stubber:
+            stubber.add_response("get_item", {"ResponseMetadata": {"RetryAttempts": 2}}, {"TableName": "users", "Key": {"User_Id": {"S": "participant-1"}}})
+            client.get_item(TableName="users", Key={"User_Id": {"S": "participant-1"}})
+        return {"statusCode": 200}
+
+    handler({}, None)
+
+    documents = emitted()
+    (dynamodb,) = [document for document in documents if document.get("Dependency") == "dynamodb"]
+    assert len(dynamodb["DependencyLatency"]) == 1
+    assert documents[0]["DynamoDBRetries"] == 2
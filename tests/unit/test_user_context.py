@@ -0,0 +1,260 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from focus_utils import UserContext, format_datetime_str, tables
+from tests.harness import make_participant_item
+
+
+def make_user_item(days_since_start: int = 0):
+    """ participant-1 in stage 3 (the first of [3, 1, 4, 2]), days_since_start into the study """
+    start = format_datetime_str(datetime.now() - timedelta(days=days_since_start))
+    return make_participant_item(stage_order=[3, 1, 4, 2], focus_categories=["Education"], start=start)
+
+
+def make_table(item):
+    table = MagicMock()
+    table.get_item.side_effect = lambda **kwargs: {"Item": item} if item else {}
+    table.update_item.side_effect = lambda **kwargs: {"Attributes": item}
+    return table
+
+
+@pytest.fixture()
+def user_table(monkeypatch):
+    table = make_table(make_user_item())
+    monkeypatch.setattr(tables, "user_table", table)
+    return table
+
+
+def test_check_id_unknown_user():
+    table = make_table(None)
+    user_context = UserContext("missing", table=table)
+
+    response = user_context.check_id()
+
+    assert response["statusCode"] == 401
+    assert user_context.round_trips == 1
+
+
+def test_single_read_and_single_write():
+    table = make_table(make_user_item())
+    user_context = UserContext("participant-1", table=table)
+
+    assert user_context.check_id() is None
+    data, message = user_context.touch_and_advance()
+    user_context.save()
+
+    assert user_context.round_trips == 2
+    assert table.get_item.call_count == 1
+    assert table.update_item.call_count == 1
+    assert data["current_stage"] == 3
+    assert data["is_stage_changed"] is False
+    assert message == "No stage update as user is still in the current stage time limit"
+
+    update_kwargs = table.update_item.call_args.kwargs
+    assert update_kwargs["ConditionExpression"] == "attribute_exists(User_Id)"
+    assert "Last_Active_At_Time" in update_kwargs["ExpressionAttributeNames"].values()
+
+
+def test_round_trips_counted_from_worker_threads():
+    user_context = UserContext("participant-1", table=make_table(make_user_item()))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: user_context.count_round_trip(), range(10000)))
+
+    assert user_context.round_trips == 10000
+
+
+def test_stage_transition_is_folded_into_the_same_write():
+    table = make_table(make_user_item(days_since_start=8))
+    user_context = UserContext("participant-1", table=table)
+
+    data, _ = user_context.touch_and_advance()
+    user_context.save()
+
+    assert data["current_stage"] == 1
+    assert data["current_week"] == 2
+    assert data["is_stage_changed"] is True
+    assert user_context.item["User_Completed_Stages"] == [3]
+    assert table.update_item.call_count == 1
+
+    update_kwargs = table.update_item.call_args.kwargs
+    assert update_kwargs["UpdateExpression"] == (
+        "SET #a0_0 = :v0, Current_Stage = :new_stage, "
+        "User_Completed_Stages = list_append(User_Completed_Stages, :last_stage)"
+    )
+    assert update_kwargs["ConditionExpression"] == "attribute_exists(User_Id) AND Current_Stage = :previous_stage"
+    assert update_kwargs["ExpressionAttributeValues"][":previous_stage"] == 3
+    assert update_kwargs["ExpressionAttributeValues"][":last_stage"] == [3]
+
+
+def test_concurrent_stage_advance_only_writes_activity():
+    item = make_user_item(days_since_start=8)
+    table = make_table(item)
+    conflict = ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem")
+    table.update_item.side_effect = [conflict, {"Attributes": item}]
+    user_context = UserContext("participant-1", table=table)
+
+    user_context.touch_and_advance()
+    user_context.save()
+
+    assert table.update_item.call_count == 2
+    retry_kwargs = table.update_item.call_args.kwargs
+    assert retry_kwargs["UpdateExpression"] == "SET #a0_0 = :v0"
+    assert retry_kwargs["ConditionExpression"] == "attribute_exists(User_Id)"
+
+
+def test_concurrent_stage_advance_reports_the_stage_the_other_request_wrote():
+    table = make_table(make_user_item(days_since_start=8))
+    # the other request advanced the user to stage 1 first
+    winner = make_user_item(days_since_start=8)
+    winner.update(Current_Stage=Decimal(1), User_Completed_Stages=[Decimal(3)])
+    conflict = ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem")
+    table.update_item.side_effect = [conflict, {"Attributes": winner}]
+    user_context = UserContext("participant-1", table=table)
+
+    data, _ = user_context.touch_and_advance()
+    assert data["is_stage_changed"] is True
+    user_context.save()
+
+    assert data["is_stage_changed"] is False
+    assert (data["current_stage"], data["current_week"]) == (1, 2)
+    assert user_context.item["User_Completed_Stages"] == [3]
+
+
+def test_nested_attribute_update():
+    table = make_table(make_user_item())
+    user_context = UserContext("participant-1", table=table)
+
+    user_context.set_attribute("StageWatchTimes", "3", value=42)
+    user_context.save()
+
+    update_kwargs = table.update_item.call_args.kwargs
+    assert update_kwargs["UpdateExpression"] == "SET #a0_0.#a0_1 = :v0"
+    assert update_kwargs["ExpressionAttributeNames"] == {"#a0_0": "StageWatchTimes", "#a0_1": "3"}
+    assert user_context.item["StageWatchTimes"]["3"] == 42
+
+
+def test_stage_handler_round_trips(user_table, app_loader):
+    app = app_loader("stage")
+
+    ret = app.lambda_handler({"queryStringParameters": {"id": "participant-1"}}, None)
+
+    assert ret["statusCode"] == 200
+    assert json.loads(ret["body"])["Stage_Status"]["current_stage"] == 3
+    assert user_table.get_item.call_count == 1
+    assert user_table.update_item.call_count == 1
+
+
+def test_stage_handler_serializes_the_numbers_dynamodb_returns(monkeypatch, app_loader):
+    # boto3 hands every number back as Decimal
+    item = make_user_item()
+    item.update(Stage_Order_List=[Decimal(stage) for stage in item["Stage_Order_List"]], Current_Stage=Decimal(3))
+    monkeypatch.setattr(tables, "user_table", make_table(item))
+    app = app_loader("stage")
+
+    ret = app.lambda_handler({"queryStringParameters": {"id": "participant-1"}}, None)
+
+    assert ret["statusCode"] == 200
+    assert json.loads(ret["body"])["Stage_Status"]["current_stage"] == 3
+
+
+def test_update_watch_time_handler_round_trips(user_table, app_loader):
+    app = app_loader("updateWatchTime")
+    body = {"prolificId": "participant-1", "stage": 3, "watchTime": 120}
+
+    ret = app.lambda_handler({"body": json.dumps(body)}, None)
+
+    assert ret["statusCode"] == 200
+    assert user_table.get_item.call_count == 1
+    assert user_table.update_item.call_count == 1
+
+
+def test_increment_is_atomic():
+    table = make_table(make_user_item())
+    user_context = UserContext("participant-1", table=table)
+
+    user_context.add_to_attribute("StageWatchTimes", "3", value=15)
+    user_context.add_to_attribute("StageWatchTimes", "3", value=5)
+    user_context.save()
+
+    update_kwargs = table.update_item.call_args.kwargs
+    assert update_kwargs["UpdateExpression"] == "SET #n0_0.#n0_1 = if_not_exists(#n0_0.#n0_1, :zero) + :d0"
+    assert update_kwargs["ExpressionAttributeValues"] == {":d0": 20, ":zero": 0}
+    assert user_context.item["StageWatchTimes"]["3"] == 20
+
+
+def test_idempotency_key_is_claimed_once():
+    item = make_user_item()
+    table = make_table(item)
+    user_context = UserContext("participant-1", table=table)
+
+    assert user_context.claim_idempotency_key("Keys", "k1", keep=2) is True
+    user_context.save()
+    update_kwargs = table.update_item.call_args.kwargs
+    assert update_kwargs["ConditionExpression"] == "attribute_exists(User_Id) AND attribute_not_exists(#e0)"
+
+    item["Keys"] = ["k1", "k2"]
+    user_context = UserContext("participant-1", table=table)
+    assert user_context.claim_idempotency_key("Keys", "k2") is False
+    assert user_context.claim_idempotency_key("Keys", "k3", keep=2) is True
+    user_context.save()
+    update_kwargs = table.update_item.call_args.kwargs
+    assert update_kwargs["ConditionExpression"] == "attribute_exists(User_Id) AND #e0 = :e0"
+    assert update_kwargs["ExpressionAttributeValues"][":e0"] == ["k1", "k2"]
+    assert update_kwargs["ExpressionAttributeValues"][":v0"] == ["k2", "k3"]
+
+
+def watch_time_delta(app, key="key-1", delta=15):
+    body = {"prolificId": "participant-1", "stage": 3, "watchTimeDelta": delta, "idempotencyKey": key}
+    ret = app.lambda_handler({"body": json.dumps(body)}, None)
+    return ret["statusCode"], json.loads(ret["body"])
+
+
+def test_update_watch_time_delta_mode(app_loader, monkeypatch):
+    item = make_user_item()
+    table = MagicMock()
+    table.get_item.side_effect = lambda **kwargs: {"Item": json.loads(json.dumps(item))}
+
+    def update_item(**kwargs):
+        values = kwargs["ExpressionAttributeValues"]
+        if ":d0" in values:
+            item["StageWatchTimes"]["3"] += values[":d0"]
+        item["Watch_Time_Idempotency_Keys"] = values.get(":v1", item.get("Watch_Time_Idempotency_Keys"))
+        return {"Attributes": item}
+
+    table.update_item.side_effect = update_item
+    monkeypatch.setattr(tables, "user_table", table)
+    app = app_loader("updateWatchTime")
+
+    assert watch_time_delta(app)[1]["watchTime"] == 15
+    status, body = watch_time_delta(app)
+    assert status == 200
+    assert body["watchTime"] == 15
+    assert body["message"] == "Watch time was already added for this idempotencyKey."
+    assert watch_time_delta(app, key="key-2", delta=2.5)[1]["watchTime"] == 17
+
+
+def test_update_watch_time_delta_retries_after_a_concurrent_delta(user_table, app_loader):
+    conflict = ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem")
+    user_table.update_item.side_effect = [conflict, {"Attributes": make_user_item()}]
+    app = app_loader("updateWatchTime")
+
+    status, _ = watch_time_delta(app)
+
+    assert status == 200
+    assert user_table.update_item.call_count == 2
+    assert user_table.get_item.call_args.kwargs["ConsistentRead"] is True
+
+
+def test_update_watch_time_rejects_a_bad_delta(user_table, app_loader):
+    app = app_loader("updateWatchTime")
+
+    assert watch_time_delta(app, delta=-1)[0] == 400
+    assert watch_time_delta(app, delta="10")[0] == 400
+    user_table.get_item.assert_not_called()
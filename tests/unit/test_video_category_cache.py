@@ -0,0 +1,53 @@
+import pytest
+
+from focus_utils import youtube
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    youtube.reset_video_category_cache()
+    yield
+    youtube.reset_video_category_cache()
+
+
+def test_warm_invocations_hit_the_cache(monkeypatch):
+    calls = []
+
+    def fake_api():
+        calls.append(1)
+        return ["Education"], {"27": "Education"}
+
+    monkeypatch.setattr(youtube, "get_unique_video_categories", fake_api)
+
+    for _ in range(3):
+        _, category_id_to_name = youtube.get_cached_video_categories()
+
+    assert category_id_to_name == {"27": "Education"}
+    assert len(calls) == 1
+    assert youtube.video_category_cache_stats == {"hits": 2, "misses": 1, "fallbacks": 0}
+
+
+def test_expired_entry_is_refetched(monkeypatch):
+    calls = []
+    monkeypatch.setattr(youtube, "get_unique_video_categories", lambda: calls.append(1) or ([], {}))
+
+    youtube.get_cached_video_categories()
+    youtube._video_category_cache["expires_at"] = 0.0
+    youtube.get_cached_video_categories()
+
+    assert len(calls) == 2
+    assert youtube.video_category_cache_stats["misses"] == 2
+
+
+def test_falls_back_to_bundled_snapshot(monkeypatch):
+    def unreachable():
+        raise ConnectionError("no route to www.googleapis.com")
+
+    monkeypatch.setattr(youtube, "get_unique_video_categories", unreachable)
+
+    categories, category_id_to_name = youtube.get_cached_video_categories()
+
+    assert category_id_to_name["27"] == "Education"
+    assert category_id_to_name["28"] == "Science and Technology"
+    assert "Howto and Style" in categories
+    assert youtube.video_category_cache_stats["fallbacks"] == 1
@@ -0,0 +1,114 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from focus_utils import youtube, tables
+
+YOUTUBE_ITEM = {
+    "kind": "youtube#video",
+    "etag": "etag-1",
+    "id": "abc123",
+    "snippet": {
+        "publishedAt": "2024-01-01T00:00:00Z",
+        "channelId": "channel-1",
+        "title": "Complete JavaScript Course for Beginners",
+        "description": "Learn everything from variables to DOM manipulation.",
+        "thumbnails": {"default": {"url": "https://i.ytimg.com/vi/abc123/default.jpg"}},
+        "channelTitle": "Code Academy",
+        "categoryId": "27",
+        "localized": {"title": "Complete JavaScript Course for Beginners"},
+    },
+    "statistics": {"viewCount": "10", "likeCount": "2"},
+}
+
+
+def make_response(status_code, payload=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = payload
+    response.headers = {}
+    return response
+
+
+@pytest.fixture()
+def youtube_session(monkeypatch):
+    youtube.reset_video_metadata_cache()
+    session = MagicMock()
+    session.get.return_value = make_response(200, {"etag": "list-etag-1", "items": [YOUTUBE_ITEM]})
+    monkeypatch.setattr(youtube, "youtube_session", session)
+    monkeypatch.setattr(tables, "video_metadata_table", None)
+    yield session
+    youtube.reset_video_metadata_cache()
+
+
+def test_thumbnails_and_localized_copies_are_dropped(youtube_session):
+    item = youtube.fetch_youtube_data("abc123")
+
+    assert item["snippet"] == {
+        "publishedAt": "2024-01-01T00:00:00Z",
+        "channelId": "channel-1",
+        "title": "Complete JavaScript Course for Beginners",
+        "description": "Learn everything from variables to DOM manipulation.",
+        "channelTitle": "Code Academy",
+        "categoryId": "27",
+    }
+    # the rest of the item is stored in the preference row as it came
+    assert {key: value for key, value in item.items() if key != "snippet"} == {
+        key: value for key, value in YOUTUBE_ITEM.items() if key != "snippet"
+    }
+    assert youtube_session.get.call_args.kwargs["timeout"] == youtube.YOUTUBE_REQUEST_TIMEOUT
+
+
+def test_repeat_views_are_served_from_memory(youtube_session):
+    for _ in range(4):
+        youtube.fetch_youtube_data("abc123")
+
+    assert youtube_session.get.call_count == 1
+    assert youtube.video_metadata_cache_stats["memory_hits"] == 3
+    assert youtube.get_video_metadata_cache_hit_ratio() == 0.75
+
+
+def test_cold_container_reads_the_cache_table(youtube_session, monkeypatch):
+    table = MagicMock()
+    table.get_item.return_value = {"Item": {
+        "video_id": "abc123",
+        "item": youtube.trim_youtube_video_item(YOUTUBE_ITEM),
+        "fetched_at": youtube.time.time(),
+    }}
+    monkeypatch.setattr(tables, "video_metadata_table", table)
+
+    item = youtube.fetch_youtube_data("abc123")
+
+    assert item["snippet"]["categoryId"] == "27"
+    assert youtube_session.get.call_count == 0
+    assert youtube.video_metadata_cache_stats["table_hits"] == 1
+
+
+def test_stale_entry_is_refetched_conditionally(youtube_session):
+    youtube.fetch_youtube_data("abc123")
+    youtube._video_metadata_cache["abc123"]["fetched_at"] -= youtube.VIDEO_METADATA_CACHE_TTL_SECONDS
+    youtube_session.get.return_value = make_response(304)
+
+    item = youtube.fetch_youtube_data("abc123")
+
+    # the response's ETag, not the video resource's
+    assert youtube_session.get.call_args.kwargs["headers"] == {"If-None-Match": "list-etag-1"}
+    assert item["snippet"]["title"] == "Complete JavaScript Course for Beginners"
+    assert youtube.video_metadata_cache_stats["not_modified"] == 1
+
+
+def test_stale_table_entry_is_refetched_with_its_response_etag(youtube_session, monkeypatch):
+    table = MagicMock()
+    table.get_item.return_value = {"Item": {
+        "video_id": "abc123",
+        "item": youtube.trim_youtube_video_item(YOUTUBE_ITEM),
+        "etag": "list-etag-0",
+        "fetched_at": youtube.time.time() - youtube.VIDEO_METADATA_CACHE_TTL_SECONDS,
+    }}
+    monkeypatch.setattr(tables, "video_metadata_table", table)
+    youtube_session.get.return_value = make_response(304)
+
+    youtube.fetch_youtube_data("abc123")
+
+    assert youtube_session.get.call_args.kwargs["headers"] == {"If-None-Match": "list-etag-0"}
+    assert table.put_item.call_args.kwargs["Item"]["etag"] == "list-etag-0"
@@ -0,0 +1,143 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from focus_utils import tables
+from focus_utils.batch_write import BATCH_WRITE_MAX_ITEMS, UNPROCESSED_ERROR, batch_put_items
+from focus_utils.retry import RetryScheduler
+
+
+def make_table(*responses):
+    table = MagicMock()
+    table.name = "VideoRecordLog"
+    table.meta.client.batch_write_item.side_effect = list(responses)
+    return table
+
+
+def unprocessed(table, *items):
+    return {"UnprocessedItems": {table.name: [{"PutRequest": {"Item": item}} for item in items]}}
+
+
+def make_retry(max_attempts=5):
+    return RetryScheduler(max_attempts=max_attempts, base_delay=0.01, sleep=lambda delay: None, random=lambda: 0.0)
+
+
+def sent_ids(call):
+    return [request["PutRequest"]["Item"]["Id"] for request in call.kwargs["RequestItems"]["VideoRecordLog"]]
+
+
+def test_items_are_chunked_and_unprocessed_ones_retried():
+    items = [{"Id": f"id-{i}"} for i in range(BATCH_WRITE_MAX_ITEMS + 5)]
+    table = make_table({}, {})
+    table.meta.client.batch_write_item.side_effect = [unprocessed(table, items[3], items[27]), {}, {}]
+
+    errors = batch_put_items(table, items, make_retry())
+
+    calls = table.meta.client.batch_write_item.call_args_list
+    assert [len(sent_ids(call)) for call in calls] == [BATCH_WRITE_MAX_ITEMS, 5, 2]
+    assert sent_ids(calls[2]) == ["id-3", "id-27"]
+    assert errors == [None] * len(items)
+
+
+def test_items_left_unprocessed_are_reported():
+    items = [{"Id": "a"}, {"Id": "b"}]
+    table = make_table()
+    table.meta.client.batch_write_item.side_effect = [unprocessed(table, items[1])] * 2
+
+    errors = batch_put_items(table, items, make_retry(max_attempts=2))
+
+    assert errors == [None, UNPROCESSED_ERROR]
+
+
+def test_a_failed_request_fails_only_its_chunk():
+    items = [{"Id": f"id-{i}"} for i in range(BATCH_WRITE_MAX_ITEMS + 1)]
+    table = make_table(Exception("ValidationException"), {})
+
+    errors = batch_put_items(table, items, make_retry())
+
+    assert errors == ["ValidationException"] * BATCH_WRITE_MAX_ITEMS + [None]
+
+
+@pytest.fixture()
+def video_record_log(app_loader, monkeypatch):
+    app = app_loader("videoRecordLog")
+    user_context = MagicMock()
+    user_context.check_id.return_value = None
+    user_context.touch_and_advance.return_value = ({"current_stage": 1}, "ok")
+    contexts = []
+    monkeypatch.setattr(app, "UserContext", lambda id: contexts.append(user_context) or user_context)
+    table = make_table()
+    table.meta.client.batch_write_item.side_effect = None
+    table.meta.client.batch_write_item.return_value = {}
+    monkeypatch.setattr(tables, "video_record_log_table", table)
+    return app, table, contexts
+
+
+def post(app, body):
+    response = app.lambda_handler({"body": json.dumps(body)}, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def test_batch_runs_the_user_logic_once(video_record_log):
+    app, table, contexts = video_record_log
+    records = [{"videoId": f"video-{i}", "watchTime": i} for i in range(30)]
+
+    status, body = post(app, {"prolificId": "participant-1", "records": records})
+
+    assert status == 200
+    assert len(contexts) == 1
+    assert contexts[0].save.call_count == 1
+    assert table.meta.client.batch_write_item.call_count == 2
+    assert [record["status"] for record in body["records"]] == ["saved"] * 30
+    assert len({record["Id"] for record in body["records"]}) == 30
+    item = table.meta.client.batch_write_item.call_args_list[0].kwargs["RequestItems"]["VideoRecordLog"][0]["PutRequest"]["Item"]
+    assert item["prolificId"] == "participant-1" and item["videoId"] == "video-0"
+    table.put_item.assert_not_called()
+
+
+def test_batch_reports_status_per_record(video_record_log):
+    app, table, _ = video_record_log
+    # DynamoDB never gets to video "b"
+    table.meta.client.batch_write_item.side_effect = lambda RequestItems: unprocessed(
+        table, *[r["PutRequest"]["Item"] for r in RequestItems[table.name] if r["PutRequest"]["Item"]["videoId"] == "b"]
+    )
+    records = [{"videoId": "a"}, "not a record", {"videoId": "b"}, {"videoId": "c", "prolificId": "someone-else"}]
+
+    status, body = post(app, {"prolificId": "participant-1", "records": records})
+
+    assert status == 207
+    assert [record["status"] for record in body["records"]] == ["saved", "invalid", "failed", "invalid"]
+    assert body["message"] == "Logged 1 of 4 video records"
+
+
+def test_client_ids_do_not_replace_the_generated_ones(video_record_log):
+    app, table, _ = video_record_log
+    records = [{"Id": "same", "videoId": f"video-{i}"} for i in range(3)]
+
+    status, body = post(app, {"prolificId": "participant-1", "records": records})
+
+    assert status == 200
+    ids = sent_ids(table.meta.client.batch_write_item.call_args)
+    assert "same" not in ids and len(set(ids)) == 3
+    assert ids == [record["Id"] for record in body["records"]]
+
+
+def test_single_record_mode_is_unchanged(video_record_log):
+    app, table, _ = video_record_log
+
+    status, body = post(app, {"prolificId": "participant-1", "videoId": "a"})
+
+    assert status == 200
+    assert table.put_item.call_args.kwargs["Item"]["videoId"] == "a"
+    table.meta.client.batch_write_item.assert_not_called()
+
+
+@pytest.mark.parametrize("records", [[], "a", [{}] * 101])
+def test_bad_batches_are_rejected(video_record_log, records):
+    app, _, contexts = video_record_log
+
+    status, _ = post(app, {"prolificId": "participant-1", "records": records})
+
+    assert status == 400
+    assert contexts == []
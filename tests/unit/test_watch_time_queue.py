@@ -0,0 +1,135 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from focus_utils import tables
+from focus_utils.queues import LocalQueue
+from focus_utils.stage import IDEMPOTENCY_KEYS_KEPT
+from focus_utils.watch_time import WatchTimeCoalescer, make_watch_time_message
+from tests.harness import make_participant_item
+
+
+@pytest.fixture()
+def user_table(monkeypatch):
+    items = {user_id: make_participant_item(user_id) for user_id in ("participant-1", "participant-2")}
+    table = MagicMock()
+    table.get_item.side_effect = lambda Key, **kwargs: {"Item": items[Key["User_Id"]]} if Key["User_Id"] in items else {}
+    table.update_item.side_effect = lambda Key, **kwargs: {"Attributes": items[Key["User_Id"]]}
+    monkeypatch.setattr(tables, "user_table", table)
+    return table
+
+
+def increments(update_kwargs):
+    """ {stage: amount} from the SET ... if_not_exists(...) + :dN clauses of an update_item call """
+    names = update_kwargs["ExpressionAttributeNames"]
+    values = update_kwargs["ExpressionAttributeValues"]
+    return {names[f"#n{i}_1"]: values[f":d{i}"] for i in range(len(values)) if f":d{i}" in values}
+
+
+def test_deltas_are_merged_into_one_write_per_participant(user_table):
+    coalescer = WatchTimeCoalescer()
+    for stage, delta in [(1, 5), (1, 10), (2, 3), (1, 2.5)]:
+        coalescer.add(make_watch_time_message("participant-1", stage, delta))
+    coalescer.add(make_watch_time_message("participant-2", 1, 7))
+
+    assert coalescer.merged_deltas() == {("participant-1", "1"): 17.5, ("participant-1", "2"): 3, ("participant-2", "1"): 7}
+    assert coalescer.flush() == []
+
+    assert user_table.update_item.call_count == 2
+    first = user_table.update_item.call_args_list[0].kwargs
+    assert first["Key"] == {"User_Id": "participant-1"}
+    assert increments(first) == {"1": 17.5, "2": 3}
+    assert coalescer.pending == {}
+
+
+def test_redelivered_deltas_are_counted_once(user_table):
+    coalescer = WatchTimeCoalescer()
+    for key in ("key-1", "key-2", "key-1"):
+        coalescer.add(make_watch_time_message("participant-1", 1, 10, idempotency_key=key))
+
+    coalescer.flush()
+
+    update_kwargs = user_table.update_item.call_args.kwargs
+    assert increments(update_kwargs) == {"1": 20}
+    assert update_kwargs["ConditionExpression"] == "attribute_exists(User_Id) AND attribute_not_exists(#e0)"
+
+
+def claimed_keys(update_kwargs):
+    names = update_kwargs["ExpressionAttributeNames"]
+    key_name = next(name for name, attribute in names.items() if attribute == "Watch_Time_Idempotency_Keys")
+    value_name = update_kwargs["UpdateExpression"].split(f"{key_name} = ")[1].split(",")[0].strip()
+    return update_kwargs["ExpressionAttributeValues"][value_name]
+
+
+def test_more_keys_than_the_row_keeps_are_split_across_writes(user_table):
+    coalescer = WatchTimeCoalescer()
+    for i in range(IDEMPOTENCY_KEYS_KEPT + 10):
+        coalescer.add(make_watch_time_message("participant-1", 1, 1, idempotency_key=f"key-{i}"), f"message-{i}")
+
+    def update_item(Key, **kwargs):
+        # the second write fails
+        if user_table.update_item.call_count == 2:
+            raise RuntimeError("throttled")
+        return {"Attributes": {}}
+    user_table.update_item.side_effect = update_item
+
+    failed_message_ids = coalescer.flush()
+
+    first, second = [call.kwargs for call in user_table.update_item.call_args_list]
+    # no write drops a key it claims itself
+    assert claimed_keys(first) == [f"key-{i}" for i in range(IDEMPOTENCY_KEYS_KEPT)]
+    assert claimed_keys(second)[-10:] == [f"key-{i}" for i in range(IDEMPOTENCY_KEYS_KEPT, IDEMPOTENCY_KEYS_KEPT + 10)]
+    assert increments(first) == {"1": IDEMPOTENCY_KEYS_KEPT}
+    # only the deltas of the failed write come back
+    assert failed_message_ids == [f"message-{i}" for i in range(IDEMPOTENCY_KEYS_KEPT, IDEMPOTENCY_KEYS_KEPT + 10)]
+
+
+def test_consumer_only_writes_the_increments(user_table):
+    coalescer = WatchTimeCoalescer()
+    coalescer.add(make_watch_time_message("participant-1", 2, 5, idempotency_key="key-1"))
+
+    coalescer.flush()
+
+    update_kwargs = user_table.update_item.call_args.kwargs
+    written = set(update_kwargs.get("ExpressionAttributeNames", {}).values())
+    assert written == {"StageWatchTimes", "2", "Watch_Time_Idempotency_Keys"}
+    assert "Current_Stage" not in update_kwargs["UpdateExpression"]
+
+
+def test_update_watch_time_enqueues_and_the_consumer_coalesces(user_table, app_loader, monkeypatch):
+    update_watch_time = app_loader("updateWatchTime")
+    consumer = app_loader("watchTimeConsumer")
+    queue = LocalQueue()
+    monkeypatch.setattr(update_watch_time, "get_watch_time_queue", lambda: queue)
+
+    for i in range(5):
+        body = {"prolificId": "participant-1", "stage": 2, "watchTimeDelta": 6, "idempotencyKey": f"key-{i}"}
+        response = update_watch_time.lambda_handler({"body": json.dumps(body)}, None)
+        assert response["statusCode"] == 202
+    user_table.get_item.assert_not_called()
+
+    result = consumer.lambda_handler({"Records": queue.receive() + [{"messageId": "bad", "body": "{not json"}]}, None)
+
+    assert result == {"batchItemFailures": []}
+    assert user_table.update_item.call_count == 1
+    assert increments(user_table.update_item.call_args.kwargs) == {"2": 30}
+
+
+def test_failed_participants_are_redelivered(user_table, app_loader):
+    consumer = app_loader("watchTimeConsumer")
+    queue = LocalQueue()
+    queue.send(make_watch_time_message("participant-1", 1, 5))
+    queue.send(make_watch_time_message("participant-2", 1, 5))
+    queue.send(make_watch_time_message("participant-2", 3, 5))
+
+    def update_item(Key, **kwargs):
+        if Key["User_Id"] == "participant-2":
+            raise RuntimeError("throttled")
+        return {"Attributes": {}}
+
+    user_table.update_item.side_effect = update_item
+
+    result = consumer.lambda_handler({"Records": queue.receive()}, None)
+
+    assert result == {"batchItemFailures": [{"itemIdentifier": "local-2"}, {"itemIdentifier": "local-3"}]}
@@ -1,7 +1,26 @@
 import json
-from focus_utils import user_table, CORS_HEADERS, check_id, update_last_active_time, update_user_stage, decimal_to_int
+from focus_utils import CORS_HEADERS, UserContext, decimal_to_int, apply_watch_time, get_watch_time_queue, make_watch_time_message, instrument_handler
 
+
+@instrument_handler("updateWatchTime")
 def lambda_handler(event, context):
+    """
+    Updates a participant's watch time for a stage. Two modes:
+
+        {"prolificId": "...", "stage": 2, "watchTime": 120}
+            absolute: StageWatchTimes.<stage> is set to watchTime
+
+        {"prolificId": "...", "stage": 2, "watchTimeDelta": 15, "idempotencyKey": "..."}
+            delta: watchTimeDelta seconds are added atomically, so tabs can't overwrite each
+            other. A retried request with an idempotencyKey that was already applied is
+            acknowledged without adding the seconds again (the last 50 keys are remembered).
+
+    When the watch-time queue is configured, a delta is only enqueued and the response (202)
+    comes back right away; watchTimeConsumer writes the coalesced deltas. That response has
+    no stage_status / stage_status_message (the user row isn't read) and the delta doesn't
+    count as activity: Last_Active_At_Time and the stage are left to /stage and the other
+    handlers. The synchronous responses (200) keep both fields.
+    """
     try:
         requested_body: dict = json.loads(event["body"])
     except (ValueError, TypeError) as e:
@@ -27,8 +46,66 @@ def lambda_handler(event, context):
     id: str = str(requested_body.get("prolificId"))
     stage_to_update: str = str(requested_body.get("stage"))
     watch_time: int = requested_body.get("watchTime") 
+    watch_time_delta = requested_body.get("watchTimeDelta")
+    idempotency_key = requested_body.get("idempotencyKey")
+
+    if watch_time_delta is not None:
+        if isinstance(watch_time_delta, bool) or not isinstance(watch_time_delta, (int, float)) or watch_time_delta < 0:
+            return {
+                "statusCode": 400,
+                "headers": CORS_HEADERS,
+                "body": json.dumps({
+                    "message": "watchTimeDelta must be a non-negative number of seconds"
+                }),
+            }
+        if idempotency_key is not None and not isinstance(idempotency_key, str):
+            return {
+                "statusCode": 400,
+                "headers": CORS_HEADERS,
+                "body": json.dumps({
+                    "message": "idempotencyKey must be a string"
+                }),
+            }
 
-    is_missing = check_id(id)
+        queue = get_watch_time_queue()
+        if queue is not None:
+            try:
+                queue.send(make_watch_time_message(id, stage_to_update, watch_time_delta, idempotency_key))
+                return {
+                    "statusCode": 202,
+                    "headers": CORS_HEADERS,
+                    "body": json.dumps({
+                        "message": "Watch time queued."
+                    }),
+                }
+            except Exception as e:
+                # writing the delta directly is slower but loses nothing
+                print(f"Watch time enqueue failed, writing directly: {str(e)}")
+
+        result = apply_watch_time(id, [{"stage": stage_to_update, "watchTimeDelta": watch_time_delta, "idempotencyKey": idempotency_key}])
+        if result is None:
+            return {
+                    "statusCode": 200,
+                    "headers": CORS_HEADERS,
+                    "body": json.dumps({
+                        "message": "User is not yet onboarded."
+                    }),
+            }
+
+        user_context, data, message, applied = result
+        return {
+            "statusCode": 200,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({
+                "stage_status": data,
+                "stage_status_message": message,
+                "message": "Watch time added successfully." if applied else "Watch time was already added for this idempotencyKey.",
+                "watchTime": user_context.item.get("StageWatchTimes", {}).get(stage_to_update)
+            }, default=decimal_to_int),
+        }
+
+    user_context = UserContext(id)
+    is_missing = user_context.check_id()
     if is_missing: 
         return {
                 "statusCode": 200,
@@ -38,29 +115,11 @@ def lambda_handler(event, context):
                 }),
         }
 
-    # update the last active timestamp for user
-    update_last_active_time(id)
-
-    # update the stgae info if it in time stamp.
-    Stage_Status_Response = update_user_stage(id)
-    parsed_body = json.loads(Stage_Status_Response["body"]) 
-
-    # Now you can safely access "data"
-    data = parsed_body["data"]
-    message = parsed_body["message"]
-
-
-    user_table.update_item(
-        Key={"User_Id": id},
-            UpdateExpression="SET StageWatchTimes.#stageKey = :watch_time",
-            ExpressionAttributeNames={
-                "#stageKey": stage_to_update
-            },
-            ExpressionAttributeValues={
-                ":watch_time": watch_time
-            },
-            ReturnValues="ALL_NEW"
-    )
+    # update the last active timestamp and the stgae info if it in time stamp.
+    data, message = user_context.touch_and_advance()
+    # the watch time goes out in the same write as the activity and stage changes
+    user_context.set_attribute("StageWatchTimes", stage_to_update, value=watch_time)
+    user_context.save()
 
     return {
         "statusCode": 200,
@@ -70,4 +129,4 @@ def lambda_handler(event, context):
             "stage_status_message": message,
             "message": "Watch time updated successfully."
         }, default=decimal_to_int),
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,157 @@
+"""
+Shared code for the FocusMode Lambdas (deployed as the utils layer).
+
+The layer is split into submodules so a function only loads what it uses:
+
+    focus_utils.common       constants, CORS headers, request/date helpers (always loaded)
+    focus_utils.tables       DynamoDB resource and table handles, created on first use
+    focus_utils.batch_write  BatchWriteItem with unprocessed-item retries and per-item results
+    focus_utils.stage        UserContext and the study stage logic
+    focus_utils.preferences  user preference table reads/writes used by /categorize
+    focus_utils.queues       SQS queues the handlers hand work off through, and an in-memory stand-in
+    focus_utils.watch_time   watch-time deltas: atomic apply, queueing and per-participant coalescing
+    focus_utils.tracing      per-invocation latency trace, EMF metrics and the shared worker pool
+    focus_utils.http_client  pooled keep-alive sessions per external host, with timing logs
+    focus_utils.retry        deadline-aware retry/backoff for external calls
+    focus_utils.youtube      YouTube Data API calls and their caches
+    focus_utils.prompt       the LLM prompt
+    focus_utils.keywords     compiled matcher for the focus categories' keywords
+    focus_utils.llm          the OpenAI categorization request, with deadline-aware retries
+    focus_utils.jobs         async categorize jobs: queueing, the worker's model call and job status
+    focus_utils.rules        local evaluation of the prompt's rules (skips the LLM on strong signals)
+    focus_utils.decisions    cache of categorize decisions keyed by the prompt's features
+    focus_utils.schema       validators for the /collect data types, compiled from data_types.yaml
+    focus_utils.preprocess   video entry preprocessing (pandas only for the batch helpers)
+
+`from focus_utils import X` keeps working for every name the layer used to export;
+the submodule providing X is imported the first time X is looked up.
+"""
+import importlib
+
+from focus_utils.common import (
+    USER_TABLE_NAME,
+    DATA_TABLE_NAME,
+    ADMIN_TABLE_NAME,
+    USER_PREFERENCE_DATA_TABLE_NAME,
+    DAILY_SURVEY_DATA_TABLE_NAME,
+    POST_STAGE_SURVEY_DATA_TABLE_NAME,
+    POST_STAGE_RATING_SURVEY_DATA_TABLE_NAME,
+    POST_STUDY_SURVEY_DATA_TABLE_NAME,
+    VIDEO_RECORD_LOG_TABLE_NAME,
+    CORS_HEADERS,
+    decimal_to_int,
+    check_query_parameters,
+    generate_verification_code,
+    generate_weekly_stage_start_times,
+    generate_stage_schedule,
+    format_datetime_str,
+    get_current_datetime_str,
+    get_datetime_obj,
+    get_epoch_seconds,
+    STAGE_LENGTH_DAYS,
+    STAGE_LENGTH_SECONDS,
+)
+
+
+_LAZY_SUBMODULES = {
+    "tables": [
+        "dynamodb", "admin_table", "user_table", "user_pref_data_table", "video_record_log_table",
+        "video_metadata_table", "VIDEO_METADATA_CACHE_TABLE_NAME", "decision_cache_table", "DECISION_CACHE_TABLE_NAME",
+        "daily_survey_data_table", "post_stage_survey_data_table", "post_study_survey_data_table",
+        "post_stage_rating_survey_data_table", "DATA_TYPE_TABLES", "get_table_for_data_type",
+    ],
+    "batch_write": [
+        "BATCH_WRITE_MAX_ITEMS", "BATCH_WRITE_RETRY", "batch_put_items",
+    ],
+    "stage": [
+        "UserContext", "check_id", "compute_stage_transition", "update_last_active_time", "update_user_stage",
+        "get_next_stage", "getStageResponseObject", "get_current_study_stage", "is_study_over",
+        "stage_schedule_from_start_times", "get_stage_schedule", "locate_in_schedule",
+    ],
+    "watch_time": [
+        "WATCH_TIME_QUEUE_URL",
+        "make_watch_time_message", "apply_watch_time", "get_watch_time_queue", "WatchTimeCoalescer",
+    ],
+    "queues": [
+        "SqsQueue", "LocalQueue", "get_queue",
+    ],
+    "preferences": [
+        "update_user_with_focus_status", "fetch_and_insert_user_entry", "get_recent_decisions", "record_recent_decision",
+        "get_previous_entries", "apply_previous_entries", "insert_user_entry", "record_pending_entry", "get_focus_status",
+    ],
+    "tracing": [
+        "WORKER_POOL_SIZE", "LatencyTrace", "get_executor",
+        "METRICS_NAMESPACE", "METRICS_ENABLED", "InvocationMetrics", "get_invocation_metrics", "span", "add_count",
+        "instrument_handler", "register_botocore_spans",
+    ],
+    "retry": [
+        "RETRYABLE_STATUS_CODES", "FALLBACK_RESERVE_SECONDS", "RetryScheduler", "get_retry_after",
+    ],
+    "http_client": [
+        "OPENAI_API_HOST", "YOUTUBE_API_HOST", "HOST_SETTINGS", "TimedHTTPAdapter", "http_timing_stats",
+        "get_session", "reset_sessions",
+    ],
+    "youtube": [
+        "YOUTUBE_API_KEY", "YOUTUBE_REQUEST_TIMEOUT", "youtube_session",
+        "VIDEO_CATEGORY_CACHE_TTL_SECONDS", "VIDEO_CATEGORY_RETRY_SECONDS", "VIDEO_CATEGORY_SNAPSHOT_PATH",
+        "video_category_cache_stats", "normalize_category_names", "get_unique_video_categories",
+        "parse_video_categories", "load_video_category_snapshot", "get_cached_video_categories",
+        "reset_video_category_cache",
+        "VIDEO_METADATA_CACHE_TTL_SECONDS", "VIDEO_METADATA_TABLE_RETENTION_SECONDS", "VIDEO_METADATA_CACHE_SIZE",
+        "VIDEO_METADATA_DROPPED_SNIPPET_FIELDS", "video_metadata_cache_stats", "trim_youtube_video_item",
+        "get_video_metadata_cache_hit_ratio", "reset_video_metadata_cache", "fetch_youtube_data",
+    ],
+    "prompt": [
+        "FEW_SHOT_EXAMPLES", "CATEGORY_KEYWORDS", "get_rule_inputs", "build_prompt",
+        "STATIC_INSTRUCTIONS", "STATIC_PROMPT_PREFIX", "FEW_SHOT_INDEX", "PROMPT_FEW_SHOT_MODE", "PROMPT_FEW_SHOT_K",
+        "select_few_shot_examples", "build_dynamic_prompt", "build_prompt_messages", "log_prompt_usage",
+    ],
+    "keywords": [
+        "KeywordMatcher", "get_keyword_matcher", "tokenize",
+    ],
+    "llm": [
+        "OPENAI_CHAT_COMPLETIONS_URL", "OPENAI_MODEL", "OPENAI_MAX_ATTEMPTS", "CATEGORIZATION_RESPONSE_FORMAT",
+        "DEFAULT_CATEGORIZATION", "shorten_explanation_summary", "request_categorization",
+    ],
+    "jobs": [
+        "CATEGORIZE_JOB_QUEUE_URL", "CATEGORIZE_STATUS_MAX_WAIT_SECONDS", "CATEGORIZE_STATUS_POLL_SECONDS",
+        "get_categorize_job_queue", "make_categorize_job", "get_categorize_job_status", "run_categorize_job",
+    ],
+    "rules": [
+        "LOCAL_RULES_ENABLED", "DECISIVE_RULES", "evaluate_rules", "decide_locally",
+    ],
+    "decisions": [
+        "DECISION_CACHE_TTL_SECONDS", "DECISION_CACHE_SIZE", "DECISION_CACHE_KEY_VERSION", "decision_cache_stats",
+        "get_decision_fingerprint", "get_decision_cache_stats", "reset_decision_cache", "get_cached_decision",
+        "remember_decision",
+    ],
+    "schema": [
+        "FIELD_TYPES", "DataTypeValidator", "compile_data_types",
+    ],
+    "preprocess": [
+        "UNWANTED_COLUMNS", "UNWANTED_COLUMN_PREFIX", "parse_intent_node", "flatten_dict", "get_time_of_day",
+        "parse_video_entry_to_df", "expand_intent_node", "update_intent_data", "extract_features",
+        "drop_unwanted_columns", "rename_columns_to_last_segment", "preprocess_video_json_entry_df",
+        "parse_video_entry_to_record", "expand_intent_node_record", "update_intent_data_record",
+        "extract_features_record", "drop_unwanted_fields_record", "rename_fields_to_last_segment_record",
+        "preprocess_video_json_entry",
+    ],
+}
+
+_NAME_TO_SUBMODULE = {
+    name: submodule for submodule, names in _LAZY_SUBMODULES.items() for name in names
+}
+
+
+def __getattr__(name):
+    submodule = _NAME_TO_SUBMODULE.get(name)
+    if submodule is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f"{__name__}.{submodule}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_NAME_TO_SUBMODULE))
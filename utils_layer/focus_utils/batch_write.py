@@ -0,0 +1,61 @@
+"""
+BatchWriteItem with the unprocessed items retried and a result for every item.
+
+    retry = RetryScheduler.from_lambda_context(context, **BATCH_WRITE_RETRY)
+    errors = batch_put_items(tables.video_record_log_table, items, retry)
+
+table.batch_writer() retries unprocessed items until they are written and can't say which
+ones failed; this stops when the scheduler runs out of attempts or time and reports them.
+"""
+from focus_utils.retry import RetryScheduler
+
+
+# DynamoDB's limit per BatchWriteItem request
+BATCH_WRITE_MAX_ITEMS = 25
+# unprocessed items come back under throttling, so the backoff is short and capped well below a second
+BATCH_WRITE_RETRY = {"max_attempts": 5, "base_delay": 0.05, "max_delay": 1.0, "reserve_seconds": 0.5}
+UNPROCESSED_ERROR = "Not written: DynamoDB left the item unprocessed"
+
+
+def batch_put_items(table, items: list, retry: RetryScheduler = None, key_attribute: str = "Id") -> list:
+    """
+    Puts items into table with BatchWriteItem, BATCH_WRITE_MAX_ITEMS per request.
+
+    Every round sends the items still pending; the UnprocessedItems of a round are sent again
+    after retry.wait(). A request that fails outright fails its items without a retry (botocore
+    has already retried it). items must have distinct key_attribute values.
+
+    Returns a list parallel to items: None for a written item, else the error message.
+    """
+    if retry is None:
+        retry = RetryScheduler(**BATCH_WRITE_RETRY)
+
+    client = table.meta.client
+    index_by_key = {item[key_attribute]: i for i, item in enumerate(items)}
+    errors = [None] * len(items)
+    pending = list(range(len(items)))
+
+    for _ in retry.attempts():
+        unprocessed = []
+        for start in range(0, len(pending), BATCH_WRITE_MAX_ITEMS):
+            chunk = pending[start:start + BATCH_WRITE_MAX_ITEMS]
+            try:
+                response = client.batch_write_item(RequestItems={
+                    table.name: [{"PutRequest": {"Item": items[i]}} for i in chunk]
+                })
+            except Exception as e:
+                print(f"Batch write to {table.name} failed: {str(e)}")
+                for i in chunk:
+                    errors[i] = str(e)
+                continue
+
+            for request in response.get("UnprocessedItems", {}).get(table.name, []):
+                unprocessed.append(index_by_key[request["PutRequest"]["Item"][key_attribute]])
+
+        pending = sorted(unprocessed)
+        if not pending or not retry.wait():
+            break
+
+    for i in pending:
+        errors[i] = UNPROCESSED_ERROR
+    return errors
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import time
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+
+# constants:
+USER_TABLE_NAME = "focusmode-FocusModeUserTable-6JC0TNI2RB93"               #os.environ.get("UserTableName", None)
+DATA_TABLE_NAME = "focusmode-FocusModeDataCollectionTable-1KRCB5ZWJ6ONL"    #os.environ.get("DataTableName", None)
+ADMIN_TABLE_NAME = "focusmode-FocusModeAdminTable-1L8IZJNFRPT8F"            #os.environ.get("AdminTableName", None)
+USER_PREFERENCE_DATA_TABLE_NAME = "focusmode-FocusModeUserPreferenceDataTable-1GDK11Q0RIAAO" #os.environ.get("UserPreferenceDataTableName") 
+DAILY_SURVEY_DATA_TABLE_NAME = "focusmode-FocusModeDailySurveyResponseTable-NESGY2X0XTDN" #os.environ.get("DailySurveyDataTableName")
+POST_STAGE_SURVEY_DATA_TABLE_NAME = "focusmode-FocusModePostStageSurveyResponseTable-1I0Z60LUCHJ13" #os.environ.get("PostStageSurveyDataTableName")
+POST_STAGE_RATING_SURVEY_DATA_TABLE_NAME = "focusmode-FocusModePostStageRatingSurveyResponseTable-1NNHU7ZVBNO0J" 
+POST_STUDY_SURVEY_DATA_TABLE_NAME = "focusmode-FocusModePostStudySurveyResponseTable-DV2UIJHGAI1U"
+VIDEO_RECORD_LOG_TABLE_NAME = "focusmode-FocusModeVideoRecordLogTable-YQFLJM3NFHAV" #os.environ.get("VideoRecordLogTableName")
+
+# every stage of the study lasts a week
+STAGE_LENGTH_DAYS = 7
+STAGE_LENGTH_SECONDS = STAGE_LENGTH_DAYS * 24 * 60 * 60
+_EPOCH = datetime(1970, 1, 1)
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Headers" : "Content-Type",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, POST, OPTIONS"
+}
+
+
+def decimal_to_int(obj):
+    if isinstance(obj, Decimal):
+        return int(obj)
+    raise TypeError("Type not serializable")
+
+
+def check_query_parameters(event_query_string_parameters: list[str], required_parameters: list[str]):
+    # missing all parameters
+    if event_query_string_parameters == None:
+        return {
+            "statusCode": 400,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({
+                "message": f"Missing the query parameter(s): {", ".join(required_parameters)}"
+            }),
+        }
+    
+    parameters_missing = set(required_parameters) - set(event_query_string_parameters)
+    
+    # missing some parameters
+    if len(parameters_missing) != 0:
+        return {
+            "statusCode": 400,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({
+                "message": f"Missing the query parameter(s): {", ".join(parameters_missing)}"
+            }),
+        }
+    
+    # no parameters missing!
+    return None
+
+# Utility to generate a unique verification code (e.g., SHA-256 of prolificId + timestamp)
+def generate_verification_code(prolific_id: str) -> str:
+    timestamp = str(int(time.time() * 1000)) 
+    to_hash = f"{prolific_id}-{timestamp}"
+    hash_value = hashlib.sha256(to_hash.encode()).hexdigest()
+    return hash_value
+
+
+def generate_weekly_stage_start_times(start_ts_str: str, stage_order_list: list[int]) -> dict[str, str]:
+    start_dt = get_datetime_obj(start_ts_str)
+    stage_map = {}
+    for i, stage in enumerate(stage_order_list):
+        stage_start = start_dt + timedelta(days=STAGE_LENGTH_DAYS * i)
+        stage_map[str(stage)] = format_datetime_str(stage_start)
+    return stage_map
+
+def generate_stage_schedule(start_ts_str: str, stage_order_list: list[int]) -> list[int]:
+    """
+    Stage_Schedule for a participant starting at start_ts_str: the epoch second each stage of
+    stage_order_list starts at, followed by the end of the study. The same instants as
+    generate_weekly_stage_start_times, so a stage lookup is a single bisect.
+    """
+    # Stage_Start_Times is written with whole seconds, so the boundaries are too
+    start = int(get_epoch_seconds(get_datetime_obj(start_ts_str)))
+    return [start + STAGE_LENGTH_SECONDS * i for i in range(len(stage_order_list) + 1)]
+
+def format_datetime_str(datetime: datetime) -> str: 
+    return datetime.isoformat(timespec='seconds')
+
+def get_current_datetime_str() -> str:
+    return format_datetime_str(datetime.now())
+
+def get_datetime_obj(datetime_str: str) -> datetime:
+    return datetime.fromisoformat(datetime_str)
+
+def get_epoch_seconds(datetime_obj: datetime) -> float:
+    """ Seconds since the epoch; naive datetimes (as get_current_datetime_str writes them) are taken as UTC """
+    if datetime_obj.tzinfo is not None:
+        return datetime_obj.timestamp()
+    return (datetime_obj - _EPOCH).total_seconds()
@@ -0,0 +1,122 @@
+"""
+Cache of categorize decisions keyed by a fingerprint of everything build_prompt feeds the model.
+
+Identical contexts (a participant replaying or reloading a video) get the earlier answer back
+without an OpenAI round trip. Entries live in an in-process LRU and, when
+DecisionCacheTableName is set, in a DynamoDB table with TTL shared by all containers.
+"""
+import copy
+import hashlib
+import json
+import os
+import time
+
+from collections import OrderedDict
+
+from focus_utils import tables
+from focus_utils.prompt import PROMPT_FEW_SHOT_MODE, get_rule_inputs
+from focus_utils.tracing import add_count
+
+
+DECISION_CACHE_TTL_SECONDS = int(os.environ.get("DecisionCacheTtlSeconds", 7 * 24 * 60 * 60))
+DECISION_CACHE_SIZE = 1024
+# bump when the prompt or model changes so older answers are no longer reused
+DECISION_CACHE_KEY_VERSION = "gpt-4o-mini/2"
+DECISION_RESULT_FIELDS = ("category", "explanation", "explanation_summary")
+_decision_cache = OrderedDict()
+decision_cache_stats = {"memory_hits": 0, "table_hits": 0, "misses": 0}
+
+
+def get_decision_fingerprint(row) -> str:
+    """
+    Stable hash of the features the prompt is built from: title, truncated description,
+    category, the previous three categories and focus flags, subscription, intent source and
+    the user's focus categories (plus the keyword hits / description length rules 9 and 10 use).
+    """
+    inputs = get_rule_inputs(row)
+    features = [
+        DECISION_CACHE_KEY_VERSION,
+        PROMPT_FEW_SHOT_MODE,
+        inputs["title"],
+        inputs["desc"][:140],
+        inputs["current_cat"],
+        inputs["prev_cats"],
+        inputs["prev_focuses"],
+        inputs["is_sub"],
+        inputs["intent_source"],
+        inputs["focus_cats"],
+        sorted(inputs["key_hits"]),
+        inputs["desc_wc"] > 50,
+    ]
+    return hashlib.sha256(json.dumps(features, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def get_decision_cache_stats() -> dict:
+    stats = dict(decision_cache_stats)
+    hits = stats["memory_hits"] + stats["table_hits"]
+    total = hits + stats["misses"]
+    stats["hit_ratio"] = round(hits / total, 4) if total else 0.0
+    return stats
+
+
+def reset_decision_cache():
+    _decision_cache.clear()
+    for key in decision_cache_stats:
+        decision_cache_stats[key] = 0
+
+
+def _remember_decision_in_memory(fingerprint: str, entry: dict):
+    _decision_cache[fingerprint] = entry
+    _decision_cache.move_to_end(fingerprint)
+    while len(_decision_cache) > DECISION_CACHE_SIZE:
+        _decision_cache.popitem(last=False)
+
+
+def get_cached_decision(fingerprint: str):
+    """ Returns the cached result for fingerprint, or None when no fresh entry exists """
+    now = int(time.time())
+    entry = _decision_cache.get(fingerprint)
+    if entry is not None and now - entry["decided_at"] < DECISION_CACHE_TTL_SECONDS:
+        decision_cache_stats["memory_hits"] += 1
+        add_count("DecisionCacheHits")
+        _decision_cache.move_to_end(fingerprint)
+        return copy.deepcopy(entry["result"])
+
+    if tables.decision_cache_table is not None:
+        try:
+            persisted = tables.decision_cache_table.get_item(Key={"fingerprint": fingerprint}).get("Item")
+        except Exception as e:
+            print(f"Decision cache read failed: {str(e)}")
+            persisted = None
+        if persisted and now - int(persisted["decided_at"]) < DECISION_CACHE_TTL_SECONDS:
+            decision_cache_stats["table_hits"] += 1
+            add_count("DecisionCacheHits")
+            entry = {"result": persisted["result"], "decided_at": int(persisted["decided_at"])}
+            _remember_decision_in_memory(fingerprint, entry)
+            return copy.deepcopy(entry["result"])
+
+    decision_cache_stats["misses"] += 1
+    add_count("DecisionCacheMisses")
+    return None
+
+
+def remember_decision(fingerprint: str, result: dict):
+    """ Caches the model's answer (only the DECISION_RESULT_FIELDS) for fingerprint """
+    entry = {
+        "result": {field: result[field] for field in DECISION_RESULT_FIELDS if field in result},
+        "decided_at": int(time.time()),
+    }
+    _remember_decision_in_memory(fingerprint, entry)
+
+    if tables.decision_cache_table is None:
+        return
+    try:
+        tables.decision_cache_table.put_item(Item={
+            "fingerprint": fingerprint,
+            "result": entry["result"],
+            "decided_at": entry["decided_at"],
+            # DynamoDB TTL
+            "expires_at": entry["decided_at"] + DECISION_CACHE_TTL_SECONDS
+        })
+    except Exception as e:
+        print(f"Decision cache write failed: {str(e)}")
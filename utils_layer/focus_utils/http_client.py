@@ -0,0 +1,200 @@
+"""
+Pooled keep-alive HTTP sessions for the external APIs (OpenAI, YouTube Data API).
+
+One requests.Session per host is created on first use and kept for the life of the container,
+so warm invocations reuse the open TLS connection instead of handshaking again. Each host has
+explicit (connect, read) timeouts and a urllib3 retry policy, and every request logs a timing
+breakdown (DNS, TCP connect, TLS, time to first byte) to the JSON logs. urllib3 retries are
+counted in the invocation metrics (focus_utils.tracing) as OpenAIRetries / YouTubeRetries.
+"""
+import logging
+import socket
+import threading
+import time
+
+import requests # type: ignore
+from requests.adapters import HTTPAdapter # type: ignore
+from urllib3.connection import HTTPConnection, HTTPSConnection # type: ignore
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool # type: ignore
+from urllib3.exceptions import ConnectTimeoutError # type: ignore
+from urllib3.util.connection import allowed_gai_family # type: ignore
+from urllib3.util.retry import Retry # type: ignore
+
+from focus_utils.tracing import add_count
+
+
+logger = logging.getLogger(__name__)
+
+OPENAI_API_HOST = "api.openai.com"
+YOUTUBE_API_HOST = "www.googleapis.com"
+
+DEFAULT_TIMEOUT = (3.05, 10) # (connect, read) seconds
+POOL_MAXSIZE = 10
+
+# Only failures where the request never reached the server are retried for POSTs; the
+# categorize handler does its own retrying on 429/502/timeouts from OpenAI.
+HOST_SETTINGS = {
+    OPENAI_API_HOST: {
+        "timeout": (3.05, 30),
+        "retries": Retry(total=2, connect=2, read=0, status=0, other=0, backoff_factor=0.2),
+    },
+    YOUTUBE_API_HOST: {
+        "timeout": (3.05, 10),
+        "retries": Retry(
+            total=2, connect=2, read=1, status=2, backoff_factor=0.2,
+            status_forcelist=(500, 502, 503, 504), allowed_methods=frozenset(["GET"]), raise_on_status=False
+        ),
+    },
+}
+HOST_RETRY_COUNTS = {OPENAI_API_HOST: "OpenAIRetries", YOUTUBE_API_HOST: "YouTubeRetries"}
+DEFAULT_HOST_SETTINGS = {"timeout": DEFAULT_TIMEOUT, "retries": Retry(total=2, connect=2, read=0, status=0, other=0)}
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+# connection timings of the request currently being sent on this thread
+_current_timings = threading.local()
+http_timing_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _record_connection_timing(name: str, elapsed_ms: float):
+    timings = getattr(_current_timings, "value", None)
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + elapsed_ms
+
+
+class _TimedConnectionMixin:
+    """ Splits the time to open a connection into DNS lookup, TCP connect and TLS handshake """
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except socket.gaierror:
+            # let urllib3 resolve it again and raise its usual error
+            return super()._new_conn()
+        resolved = time.perf_counter()
+        _record_connection_timing("dns_ms", (resolved - start) * 1000)
+
+        # try every resolved address in turn, like urllib3's create_connection does
+        hostname = self._dns_host
+        error = None
+        try:
+            for address in dict.fromkeys(info[4][0] for info in addresses):
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except ConnectTimeoutError as e: # NewConnectionError is a subclass
+                    error = e
+            else:
+                raise error
+        finally:
+            self._dns_host = hostname
+        _record_connection_timing("connect_ms", (time.perf_counter() - resolved) * 1000)
+        return sock
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        timings = getattr(_current_timings, "value", None)
+        if timings is not None:
+            timings["new_connection"] = True
+            # whatever connect() spent beyond DNS + TCP was the TLS handshake (0 for plain HTTP)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            timings["tls_ms"] = max(elapsed_ms - timings.get("dns_ms", 0.0) - timings.get("connect_ms", 0.0), 0.0)
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """ HTTPAdapter with a default timeout that logs the timing breakdown of every request """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, **kwargs):
+        self.default_timeout = timeout
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _TimedHTTPConnectionPool, "https": _TimedHTTPSConnectionPool}
+
+    def send(self, request, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = self.default_timeout
+
+        timings = {"new_connection": False}
+        _current_timings.value = timings
+        start = time.perf_counter()
+        try:
+            response = super().send(request, timeout=timeout, **kwargs)
+        finally:
+            _current_timings.value = None
+        total_ms = (time.perf_counter() - start) * 1000
+
+        setup_ms = timings.get("dns_ms", 0.0) + timings.get("connect_ms", 0.0) + timings.get("tls_ms", 0.0)
+        timings["ttfb_ms"] = max(total_ms - setup_ms, 0.0)
+        timings["total_ms"] = total_ms
+        response.timings = timings
+        _log_timings(request, response, timings)
+        return response
+
+
+def _log_timings(request, response, timings: dict):
+    host = requests.utils.urlparse(request.url).hostname
+    with _stats_lock:
+        stats = http_timing_stats.setdefault(host, {"requests": 0, "new_connections": 0})
+        stats["requests"] += 1
+        stats["new_connections"] += int(timings["new_connection"])
+    retries = getattr(getattr(response, "raw", None), "retries", None)
+    timings["retries"] = len(retries.history) if retries is not None else 0
+    add_count(HOST_RETRY_COUNTS.get(host, "HttpRetries"), timings["retries"])
+
+    logger.info("http timing", extra={"http_timing": {
+        "host": host,
+        "method": request.method,
+        "status": response.status_code,
+        **{name: round(value, 2) if isinstance(value, float) else value for name, value in timings.items()},
+    }})
+
+
+def get_session(host: str) -> requests.Session:
+    """ Returns the pooled session for host (created on first use, then reused) """
+    session = _sessions.get(host)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        if host not in _sessions:
+            settings = HOST_SETTINGS.get(host, DEFAULT_HOST_SETTINGS)
+            adapter = TimedHTTPAdapter(
+                timeout=settings["timeout"], max_retries=settings["retries"],
+                pool_connections=1, pool_maxsize=POOL_MAXSIZE
+            )
+            session = requests.Session()
+            session.mount(f"https://{host}", adapter)
+            session.mount(f"http://{host}", adapter)
+            _sessions[host] = session
+        return _sessions[host]
+
+
+def reset_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+    with _stats_lock:
+        http_timing_stats.clear()
@@ -0,0 +1,100 @@
+"""
+Async categorize jobs.
+
+With {"async": true}, /categorize does everything up to the model call, enqueues the job
+(CategorizeJobQueueUrl) and returns its id, which is the preference row's entry id. The
+categorizeWorker function makes the model call and writes the decision to that row through
+update_user_with_focus_status; /categorizeStatus reads it back from there.
+"""
+import os
+import time
+
+from focus_utils.preferences import get_focus_status, update_user_with_focus_status
+from focus_utils.queues import get_queue
+from focus_utils.retry import RetryScheduler
+from focus_utils.stage import UserContext
+from focus_utils.tracing import LatencyTrace
+
+
+CATEGORIZE_JOB_QUEUE_URL = os.environ.get("CategorizeJobQueueUrl")
+# longest /categorizeStatus holds a request open waiting for the result
+CATEGORIZE_STATUS_MAX_WAIT_SECONDS = 10
+CATEGORIZE_STATUS_POLL_SECONDS = 0.5
+
+
+def get_categorize_job_queue():
+    """ The SQS queue when CategorizeJobQueueUrl is configured, else None (async requests run synchronously) """
+    return get_queue(CATEGORIZE_JOB_QUEUE_URL)
+
+
+def make_categorize_job(entry_id: str, prolific_id: str, entry: dict, prompt_data: dict, fingerprint: str) -> dict:
+    """ The queue message: the preprocessed prompt row plus what the decision is recorded with """
+    snippet = (entry.get("youTubeApiData") or {}).get("snippet", {})
+    return {
+        "jobId": entry_id,
+        "prolificId": prolific_id,
+        # only the parts update_user_with_focus_status reads
+        "entry": {
+            "sessionId": entry.get("sessionId"),
+            "timestamp": entry.get("timestamp"),
+            "youTubeApiData": {"snippet": {"categoryId": snippet.get("categoryId")}},
+        },
+        "promptData": prompt_data,
+        "fingerprint": fingerprint,
+        "enqueuedAt": int(time.time() * 1000),
+    }
+
+
+def get_categorize_job_status(prolific_id: str, job_id: str):
+    """
+    Returns {"jobId", "status": "pending" | "done", "result", "decision_path"} for the job,
+    or None when there is no such job.
+    """
+    item = get_focus_status(prolific_id, job_id)
+    if item is None:
+        return None
+    if "decisionPath" not in item:
+        return {"jobId": job_id, "status": "pending"}
+    return {
+        "jobId": job_id,
+        "status": "done",
+        "result": item.get("categorizeResult") or {"category": item.get("focus")},
+        "decision_path": item["decisionPath"],
+    }
+
+
+def run_categorize_job(job: dict, context=None):
+    """
+    Makes the model call for a queued job and records the decision (the default one when the
+    model gives no usable answer). A job that already has a decision, e.g. a redelivered
+    message, is skipped. Returns (result, decision_path).
+    """
+    # imported here so /categorizeStatus, which only reads job status, doesn't load the prompt and HTTP code
+    from focus_utils.decisions import remember_decision
+    from focus_utils.llm import DEFAULT_CATEGORIZATION, OPENAI_MAX_ATTEMPTS, request_categorization
+    from focus_utils.prompt import build_prompt_messages
+
+    status = get_categorize_job_status(job["prolificId"], job["jobId"])
+    if status is not None and status["status"] == "done":
+        print(f"Categorize job {job['jobId']} was already decided")
+        return status["result"], status["decision_path"]
+
+    trace = LatencyTrace("categorize_job")
+    user_context = UserContext(job["prolificId"])
+    trace.run("user_load", user_context.load)
+
+    messages = build_prompt_messages(job["promptData"])
+    retry = RetryScheduler.from_lambda_context(context, max_attempts=OPENAI_MAX_ATTEMPTS)
+    result = request_categorization(messages, trace, retry)
+    if result is None:
+        result, decision_path, focus = dict(DEFAULT_CATEGORIZATION), "default", False
+    else:
+        decision_path, focus = "llm", result.get("category")
+        remember_decision(job["fingerprint"], result)
+
+    trace.run(
+        "focus_update", update_user_with_focus_status, job["jobId"], job["prolificId"], focus,
+        user_context, job["entry"], decision_path, result
+    )
+    trace.log()
+    return result, decision_path
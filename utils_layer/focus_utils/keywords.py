@@ -0,0 +1,76 @@
+"""
+Keyword matching for the focus categories' CATEGORY_KEYWORDS.
+
+A KeywordMatcher is a token trie compiled once per combination of focus categories (memoized),
+and finds every keyword, including multi-word phrases like "music video", in a single pass over
+the tokenized text. Tokens are whole words, so "cat" does not match inside "category".
+"""
+import re
+
+from functools import lru_cache
+
+from focus_utils.prompt import CATEGORY_KEYWORDS
+
+
+# words may contain inner punctuation that keywords use: let's, stand-up, Q&A, #shorts, sci-fi
+_TOKEN_PATTERN = re.compile(r"#?\w+(?:['&+\-]\w+)*")
+_END = object()
+
+
+def tokenize(text: str) -> list:
+    return _TOKEN_PATTERN.findall(str(text).lower())
+
+
+def _normalize_category(category: str) -> str:
+    # user categories use the normalized YouTube names ("Howto and Style"), the keyword table "&"
+    return str(category).replace('&', 'and').strip().lower()
+
+
+_KEYWORDS_BY_CATEGORY = {_normalize_category(category): keywords for category, keywords in CATEGORY_KEYWORDS.items()}
+
+
+class KeywordMatcher:
+    def __init__(self, keywords):
+        self.keywords = []
+        self._trie = {}
+        for keyword in keywords:
+            tokens = tokenize(keyword)
+            if not tokens:
+                continue
+            node = self._trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            if _END not in node:
+                node[_END] = keyword.lower()
+                self.keywords.append(keyword.lower())
+
+    def find(self, *texts) -> list:
+        """ Keywords found in texts, in order of first appearance, without duplicates """
+        hits = {}
+        for text in texts:
+            tokens = tokenize(text)
+            count = len(tokens)
+            for start in range(count):
+                node = self._trie.get(tokens[start])
+                position = start + 1
+                while node is not None:
+                    if _END in node:
+                        hits.setdefault(node[_END], None)
+                    if position == count:
+                        break
+                    node = node.get(tokens[position])
+                    position += 1
+        return list(hits)
+
+
+@lru_cache(maxsize=256)
+def _compile_matcher(categories: tuple) -> KeywordMatcher:
+    keywords = []
+    for category in categories:
+        keywords.extend(_KEYWORDS_BY_CATEGORY.get(category, []))
+    return KeywordMatcher(keywords)
+
+
+def get_keyword_matcher(categories) -> KeywordMatcher:
+    """ The matcher for the keywords of the given focus categories, compiled once per combination """
+    return _compile_matcher(tuple(sorted({_normalize_category(category) for category in categories})))
@@ -0,0 +1,129 @@
+"""
+The OpenAI chat completion that categorizes a video when the rules and the decision cache
+can't, shared by /categorize and the categorizeWorker that runs it for async jobs.
+"""
+import os
+import json
+import requests # type: ignore
+
+from focus_utils.http_client import HOST_SETTINGS, OPENAI_API_HOST, get_session
+from focus_utils.prompt import PROMPT_FEW_SHOT_MODE, log_prompt_usage
+from focus_utils.retry import RETRYABLE_STATUS_CODES, RetryScheduler, get_retry_after
+from focus_utils.tracing import add_count, span
+
+
+OPENAI_CHAT_COMPLETIONS_URL = "https://api.openai.com/v1/chat/completions"
+OPENAI_MODEL = "gpt-4o-mini"
+OPENAI_MAX_ATTEMPTS = 3
+CATEGORIZATION_RESPONSE_FORMAT = {
+    'type': 'json_schema',
+    'json_schema': {
+        "name": "categorization",
+        "schema": {
+        "type": "object",
+        "properties": {
+            "category": { "type": "string" },
+            "explanation": { "type": "string" },
+            "explanation_summary": { "type": "string" }
+        },
+        "required": ["category", "explanation", "explanation_summary"],
+        "additionalProperties": False
+        },
+        "strict": True
+    }
+}
+# returned (and recorded as focus False) when the model gives no usable answer in time
+DEFAULT_CATEGORIZATION = {
+    "category": "false",
+    "explanation": "Max retries reached. Could not retrieve prediction from the model. Setting it too default false",
+    "explanation_summary": "Confidence: 50% | Key Evidence: Max retries reached. Could not retrieve prediction from the model. Setting it too default false"
+}
+
+
+def shorten_explanation_summary(summary: str) -> str:
+    """ Truncates the Key Evidence part of "Confidence: X% | Key Evidence: ..." to 20 words """
+    # Split the summary into parts
+    if "|" in summary:
+        parts = summary.split("|")
+        if len(parts) == 2:
+            confidence_part = parts[0].strip()
+            evidence_part = parts[1].strip()
+
+            # Remove the "Key Evidence:" prefix safely
+            if evidence_part.lower().startswith("key evidence:"):
+                evidence_text = evidence_part[len("key evidence:"):].strip()
+
+                # Truncate to 20 words
+                words = evidence_text.split()
+                if len(words) > 20:
+                    evidence_text = " ".join(words[:20]) + "..."
+
+                # Rebuild the summary
+                summary = f"{confidence_part} | Key Evidence: {evidence_text}"
+    return summary
+
+
+def request_categorization(messages: list, trace, retry: RetryScheduler):
+    """
+    Asks the model to categorize (see prompt.build_prompt_messages), retrying rate limits,
+    5xx and timeouts within retry's attempts and deadline. Each attempt is a trace stage
+    ("openai_1", ...) and an "openai" span; retries are counted as OpenAIRetries.
+
+    Returns the parsed result ({"category", "explanation", "explanation_summary"}), or None
+    when no attempt gave a usable answer.
+    """
+    headers = {
+        'Content-Type': 'application/json',
+        'Authorization': f"Bearer {os.environ['OpenAIKey']}"
+    }
+    body = {
+        'model': OPENAI_MODEL,
+        'messages': messages,
+        'response_format': CATEGORIZATION_RESPONSE_FORMAT
+    }
+
+    connect_timeout, read_timeout = HOST_SETTINGS[OPENAI_API_HOST]["timeout"]
+    for i in retry.attempts():
+        try:
+            if i > 0:
+                add_count("OpenAIRetries")
+            with span("openai"):
+                response = trace.run(
+                    f"openai_{i + 1}", get_session(OPENAI_API_HOST).post, OPENAI_CHAT_COMPLETIONS_URL, headers=headers, json=body,
+                    timeout=retry.request_timeout(connect_timeout, read_timeout)
+                )
+
+            if response.status_code == 200:
+                json_response = response.json()
+                log_prompt_usage(PROMPT_FEW_SHOT_MODE, messages, json_response.get("usage"))
+                result = json.loads(json_response['choices'][0]['message']['content'])
+                result["explanation_summary"] = shorten_explanation_summary(result.get("explanation_summary", ""))
+                return result
+
+            elif response.status_code in RETRYABLE_STATUS_CODES:
+                # Rate limit / Bad Gateway / ...
+                retry_after = get_retry_after(response.headers)
+                print(f"🔁 OpenAI returned {response.status_code}. Retrying (Retry-After: {retry_after})...")
+                if not retry.wait(retry_after):
+                    break
+                continue
+
+            else:
+                # Other non-retryable errors
+                print(f"❌ Unexpected status code {response.status_code}: {response.text}")
+                break
+        except (requests.exceptions.ReadTimeout, requests.exceptions.Timeout) as e:
+            print("⏳ Read timeout. Retrying...")
+            if not retry.wait():
+                break
+            continue
+        except Exception as e:
+            if "rate_limit" in str(e).lower():
+                print("🔁 Rate limit exception. Retrying...")
+                if not retry.wait():
+                    break
+                continue
+            print(f"❌ Exception: {str(e)}")
+            break
+
+    return None
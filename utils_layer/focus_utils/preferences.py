@@ -0,0 +1,261 @@
+from boto3.dynamodb.conditions import Key # type: ignore
+from botocore.exceptions import ClientError # type: ignore
+from datetime import datetime, timezone
+
+from focus_utils import tables
+
+
+# GSI on the user preference table, see FocusModeUserPreferenceDataTable in template.yaml
+SESSION_INDEX_NAME = "SessionTimestampIndex"
+SESSION_KEY_ATTRIBUTE = "sessionKey"
+SESSION_TIMESTAMP_ATTRIBUTE = "sessionTimestamp"
+
+# ring buffer of the latest preference entries kept on the user row, so it lists what the
+# SessionTimestampIndex query would: entries go on it when they are inserted (focus None until
+# their decision is recorded) and are ordered by their sessionTimestamp
+# Recent_Decisions = {sessionId: [{"entryId", "categoryId", "focus", "timestamp"}, ...newest first]}
+RECENT_DECISIONS_ATTRIBUTE = "Recent_Decisions"
+RECENT_DECISIONS_VERSION_ATTRIBUTE = "Recent_Decisions_Version"
+RECENT_DECISIONS_PER_SESSION = 3
+RECENT_DECISIONS_MAX_SESSIONS = 5
+RECENT_DECISIONS_MAX_ATTEMPTS = 3
+
+
+def update_user_with_focus_status(id, prolific_id, focus, user_context=None, entry=None, decision_path=None, result=None):
+    """ Stores the categorize decision on the preference row and, given the participant's
+    UserContext and the categorized entry, also on the Recent_Decisions ring buffer of the user row.
+    decision_path records what decided it ("rules:<n>", "llm" or "default"); result, the full
+    categorize result, is kept for async jobs (see get_focus_status) """
+    update_expression = "SET focus = :focus_status "
+    expression_values = {":focus_status": focus}
+    if decision_path is not None:
+        update_expression += ", decisionPath = :decision_path"
+        expression_values[":decision_path"] = decision_path
+    if result is not None:
+        update_expression += ", categorizeResult = :result"
+        expression_values[":result"] = result
+
+    response = tables.user_pref_data_table.update_item(
+        Key={
+            "prolificId": prolific_id,
+            "Id" : id},
+        UpdateExpression=update_expression,
+        ExpressionAttributeValues=expression_values,
+        ReturnValues="ALL_NEW"
+    )
+
+    if user_context is not None and entry is not None and "sessionId" in entry:
+        record_recent_decision(user_context, entry["sessionId"], {
+            "entryId": id,
+            "categoryId": entry.get("youTubeApiData", {}).get("snippet", {}).get("categoryId", None),
+            "focus": focus,
+            "timestamp": format_session_timestamp(entry.get("timestamp")) or format_session_timestamp(),
+        })
+
+    databaseAttributes = response["Attributes"]
+    return databaseAttributes
+
+
+def get_focus_status(prolificId, entry_id):
+    """ The decision attributes (focus, decisionPath, categorizeResult) of a preference row,
+    read consistently so a decision that was just written is seen; None when the row doesn't exist """
+    response = tables.user_pref_data_table.get_item(
+        Key={"prolificId": prolificId, "Id": entry_id},
+        ProjectionExpression="Id, focus, decisionPath, categorizeResult",
+        ConsistentRead=True
+    )
+    return response.get("Item")
+
+
+def get_recent_decisions(user_context, sessionId):
+    """ Newest first decisions of the session from the loaded user row, None when none are recorded """
+    recent_decisions = (user_context.load() or {}).get(RECENT_DECISIONS_ATTRIBUTE) or {}
+    return recent_decisions.get(str(sessionId))
+
+
+def push_recent_decision(recent_decisions, sessionId, decision):
+    """ Returns a copy of recent_decisions with decision in the session's buffer (replacing the record
+    of the same entryId, whose timestamp it keeps), newest timestamp first, trimmed to
+    RECENT_DECISIONS_PER_SESSION entries and the RECENT_DECISIONS_MAX_SESSIONS latest sessions """
+    recent_decisions = dict(recent_decisions or {})
+    session_decisions = list(recent_decisions.get(str(sessionId), []))
+    for i, recorded in enumerate(session_decisions):
+        if recorded.get("entryId") == decision.get("entryId"):
+            decision = dict(decision, timestamp=recorded.get("timestamp"))
+            del session_decisions[i]
+            break
+    # the sort is stable, so of two equal timestamps the one pushed last stays first
+    session_decisions.insert(0, decision)
+    session_decisions.sort(key=lambda d: d.get("timestamp") or "", reverse=True)
+    recent_decisions[str(sessionId)] = session_decisions[:RECENT_DECISIONS_PER_SESSION]
+
+    latest_sessions = sorted(
+        recent_decisions,
+        key=lambda session: max((d.get("timestamp") or "" for d in recent_decisions[session]), default=""),
+        reverse=True
+    )[:RECENT_DECISIONS_MAX_SESSIONS]
+    if str(sessionId) not in latest_sessions:
+        latest_sessions[-1] = str(sessionId)
+    return {session: recent_decisions[session] for session in latest_sessions}
+
+
+def record_recent_decision(user_context, sessionId, decision):
+    """
+    Pushes decision onto the user's Recent_Decisions ring buffer. The whole attribute is
+    rewritten on the condition that Recent_Decisions_Version is still the one that was read;
+    if a concurrent request won, the attribute is re-read and the push retried.
+    """
+    user_item = user_context.load()
+    for _ in range(RECENT_DECISIONS_MAX_ATTEMPTS):
+        version = user_item.get(RECENT_DECISIONS_VERSION_ATTRIBUTE)
+        recent_decisions = push_recent_decision(user_item.get(RECENT_DECISIONS_ATTRIBUTE), sessionId, decision)
+        update_kwargs = {
+            "Key": {"User_Id": user_context.user_id},
+            "UpdateExpression": "SET #rd = :recent, #rdv = :next_version",
+            "ExpressionAttributeNames": {
+                "#rd": RECENT_DECISIONS_ATTRIBUTE,
+                "#rdv": RECENT_DECISIONS_VERSION_ATTRIBUTE,
+            },
+            "ExpressionAttributeValues": {
+                ":recent": recent_decisions,
+                ":next_version": (version or 0) + 1,
+            },
+        }
+        if version is None:
+            update_kwargs["ConditionExpression"] = "attribute_exists(User_Id) AND attribute_not_exists(#rdv)"
+        else:
+            update_kwargs["ConditionExpression"] = "attribute_exists(User_Id) AND #rdv = :version"
+            update_kwargs["ExpressionAttributeValues"][":version"] = version
+
+        user_context.count_round_trip()
+        try:
+            user_context.table.update_item(**update_kwargs)
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            response = user_context.table.get_item(
+                Key={"User_Id": user_context.user_id},
+                ProjectionExpression="#rd, #rdv",
+                ExpressionAttributeNames=update_kwargs["ExpressionAttributeNames"],
+                ConsistentRead=True
+            )
+            user_context.count_round_trip()
+            fresh_item = response.get("Item", {})
+            user_item[RECENT_DECISIONS_ATTRIBUTE] = fresh_item.get(RECENT_DECISIONS_ATTRIBUTE)
+            user_item[RECENT_DECISIONS_VERSION_ATTRIBUTE] = fresh_item.get(RECENT_DECISIONS_VERSION_ATTRIBUTE)
+            continue
+
+        user_item[RECENT_DECISIONS_ATTRIBUTE] = recent_decisions
+        user_item[RECENT_DECISIONS_VERSION_ATTRIBUTE] = (version or 0) + 1
+        return recent_decisions
+
+    print(f"Recent_Decisions of {user_context.user_id} kept changing, dropping decision {decision.get('entryId')}")
+    return None
+
+
+def format_session_timestamp(timestamp=None):
+    """ Normalizes an ISO timestamp to a fixed width UTC string so that string order is time order
+    (the raw 'timestamp' from the extension can use offsets or different precisions). Returns None when it can't be parsed """
+    if timestamp is None:
+        parsed = datetime.now(timezone.utc)
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(timestamp).replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def get_session_index_keys(prolificId, sessionId, timestamp=None):
+    """ Returns the SessionTimestampIndex key attributes of an entry, or None when its timestamp is invalid """
+    session_timestamp = format_session_timestamp(timestamp)
+    if session_timestamp is None:
+        return None
+    return {
+        SESSION_KEY_ATTRIBUTE: f"{prolificId}#{sessionId}",
+        SESSION_TIMESTAMP_ATTRIBUTE: session_timestamp,
+    }
+
+
+def get_entry_index_keys(prolificId, newEntry):
+    return (
+        get_session_index_keys(prolificId, newEntry['sessionId'], newEntry.get('timestamp'))
+        or get_session_index_keys(prolificId, newEntry['sessionId'])
+    )
+
+
+def get_previous_entries(prolificId, newEntry, user_context=None):
+    """ Returns the focus/categoryId of the latest three entries for the same prolificId and sessionId, newest first """
+
+    # Step 1: Take them from the user row when it is loaded, otherwise (or before the session
+    # has a decision recorded) query them
+    latest_three = get_recent_decisions(user_context, newEntry['sessionId']) if user_context is not None else None
+    if latest_three is not None:
+        return latest_three
+
+    response = tables.user_pref_data_table.query(
+        IndexName=SESSION_INDEX_NAME,
+        KeyConditionExpression=Key(SESSION_KEY_ATTRIBUTE).eq(get_entry_index_keys(prolificId, newEntry)[SESSION_KEY_ATTRIBUTE]),
+        ProjectionExpression="#focus, #youTubeApiData.#snippet.#categoryId",
+        ExpressionAttributeNames={
+            "#focus": "focus",
+            "#youTubeApiData": "youTubeApiData",
+            "#snippet": "snippet",
+            "#categoryId": "categoryId",
+        },
+        ScanIndexForward=False,
+        Limit=3
+    )
+    # Step 2 & 3: the index returns them newest first
+    return [
+        {
+            'focus': item.get('focus', None),
+            'categoryId': item.get('youTubeApiData', {}).get('snippet', {}).get('categoryId', None),
+        }
+        for item in response.get('Items', [])
+    ]
+
+
+def apply_previous_entries(newEntry, latest_three):
+    # Step 4: Flatten previous focus/category data into current entry
+    for i in range(1, 4):
+        entry = latest_three[i - 1] if i - 1 < len(latest_three) else {}
+
+        newEntry[f'focusMode_{i}'] = entry.get('focus', None)
+        newEntry[f'categoryId_{i}'] = entry.get('categoryId', None)
+    return newEntry
+
+
+def record_pending_entry(user_context, prolificId, newEntry, entry_id):
+    """ Puts an inserted entry on the Recent_Decisions ring without a decision yet, so the next
+    entries see it even if its decision is never recorded (async jobs, a failed focus update) """
+    return record_recent_decision(user_context, newEntry['sessionId'], {
+        "entryId": entry_id,
+        "categoryId": newEntry.get("youTubeApiData", {}).get("snippet", {}).get("categoryId", None),
+        "focus": None,
+        "timestamp": get_entry_index_keys(prolificId, newEntry)[SESSION_TIMESTAMP_ATTRIBUTE],
+    })
+
+
+def insert_user_entry(prolificId, newEntry, entry_id, user_context=None):
+    # Step 5: Insert the new entry (and, given the participant's UserContext, put it on the ring)
+    item_to_insert = {
+        'prolificId': prolificId,
+        'Id': entry_id,
+        **newEntry,
+        **get_entry_index_keys(prolificId, newEntry)
+    }
+
+    response = tables.user_pref_data_table.put_item(Item=item_to_insert)
+    if user_context is not None:
+        record_pending_entry(user_context, prolificId, newEntry, entry_id)
+    return response
+
+
+def fetch_and_insert_user_entry(prolificId, newEntry, entry_id, user_context=None):
+    latest_three = get_previous_entries(prolificId, newEntry, user_context)
+    apply_previous_entries(newEntry, latest_three)
+    result = insert_user_entry(prolificId, newEntry, entry_id, user_context)
+    return result, newEntry
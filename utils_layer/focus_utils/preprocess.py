@@ -0,0 +1,347 @@
+import json
+import math
+
+from focus_utils import youtube
+
+
+pd = None
+
+
+# Columns dropped by the preprocessing pipeline, plus everything under UNWANTED_COLUMN_PREFIX
+UNWANTED_COLUMNS = [
+    'timestamp',
+    'youTubeApiData.snippet.publishedAt',
+    'youTubeApiData.id',
+    'youTubeApiData.kind',
+    'youTubeApiData.etag',
+    'youTubeApiData.snippet.channelId',
+    'youTubeApiData.snippet.localized.title',
+    'youTubeApiData.snippet.localized.description',
+    'youTubeApiData.statistics.viewCount',
+    'youTubeApiData.statistics.favoriteCount',
+    'youTubeApiData.statistics.commentCount'
+]
+UNWANTED_COLUMN_PREFIX = 'youTubeApiData.snippet.thumbnails'
+
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def parse_intent_node(value):
+    """
+    Parses the 'intentNode' JSON string. Returns {} when it is missing or not valid JSON.
+    """
+    if _is_missing(value):
+        return {}
+
+    try:
+        # Try parsing directly
+        return json.loads(value)
+    except json.JSONDecodeError:
+        try:
+            # Try parsing after unescaping (for cases like: "\"{\"key\":\"value\"}\"")
+            return json.loads(json.loads(value))
+        except Exception:
+            return {}
+
+
+# JSON to pandas convertor:
+def flatten_dict(d, parent_key="", sep="."):
+    """
+    Recursively flattens a nested dictionary using dot notation.
+    """
+    items = []
+    for k, v in d.items():
+        new_key = f"{parent_key}{sep}{k}" if parent_key else k
+        if isinstance(v, dict):
+            items.extend(flatten_dict(v, new_key, sep=sep).items())
+        else:
+            items.append((new_key, v))
+    return dict(items)
+
+def _require_pandas():
+    # pandas is only needed by the DataFrame helpers used for offline batch jobs,
+    # so it is imported on first use and is not part of the layer
+    global pd
+    if pd is None:
+        try:
+            import pandas # type: ignore
+        except ImportError as e:
+            raise ImportError("pandas is required for the DataFrame preprocessing helpers (pip install pandas)") from e
+        pd = pandas
+    return pd
+
+
+def parse_video_entry_to_df(json_obj: dict) -> "pd.DataFrame":
+    """
+    Parses a single video entry JSON object into a flattened DataFrame row.
+    Handles nested structure inside 'newPreferenceData' and attaches 'prolificId' at top level.
+    """
+    _require_pandas()
+
+    if not isinstance(json_obj, dict):
+        raise ValueError("Expected a JSON object (Python dict)")
+
+    prolific_id = json_obj.get("prolificId", None)
+    preference_data = json_obj.get("newPreferenceData", {})
+
+    # Add prolificId to the preference data before flattening
+    preference_data["prolificId"] = prolific_id
+
+    # Flatten the entire structure (youTubeApiData and others)
+    flat_data = flatten_dict(preference_data)
+
+    # Convert to DataFrame
+    return pd.DataFrame([flat_data])
+
+def get_time_of_day(hour):
+    if 5 <= hour < 12:
+        return 'morning'
+    elif 12 <= hour < 17:
+        return 'afternoon'
+    elif 17 <= hour < 21:
+        return 'evening'
+    else:
+        return 'night'
+
+
+def expand_intent_node(df):
+    """
+    Parses and expands the 'intentNode' JSON string column into multiple flat columns.
+
+    Args:
+        df (pd.DataFrame): Input DataFrame with an 'intentNode' column.
+
+    Returns:
+        pd.DataFrame: DataFrame with expanded intent fields.
+    """
+
+    _require_pandas()
+
+    # Parse intentNode column into dictionaries
+    intent_parsed = df['intentNode'].apply(parse_intent_node)
+
+    # Expand into new columns
+    intent_df = intent_parsed.apply(pd.Series)
+
+    # Add prefix to avoid column name clashes
+    intent_df.columns = [f"{col}" for col in intent_df.columns]
+
+    # Combine with original DataFrame
+    df = pd.concat([df.drop(columns=['intentNode']), intent_df], axis=1)
+
+    return df
+
+
+def extract_features(df: "pd.DataFrame", category_id_to_name: dict) -> "pd.DataFrame":
+    def extract_features(row):
+        try:
+            # Video category
+            cat_id = str(row.get('youTubeApiData.snippet.categoryId', ''))
+            cat_id_1 = str(row.get('categoryId_1', ''))
+            cat_id_2 = str(row.get('categoryId_2', ''))
+            cat_id_3 = str(row.get('categoryId_3', ''))
+            row['video_category'] = category_id_to_name.get(cat_id, "Unknown")
+            row['categoryId_1'] = category_id_to_name.get(cat_id_1, "Unknown")
+            row['categoryId_2'] = category_id_to_name.get(cat_id_2, "Unknown")
+            row['categoryId_3'] = category_id_to_name.get(cat_id_3, "Unknown")
+
+        except Exception as e:
+            row['error'] = str(e)
+        return pd.Series(row)
+
+    _require_pandas()
+    transformed_df = df.apply(extract_features, axis=1)
+    return transformed_df
+
+
+def drop_unwanted_columns(df):
+    """
+    Drops unwanted columns including specific fields and those starting with 'youTubeApiData.snippet.thumbnails'.
+
+    Args:
+        df (pd.DataFrame): The DataFrame to clean.
+
+    Returns:
+        pd.DataFrame: Cleaned DataFrame with specified columns dropped.
+    """
+    # Add all columns that start with 'youTubeApiData.snippet.thumbnails'
+    thumbnail_cols = [col for col in df.columns if col.startswith(UNWANTED_COLUMN_PREFIX)]
+
+    # Combine and drop
+    all_cols_to_drop = UNWANTED_COLUMNS + thumbnail_cols
+    return df.drop(columns=[col for col in all_cols_to_drop if col in df.columns])
+
+
+def rename_columns_to_last_segment(df):
+    """
+    Renames only the columns that contain a dot ('.') by extracting the last part after the dot.
+    Other column names remain unchanged.
+
+    E.g.:
+    - 'youTubeApiData.snippet.categoryId' → 'categoryId'
+    - 'prolificId' → 'prolificId' (unchanged)
+
+    Args:
+        df (pd.DataFrame): Input DataFrame.
+
+    Returns:
+        pd.DataFrame: Renamed DataFrame.
+    """
+    new_columns = {
+        col: col.split('.')[-1] if '.' in col else col
+        for col in df.columns
+    }
+    return df.rename(columns=new_columns)
+
+def update_intent_data(df):
+    """
+    For rows where:
+    - curr_intent_source != '/SearchPage', set curr_intent_data to title
+    - curr_intent_source == '/ChannelPage', set curr_intent_data to channelTitle
+    """
+    # If it's ChannelPage, override first
+    mask_channel = df["curr_intent_source"] == "/ChannelPage"
+    if "youTubeApiData.snippet.channelTitle" in df.columns:
+        df.loc[mask_channel, "curr_intent_data"] = df.loc[mask_channel, "youTubeApiData.snippet.channelTitle"]
+
+    # If not SearchPage and not ChannelPage (so, all others), set to title
+    mask_other = (df["curr_intent_source"].notna()) & (~df["curr_intent_source"].isin(["/SearchPage", "/ChannelPage"]))
+    if "youTubeApiData.snippet.title" in df.columns:
+        df.loc[mask_other, "curr_intent_data"] = df.loc[mask_other, "youTubeApiData.snippet.title"]
+
+    return df
+
+def preprocess_video_json_entry_df(json_obj):
+    """
+    Full preprocessing pipeline to convert a single JSON video entry to a final processed DataFrame row.
+    Kept for offline batch jobs (needs pandas); the Lambdas use preprocess_video_json_entry.
+
+    Args:
+        json_obj (dict): Raw JSON object representing one video entry.
+        category_id_to_name (dict): Mapping of YouTube categoryId to category name.
+
+    Returns:
+        pd.DataFrame: Processed single-row DataFrame.
+    """
+    _require_pandas()
+    _, category_id_to_name = youtube.get_cached_video_categories()
+
+    # Step 1: Flatten JSON to DataFrame
+    df = parse_video_entry_to_df(json_obj)
+
+    # Step 2: Expand nested intentNode column
+    df = expand_intent_node(df)
+
+    df = update_intent_data(df)
+    # Step 3: Extract time/contextual/video-based features
+    df = extract_features(df, category_id_to_name)
+
+    # Step 4: Drop columns not needed for training
+    df = drop_unwanted_columns(df)
+
+    # Step 5: Rename remaining columns (e.g., youTubeApiData.snippet.categoryId → categoryId)
+    df = rename_columns_to_last_segment(df)
+
+    return df.to_dict(orient="records")[0]
+
+
+# Dict based pipeline: same output as the DataFrame helpers above, for a single record and
+# without pandas. This is what the Lambdas run on every /categorize request.
+def parse_video_entry_to_record(json_obj: dict) -> dict:
+    """
+    Dict counterpart of parse_video_entry_to_df. Does not modify json_obj.
+    """
+    if not isinstance(json_obj, dict):
+        raise ValueError("Expected a JSON object (Python dict)")
+
+    preference_data = dict(json_obj.get("newPreferenceData", {}))
+    preference_data["prolificId"] = json_obj.get("prolificId", None)
+    return flatten_dict(preference_data)
+
+
+def expand_intent_node_record(record: dict) -> dict:
+    """
+    Dict counterpart of expand_intent_node: replaces 'intentNode' with its parsed fields.
+    """
+    intent = parse_intent_node(record['intentNode'])
+
+    # same keys pd.Series would produce for the parsed value
+    if isinstance(intent, dict):
+        intent_fields = {f"{key}": value for key, value in intent.items()}
+    elif isinstance(intent, list):
+        intent_fields = {f"{i}": value for i, value in enumerate(intent)}
+    elif intent is None:
+        intent_fields = {}
+    else:
+        intent_fields = {"0": intent}
+
+    expanded = {key: value for key, value in record.items() if key != 'intentNode'}
+    expanded.update(intent_fields)
+    return expanded
+
+
+def update_intent_data_record(record: dict) -> dict:
+    """
+    Dict counterpart of update_intent_data. Like the DataFrame version, curr_intent_data is
+    created as NaN when the source column exists but the row doesn't match.
+    """
+    intent_source = record["curr_intent_source"]
+    is_channel = intent_source == "/ChannelPage"
+    is_other = not _is_missing(intent_source) and intent_source not in ("/SearchPage", "/ChannelPage")
+
+    for matches, column in ((is_channel, "youTubeApiData.snippet.channelTitle"), (is_other, "youTubeApiData.snippet.title")):
+        if column not in record:
+            continue
+        if matches:
+            record["curr_intent_data"] = record[column]
+        else:
+            record.setdefault("curr_intent_data", math.nan)
+    return record
+
+
+def extract_features_record(record: dict, category_id_to_name: dict) -> dict:
+    try:
+        record['video_category'] = category_id_to_name.get(str(record.get('youTubeApiData.snippet.categoryId', '')), "Unknown")
+        for i in range(1, 4):
+            record[f'categoryId_{i}'] = category_id_to_name.get(str(record.get(f'categoryId_{i}', '')), "Unknown")
+    except Exception as e:
+        record['error'] = str(e)
+    return record
+
+
+def drop_unwanted_fields_record(record: dict) -> dict:
+    return {
+        key: value for key, value in record.items()
+        if key not in UNWANTED_COLUMNS and not key.startswith(UNWANTED_COLUMN_PREFIX)
+    }
+
+
+def rename_fields_to_last_segment_record(record: dict) -> dict:
+    renamed = {}
+    for key, value in record.items():
+        # on a clash the later value wins in the earlier position, as in DataFrame.to_dict
+        renamed[key.split('.')[-1] if '.' in key else key] = value
+    return renamed
+
+
+def preprocess_video_json_entry(json_obj):
+    """
+    Full preprocessing pipeline to convert a single JSON video entry to the flat dict used by
+    build_prompt. Produces the same output as preprocess_video_json_entry_df.
+
+    Args:
+        json_obj (dict): Raw JSON object representing one video entry.
+
+    Returns:
+        dict: Processed record.
+    """
+    _, category_id_to_name = youtube.get_cached_video_categories()
+
+    record = parse_video_entry_to_record(json_obj)
+    record = expand_intent_node_record(record)
+    record = update_intent_data_record(record)
+    record = extract_features_record(record, category_id_to_name)
+    record = drop_unwanted_fields_record(record)
+    return rename_fields_to_last_segment_record(record)
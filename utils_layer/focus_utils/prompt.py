@@ -0,0 +1,707 @@
+import logging
+import os
+import re
+
+
+logger = logging.getLogger(__name__)
+
+FEW_SHOT_EXAMPLES = """
+### Example 1 – Education Focus with Search Intent
+
+Title: "Complete JavaScript Course for Beginners"
+Description: "Learn everything from variables to DOM manipulation in this full-length course."
+Current category: "Education"
+User-selected focus categories: ["Education", "Science and Technology"]
+History: [
+  {"categoryId": "Education", "focusMode": true},
+  {"categoryId": "Gaming", "focusMode": false},
+  {"categoryId": "Music", "focusMode": false}
+]
+Subscribed: true
+Intent source: "/search"
+Rules:
+1: true
+2: true
+3: true
+4: true
+5: true
+6: false
+7: true
+8: true
+9: true ("course", "learn", "JavaScript")
+10: true
+→ **True**
+Reason: Prior Education focus, subscription, strong keywords.
+explanation_summary: "Confidence: 95% | Key Evidence: Prior focus and subscription in Education."
+confidence: "95%"
+
+---
+
+### Example 2 – Sports with Repeated Category but No Prior Focus
+
+Title: "Top 50 NBA Dunks"
+Description: "Relive the best slam dunks in NBA history."
+Current category: "Sports"
+User-selected focus categories: ["Sports", "Entertainment"]
+History: [
+  {"categoryId": "Sports", "focusMode": false},
+  {"categoryId": "Sports", "focusMode": false},
+  {"categoryId": "Entertainment", "focusMode": false}
+]
+Subscribed: false
+Intent source: "/home"
+Rules:
+1: false
+2: false
+3: true
+4: true
+5: false
+6: true
+7: false
+8: false
+9: true ("dunks", "NBA")
+10: true
+→ **True**
+Reason: Repeated category and user focus preference.
+explanation_summary: "Confidence: 75% | Key Evidence: Repeated Sports category."
+confidence: "75%"
+
+---
+
+### Example 3 – Documentary with Channel Intent
+
+Title: "Secrets of the Ocean"
+Description: "Explore marine life in this documentary series."
+Current category: "Documentary"
+User-selected focus categories: ["Documentary", "Education"]
+History: [
+  {"categoryId": "Documentary", "focusMode": false},
+  {"categoryId": "Travel and Events", "focusMode": false},
+  {"categoryId": "Documentary", "focusMode": false}
+]
+Subscribed: true
+Intent source: "/channel"
+Rules:
+1: false
+2: false
+3: true
+4: true
+5: false
+6: true
+7: true
+8: true
+9: true ("documentary", "marine life")
+10: true
+→ **True**
+Reason: Repeated Documentary category, subscription, and keywords.
+explanation_summary: "Confidence: 85% | Key Evidence: Repeated Documentary and subscription."
+confidence: "85%"
+
+---
+
+### Example 4 – Music with Prior Focus
+
+Title: "Live Concert – Symphony No.9"
+Description: "Experience Beethoven's 9th Symphony performed live."
+Current category: "Music"
+User-selected focus categories: ["Music", "Entertainment"]
+History: [
+  {"categoryId": "Music", "focusMode": true},
+  {"categoryId": "Entertainment", "focusMode": false},
+  {"categoryId": "Music", "focusMode": false}
+]
+Subscribed: false
+Intent source: "/watch"
+Rules:
+1: true
+2: true
+3: true
+4: true
+5: true
+6: true
+7: false
+8: false
+9: true ("concert", "symphony", "live")
+10: true
+→ **True**
+Reason: Prior Music focus, repeated category.
+explanation_summary: "Confidence: 90% | Key Evidence: Music focus history."
+confidence: "90%"
+
+---
+
+### Example 5 – Howto & Style with Search Intent
+
+Title: "How to Bake Sourdough Bread"
+Description: "Step-by-step guide to baking perfect sourdough bread."
+Current category: "Howto and Style"
+User-selected focus categories: ["Howto and Style", "Education"]
+History: [
+  {"categoryId": "Howto and Style", "focusMode": false},
+  {"categoryId": "Education", "focusMode": false},
+  {"categoryId": "Howto and Style", "focusMode": false}
+]
+Subscribed: true
+Intent source: "/search"
+Rules:
+1: false
+2: false
+3: true
+4: true
+5: false
+6: true
+7: true
+8: true
+9: true ("guide", "baking", "sourdough")
+10: true
+→ **True**
+Reason: How-to keywords, search intent, subscription.
+explanation_summary: "Confidence: 85% | Key Evidence: How-to keywords and search intent."
+confidence: "85%"
+
+---
+
+### Example 6 – News & Politics Learning Content
+
+Title: "Global Economic Outlook 2024"
+Description: "An in-depth analysis of world markets and policy impacts."
+Current category: "News and Politics"
+User-selected focus categories: ["News and Politics", "Education"]
+History: [
+  {"categoryId": "News and Politics", "focusMode": false},
+  {"categoryId": "Education", "focusMode": false},
+  {"categoryId": "News and Politics", "focusMode": false}
+]
+Subscribed: false
+Intent source: "/search"
+Rules:
+1: false
+2: false
+3: true
+4: true
+5: false
+6: true
+7: false
+8: true
+9: true ("analysis", "markets", "policy")
+10: true
+→ **True**
+Reason: Learning keywords, search intent, repeated category.
+explanation_summary: "Confidence: 80% | Key Evidence: Learning content and repeated category."
+confidence: "80%"
+
+---
+
+### Example 7 – Sports with Prior Focus
+
+Title: "Marathon Training Guide"
+Description: "Learn the best techniques to prepare for your first marathon."
+Current category: "Sports"
+User-selected focus categories: ["Sports", "Health"]
+History: [
+  {"categoryId": "Sports", "focusMode": true},
+  {"categoryId": "Health", "focusMode": false},
+  {"categoryId": "Sports", "focusMode": false}
+]
+Subscribed: true
+Intent source: "/search"
+Rules:
+1: true
+2: true
+3: true
+4: true
+5: true
+6: true
+7: true
+8: true
+9: true ("training", "marathon")
+10: true
+→ **True**
+Reason: Prior focus, subscription, repeated Sports category.
+explanation_summary: "Confidence: 95% | Key Evidence: Prior focus and subscription."
+confidence: "95%"
+
+---
+
+### Example 8 – Documentary with No Prior Focus but Repeated Category
+
+Title: "Wildlife in the Sahara"
+Description: "A documentary exploring animals in the desert."
+Current category: "Documentary"
+User-selected focus categories: ["Documentary"]
+History: [
+  {"categoryId": "Documentary", "focusMode": false},
+  {"categoryId": "Documentary", "focusMode": false},
+  {"categoryId": "Travel and Events", "focusMode": false}
+]
+Subscribed: false
+Intent source: "/channelPage"
+Rules:
+1: false
+2: false
+3: true
+4: true
+5: false
+6: true
+7: false
+8: true
+9: true ("documentary", "wildlife")
+10: true
+→ **True**
+Reason: Repeated category and strong keywords.
+explanation_summary: "Confidence: 80% | Key Evidence: Repeated category and keywords."
+confidence: "80%"
+
+---
+
+### Example 9 – Gaming Entertainment No Focus
+
+Title: "Fortnite Funny Moments"
+Description: "Hilarious clips and fails from Fortnite matches."
+Current category: "Gaming"
+User-selected focus categories: ["Education"]
+History: [
+  {"categoryId": "Gaming", "focusMode": false},
+  {"categoryId": "Entertainment", "focusMode": false},
+  {"categoryId": "Gaming", "focusMode": false}
+]
+Subscribed: false
+Intent source: "/home"
+Rules:
+1: false
+2: false
+3: false
+4: true
+5: false
+6: true
+7: false
+8: false
+9: false
+10: false
+→ **False**
+Reason: Entertainment content with no focus signals.
+explanation_summary: "Confidence: 20% | Key Evidence: No learning or focus signals."
+confidence: "20%"
+
+---
+
+### Example 10 – Comedy with No Focus Signals
+
+Title: "Best Stand-Up Comedy Clips"
+Description: "Laugh along with the funniest stand-up routines."
+Current category: "Comedy"
+User-selected focus categories: ["Education", "Documentary"]
+History: [
+  {"categoryId": "Comedy", "focusMode": false},
+  {"categoryId": "Entertainment", "focusMode": false},
+  {"categoryId": "Comedy", "focusMode": false}
+]
+Subscribed: false
+Intent source: "/home"
+Rules:
+1: false
+2: false
+3: false
+4: true
+5: false
+6: true
+7: false
+8: false
+9: false
+10: false
+→ **False**
+Reason: Pure entertainment with no focus signals.
+explanation_summary: "Confidence: 15% | Key Evidence: No focus signals."
+confidence: "15%"
+
+---
+
+### Example 11 – Film Trailer with Subscribed but No Focus Signals
+
+Title: "Official Trailer – New Sci-Fi Blockbuster"
+Description: "Watch the thrilling new trailer for this summer's biggest sci-fi film."
+Current category: "Film and Animation"
+User-selected focus categories: ["Education"]
+History: [
+  {"categoryId": "Film and Animation", "focusMode": false},
+  {"categoryId": "Entertainment", "focusMode": false},
+  {"categoryId": "Film and Animation", "focusMode": false}
+]
+Subscribed: true
+Intent source: "/home"
+Rules:
+1: false
+2: false
+3: false
+4: true
+5: false
+6: true
+7: true
+8: false
+9: false
+10: false
+→ **False**
+Reason: Subscription alone insufficient; no learning or focus signals.
+explanation_summary: "Confidence: 25% | Key Evidence: Subscribed but entertainment trailer."
+confidence: "25%"
+
+---
+
+### Example 12 – People and Blogs Vlog
+
+Title: "Daily Vlog: Grocery Shopping and Cooking"
+Description: "Spend the day with me running errands and cooking."
+Current category: "People and Blogs"
+User-selected focus categories: ["Education"]
+History: [
+  {"categoryId": "People and Blogs", "focusMode": false},
+  {"categoryId": "People and Blogs", "focusMode": false},
+  {"categoryId": "People and Blogs", "focusMode": false}
+]
+Subscribed: false
+Intent source: "/home"
+Rules:
+1: false
+2: false
+3: false
+4: true
+5: false
+6: true
+7: false
+8: false
+9: false
+10: false
+→ **False**
+Reason: No learning signals or focus indicators.
+explanation_summary: "Confidence: 10% | Key Evidence: No focus signals."
+confidence: "10%"
+"""
+
+CATEGORY_KEYWORDS = {
+    "Film and Animation": [  # Film & Animation
+        "movie", "film", "animation", "trailer", "cinematography",
+        "short film", "anime", "cartoon", "storyboard", "CGI"
+    ],
+    "Autos & Vehicles": [  # Autos & Vehicles
+        "car", "vehicle", "engine", "test drive", "racing",
+        "motorcycle", "auto repair", "horsepower", "tuning", "drift"
+    ],
+    "Music": [  # Music
+        "song", "music video", "album", "live performance", "cover",
+        "remix", "concert", "lyrics", "instrumental", "playlist"
+    ],
+    "Pets & Animals": [  # Pets & Animals
+        "cat", "dog", "wildlife", "zoo", "animal rescue",
+        "pet care", "training", "exotic", "veterinary", "puppy"
+    ],
+    "Sports": [  # Sports
+        "football", "basketball", "soccer", "highlights", "olympics",
+        "workout", "training", "athlete", "fitness", "UFC", "tennis", "F1"
+    ],
+    "Short Movies": [  # Short Movies
+        "short film", "indie film", "film festival", "microfilm",
+        "vignette", "story"
+    ],
+    "Travel & Events": [  # Travel & Events
+        "travel vlog", "destination", "tourism", "festival", "adventure",
+        "backpacking", "road trip", "sightseeing", "cruise", "hotel"
+    ],
+    "Gaming": [  # Gaming
+        "gameplay", "walkthrough", "let's play", "eSports", "speedrun",
+        "VR", "console", "PC gaming", "Minecraft", "Fortnite"
+    ],
+    "Videoblogging": [  # Videoblogging
+        "vlog", "daily vlog", "lifestyle vlog", "storytime", "behind the scenes",
+        "channel update"
+    ],
+    "People & Blogs": [  # People & Blogs
+        "personal vlog", "storytime", "advice", "lifestyle", "Q&A",
+        "commentary", "haul", "opinion", "self-improvement", "routine"
+    ],
+    "Comedy": [  # Comedy
+        "stand-up", "sketch", "parody", "meme", "improv", "sitcom", "slapstick", "spoof",
+        "roast", "prank", "satire", "comedy special", "lol", "skit",
+        "laugh", "comedic",
+    ],
+    "Entertainment": [  # Entertainment
+        "celebrity news", "gossip", "pop culture", "movie review", "reality TV",
+        "award show", "red carpet", "fan theory"
+    ],
+    "News & Politics": [  # News & Politics
+        "breaking news", "election", "policy", "debate", "journalist",
+        "world affairs", "crisis", "protest", "analysis", "government"
+    ],
+    "Howto & Style": [  # How-to & Style
+        "tutorial", "DIY", "makeup", "fashion", "skincare",
+        "hair", "life hack", "home improvement", "renovation"
+    ],
+    "Education": [  # Education
+        "lecture", "lesson", "course", "study", "tutorial",
+        "exam prep", "classroom", "teacher", "learning", "module"
+    ],
+    "Science and Technology": [  # Science & Technology
+        "science", "tech review", "AI", "machine learning", "robotics",
+        "gadgets", "experiment", "NASA", "innovation", "quantum"
+    ],
+    "Nonprofits & Activism": [  # Nonprofits & Activism
+        "charity", "activism", "fundraiser", "social justice", "climate change",
+        "volunteer", "awareness", "sustainability", "human rights"
+    ],
+    "Movies": [  # Movies
+        "blockbuster", "cinema", "screening", "box office", "movie critique",
+        "genre", "director", "actor", "film history"
+    ],
+    "Anime/Animation": [  # Anime/Animation
+        "anime", "manga", "Studio Ghibli", "cosplay", "OVA",
+        "AMV", "cartoon", "animated series"
+    ],
+    "Action/Adventure": [  # Action/Adventure
+        "action movie", "stunts", "hero", "adventure", "chase",
+        "battle", "quest", "thriller"
+    ],
+    "Classics": [  # Classics
+        "classic film", "vintage", "retro", "black and white", "Golden Age",
+        "film history", "old movie"
+    ],
+    "Documentary": [  # Documentary
+        "documentary", "docu", "true story", "investigation", "biography",
+        "nature doc", "historical doc"
+    ],
+    "Drama": [  # Drama
+        "dramatic", "soap opera", "melodrama", "character study",
+        "theatrical", "emotional"
+    ],
+    "Family": [  # Family
+        "family film", "kids", "children", "parenting", "Disney",
+        "animated", "family-friendly"
+    ],
+    "Foreign": [  # Foreign
+        "foreign film", "international cinema", "subtitles", "world cinema",
+        "international", "global film"
+    ],
+    "Horror": [  # Horror
+        "horror movie", "scary", "ghost", "zombie", "paranormal",
+        "slasher", "haunted"
+    ],
+    "Sci-Fi/Fantasy": [  # Sci-Fi/Fantasy
+        "sci-fi", "fantasy", "space opera", "aliens", "magic",
+        "dragons", "futuristic", "dystopia"
+    ],
+    "Thriller": [  # Thriller
+        "thriller", "suspense", "mystery", "crime", "detective",
+        "psychological", "plot twist"
+    ],
+    "Shorts": [  # Shorts
+        "shorts", "#shorts", "clip", "microvideo", "vertical video"
+    ],
+    "Shows": [  # Shows
+        "TV show", "series", "episode", "sitcom", "reality show",
+        "season", "streaming"
+    ],
+    "Trailers": [  # Trailers
+        "trailer", "teaser", "preview", "official trailer", "sneak peek"
+    ],
+}
+
+def get_rule_inputs(row):
+    """ Pulls the values the 10 evaluation rules look at out of a preprocessed row.
+    Shared by build_prompt and focus_utils.rules so both see the same inputs. """
+    # [your existing extraction logic…]
+    prev_focuses = [str(row.get(f"focusMode_{i+1}", "")).lower()=="true" for i in range(3)]
+    prev_cats = [str(row.get(f"categoryId_{i+1}", "")) for i in range(3)]
+    focus_cats = row["focus_categories"][0]
+    title          = str(row.get("title","")).replace("\n"," ")
+    desc           = str(row.get("description","")).replace("\n"," ")
+    current_cat    = str(row.get("video_category",""))
+    desc_wc        = len(desc.split())
+    is_sub         = str(row.get("isSubscribed",False)).lower()=="true"
+    intent_source  = str(row.get("curr_intent_source","")).lower()
+
+    categories_list = [cat.strip() for cat in focus_cats.split(",")]
+
+    # 5) Find which keywords of those categories appear in title or description
+    # (imported here, focus_utils.keywords imports CATEGORY_KEYWORDS from this module)
+    from focus_utils.keywords import get_keyword_matcher
+    key_hits = get_keyword_matcher(categories_list).find(title, desc)
+
+    return {
+        "prev_focuses": prev_focuses,
+        "prev_cats": prev_cats,
+        "focus_cats": focus_cats,
+        "categories_list": categories_list,
+        "title": title,
+        "desc": desc,
+        "current_cat": current_cat,
+        "desc_wc": desc_wc,
+        "is_sub": is_sub,
+        "intent_source": intent_source,
+        "key_hits": key_hits,
+    }
+
+
+# The prompt is sent as a byte-stable static prefix (instructions + few-shot examples, the same
+# for every request so the provider can cache it) followed by the per-request section.
+STATIC_INSTRUCTIONS = """
+You are a YouTube Focus Mode decision assistant.
+
+Your goal is to evaluate whether **Focus Mode** should be enabled for the current session. Focus Mode should be enabled if any **strong signals** suggest the user is watching with intentional focus.
+
+### Evaluation Rules
+1. Any previous focusMode is True.
+2. If any previous categoryId==current and that session had focusMode=True.**Strong Signal**
+3. If the current category is in the user's selected focus categories, treat this as a strong signal. Even if no prior focus or other signals exist, this alone is enough to enable Focus Mode.
+4. Any previous category matches current.**Strong Signal**
+5. A previous focusMode=True AND categoryId of that focusMode matched current vidoes categoryId.
+6. Current category appears ≥2 times.**Strong Signal**
+7. User is subscribed.
+8. Intent source contains Search/Channel.
+9. Title/description contains focus keywords.
+10. Description >50 words AND has focus keywords.
+(The values for rules 7-10 are listed under "Rule Inputs" for the current video.)
+
+
+### Guidance for Predictions
+- Use the examples as reference, not as strict rules.
+- It is acceptable for similar cases to have different outcomes if context differs.
+- Return a confidence score between 60–100%, representing how confident you are in the decision you’ve made (whether true or false).
+	- If your evaluation strongly supports Focus Mode = true, assign high confidence (e.g. 90–100%).
+	- If your evaluation strongly supports Focus Mode = false, assign high confidence (e.g. 85–95%).
+	- If the signals are mixed or weak, reduce the score accordingly (e.g. 60–70%).
+- Always base your prediction on the full evidence above, not just pattern matching.
+
+Your goal is to evaluate whether **Focus Mode** should be enabled for the current session.
+You MUST evaluate ALL 10 rules. 
+IF ANY OF THE *Strong Signals* IS VERIFIED RETURN -> true.  Return JSON only:
+```json
+{
+  "category":"true" or "false",
+  "rule":[…],
+  "explanation":"A detailed explanation of your reasoning.",
+  "explanation_summary": "A short summary in this format: 'Confidence: [number]% | Key Evidence: [short phrase supporting the confidence. Not more than 20 words. Do NOT repeat the explanation]'",
+  "confidence":"0-100% score indicating how confident the model is in the decision (true or false). High score = strong belief in that decision."
+}
+```
+
+### Examples
+"""
+
+# "all" sends every few-shot example (cacheable prefix), "similar" only the PROMPT_FEW_SHOT_K
+# examples closest to the current video (smaller prompt, prefix differs per request)
+PROMPT_FEW_SHOT_MODE = os.environ.get("PromptFewShotMode", "all")
+PROMPT_FEW_SHOT_K = int(os.environ.get("PromptFewShotK", 4))
+
+
+def _parse_few_shot_examples(text):
+    """ Splits FEW_SHOT_EXAMPLES into its examples with the rule values and outcome each one lists """
+    examples = []
+    for block in text.strip().split("\n---\n"):
+        block = block.strip()
+        rules = dict(re.findall(r"^(\d+): (true|false)", block, re.MULTILINE))
+        category = re.search(r'^Current category: "(.*)"', block, re.MULTILINE)
+        examples.append({
+            "text": block,
+            "rules": tuple(rules.get(str(number)) == "true" for number in range(1, 11)),
+            "category": category.group(1) if category else "",
+            "outcome": "→ **True**" in block,
+        })
+    return examples
+
+
+# built once per container
+FEW_SHOT_INDEX = _parse_few_shot_examples(FEW_SHOT_EXAMPLES)
+STATIC_PROMPT_PREFIX = STATIC_INSTRUCTIONS + FEW_SHOT_EXAMPLES
+
+
+def select_few_shot_examples(rule_values, current_cat, k=PROMPT_FEW_SHOT_K):
+    """
+    Picks the k examples whose rule values (and category) are closest to the current video,
+    keeping at least one example of each outcome. Returned in their original order.
+    """
+    def similarity(example):
+        same_rules = sum(a == b for a, b in zip(example["rules"], rule_values))
+        return same_rules + (example["category"].lower() == str(current_cat).lower())
+
+    ranked = sorted(range(len(FEW_SHOT_INDEX)), key=lambda i: (-similarity(FEW_SHOT_INDEX[i]), i))
+    selected = ranked[:k]
+    outcomes = {FEW_SHOT_INDEX[i]["outcome"] for i in selected}
+    if len(outcomes) == 1 and k >= 2:
+        other = next((i for i in ranked[k:] if FEW_SHOT_INDEX[i]["outcome"] not in outcomes), None)
+        if other is not None:
+            selected[-1] = other
+    return [FEW_SHOT_INDEX[i] for i in sorted(selected)]
+
+
+def build_dynamic_prompt(row):
+    """ The per-request part of the prompt: the current video, the user's context and the rule inputs """
+    inputs = get_rule_inputs(row)
+    prev_focuses, prev_cats, focus_cats = inputs["prev_focuses"], inputs["prev_cats"], inputs["focus_cats"]
+    title, desc, current_cat, desc_wc = inputs["title"], inputs["desc"], inputs["current_cat"], inputs["desc_wc"]
+    is_sub, intent_source, key_hits = inputs["is_sub"], inputs["intent_source"], inputs["key_hits"]
+
+    cat_focus_map  = "\n".join(
+        f"{i+1}. categoryId_{i+1}={prev_cats[i]} → focusMode_{i+1}={prev_focuses[i]}"
+        for i in range(3)
+    )
+
+    return f"""
+Evaluate the following:
+
+### Current Video Info:
+- Title: "{title}"
+- Description: "{desc[:140]}..."
+- Current categoryId: {current_cat}
+
+### User Focus Context:
+- User-selected focus categories: {focus_cats or "None"}
+
+### Past Sessions:
+{cat_focus_map}
+
+### Rule Inputs
+7. User is subscribed → {is_sub}
+8. Intent source contains Search/Channel → {intent_source}
+9. Title/description contains focus keywords → {', '.join(key_hits) or "None"}
+10. Description >50 words AND has focus keywords → {desc_wc>50 and len(key_hits)>0}
+"""
+
+
+def build_prompt_messages(row, mode=None, k=None):
+    """
+    Returns the chat messages for row: the static prefix as the system message and the
+    per-request section as the user message. mode defaults to PROMPT_FEW_SHOT_MODE.
+    """
+    mode = mode or PROMPT_FEW_SHOT_MODE
+    if mode == "similar":
+        # imported here, focus_utils.rules imports this module
+        from focus_utils.rules import evaluate_rules
+
+        rules = evaluate_rules(row)
+        examples = select_few_shot_examples(
+            [rules[number] for number in range(1, 11)], row.get("video_category", ""), k or PROMPT_FEW_SHOT_K
+        )
+        static_prefix = STATIC_INSTRUCTIONS + "\n" + "\n\n---\n\n".join(example["text"] for example in examples) + "\n"
+    else:
+        static_prefix = STATIC_PROMPT_PREFIX
+
+    return [
+        {"role": "system", "content": static_prefix},
+        {"role": "user", "content": build_dynamic_prompt(row)},
+    ]
+
+
+def build_prompt(row):
+    """ The whole prompt as a single string (static prefix + per-request section) """
+    return "".join(message["content"] for message in build_prompt_messages(row, mode="all"))
+
+
+def log_prompt_usage(mode, messages, usage):
+    """ Logs the token counts OpenAI reported for a request, per few-shot mode """
+    usage = usage or {}
+    logger.info("prompt usage", extra={"prompt_usage": {
+        "mode": mode,
+        "static_chars": len(messages[0]["content"]),
+        "dynamic_chars": len(messages[1]["content"]),
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "cached_tokens": (usage.get("prompt_tokens_details") or {}).get("cached_tokens"),
+        "completion_tokens": usage.get("completion_tokens"),
+    }})
@@ -0,0 +1,77 @@
+"""
+Message queues the handlers hand work off through.
+
+SqsQueue sends to an SQS queue; LocalQueue is an in-memory stand-in whose receive() returns
+records shaped like the SQS event a consumer function gets, so a producer and its consumer
+can be run against each other locally:
+
+    queue = LocalQueue()
+    queue.send({"jobId": ...})
+    consumer.lambda_handler({"Records": queue.receive()}, None)
+"""
+import json
+import threading
+import time
+
+from focus_utils.common import decimal_to_int
+from focus_utils.tracing import register_botocore_spans
+
+
+class SqsQueue:
+    """ Sends JSON messages to the SQS queue at queue_url; the client is created on first send """
+
+    def __init__(self, queue_url: str):
+        self.queue_url = queue_url
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                import boto3 # type: ignore
+                self._client = boto3.client("sqs")
+                register_botocore_spans(self._client, "sqs", "SQSRetries")
+            return self._client
+
+    def send(self, message: dict) -> str:
+        response = self.client.send_message(QueueUrl=self.queue_url, MessageBody=json.dumps(message, default=decimal_to_int))
+        return response["MessageId"]
+
+
+class LocalQueue:
+    """ In-memory stand-in for SqsQueue; receive() returns SQS event records """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.messages = []
+        self._next_id = 0
+
+    def send(self, message: dict) -> str:
+        self._next_id += 1
+        message_id = f"local-{self._next_id}"
+        self.messages.append({
+            "messageId": message_id,
+            "body": json.dumps(message, default=decimal_to_int),
+            "attributes": {"SentTimestamp": str(int(self.clock() * 1000))},
+        })
+        return message_id
+
+    def receive(self, max_messages: int = None) -> list:
+        count = len(self.messages) if max_messages is None else max_messages
+        records, self.messages = self.messages[:count], self.messages[count:]
+        return records
+
+
+_queues = {}
+_lock = threading.Lock()
+
+
+def get_queue(queue_url: str):
+    """ The SqsQueue for queue_url, kept for the life of the container; None when queue_url isn't set """
+    if not queue_url:
+        return None
+    with _lock:
+        if queue_url not in _queues:
+            _queues[queue_url] = SqsQueue(queue_url)
+        return _queues[queue_url]
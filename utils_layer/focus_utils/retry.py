@@ -0,0 +1,117 @@
+"""
+Retry scheduling that stays inside the Lambda deadline.
+
+    retry = RetryScheduler.from_lambda_context(context, max_attempts=3)
+    for attempt in retry.attempts():
+        response = session.post(url, json=body, timeout=retry.request_timeout(3.05, 30))
+        if response.status_code == 200:
+            break
+        if response.status_code not in RETRYABLE_STATUS_CODES or not retry.wait(get_retry_after(response.headers)):
+            break
+
+Attempts and backoff sleeps are budgeted against the time the invocation has left, minus a
+reserve that is always kept for writing the fallback result. Backoff uses decorrelated jitter
+and never waits less than a server's Retry-After. clock/sleep/random can be swapped for tests.
+"""
+import math
+import random
+import time
+
+from email.utils import parsedate_to_datetime
+
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+# time kept back for the fallback write and the response
+FALLBACK_RESERVE_SECONDS = 2.0
+# an attempt isn't started with less than this left
+MIN_ATTEMPT_SECONDS = 1.0
+BASE_DELAY_SECONDS = 0.5
+MAX_DELAY_SECONDS = 8.0
+
+
+def get_retry_after(headers):
+    """ Seconds to wait from Retry-After (delta seconds or an HTTP date) or retry-after-ms, None if absent """
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms is not None:
+        try:
+            return max(float(retry_after_ms) / 1000, 0.0)
+        except ValueError:
+            pass
+
+    retry_after = headers.get("Retry-After")
+    if retry_after is None:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+class RetryScheduler:
+    def __init__(self, remaining_seconds=None, max_attempts=3, base_delay=BASE_DELAY_SECONDS,
+                 max_delay=MAX_DELAY_SECONDS, reserve_seconds=FALLBACK_RESERVE_SECONDS,
+                 clock=time.monotonic, sleep=time.sleep, random=random.random):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.reserve_seconds = reserve_seconds
+        self.clock = clock
+        self.sleep = sleep
+        self.random = random
+        self.deadline = math.inf if remaining_seconds is None else clock() + remaining_seconds
+        self.attempt = 0
+        self.delays = []
+        self._previous_delay = base_delay
+
+    @classmethod
+    def from_lambda_context(cls, context, **kwargs):
+        """ Budgets against context.get_remaining_time_in_millis(); no deadline without a context """
+        remaining_seconds = None
+        if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+            remaining_seconds = context.get_remaining_time_in_millis() / 1000
+        return cls(remaining_seconds, **kwargs)
+
+    def remaining(self) -> float:
+        """ Seconds left for attempts and backoff, after the fallback reserve """
+        return self.deadline - self.clock() - self.reserve_seconds
+
+    def attempts(self):
+        """ Yields the attempt numbers (0, 1, ...) while attempts are left and there is time for one """
+        while self.attempt < self.max_attempts and self.remaining() >= MIN_ATTEMPT_SECONDS:
+            yield self.attempt
+            self.attempt += 1
+
+    def request_timeout(self, connect_timeout: float, read_timeout: float):
+        """ (connect, read) timeouts capped so the request ends before the reserve is touched """
+        budget = max(self.remaining(), 0.0)
+        return (min(connect_timeout, budget), min(read_timeout, budget))
+
+    def next_delay(self, retry_after=None) -> float:
+        # decorrelated jitter: uniform between the base and three times the previous delay
+        delay = min(self.max_delay, self.base_delay + self.random() * (self._previous_delay * 3 - self.base_delay))
+        self._previous_delay = delay
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def wait(self, retry_after=None) -> bool:
+        """
+        Sleeps before the next attempt. Returns False without sleeping when no attempt is left or
+        the wait plus a minimal attempt would not fit before the deadline.
+        """
+        if self.attempt + 1 >= self.max_attempts:
+            return False
+        delay = self.next_delay(retry_after)
+        if delay + MIN_ATTEMPT_SECONDS > self.remaining():
+            return False
+        self.delays.append(delay)
+        self.sleep(delay)
+        return True
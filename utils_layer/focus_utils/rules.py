@@ -0,0 +1,91 @@
+"""
+Local evaluation of the 10 rules that build_prompt asks the model to check.
+
+When one of the decisive strong signals fires, /categorize takes the decision from here and
+skips the OpenAI call; otherwise the rules are only informational and the model decides.
+"""
+import os
+
+from focus_utils.prompt import get_rule_inputs
+
+
+LOCAL_RULES_ENABLED = os.environ.get("LocalRulesEnabled", "true").lower() == "true"
+
+# Rules whose "true" alone decides Focus Mode = true. The prompt also marks 4 and 6 as strong
+# signals, but few-shot examples 9-12 have them true with a False outcome, so those cases are
+# left to the model.
+DECISIVE_RULES = {
+    2: ("95%", "Focus Mode was on for an earlier video in this same category."),
+    3: ("90%", "The video category is one of the user's selected focus categories."),
+}
+
+# category name extract_features uses when the id couldn't be mapped
+UNKNOWN_CATEGORY = "Unknown"
+
+
+def _normalize_category(category):
+    return str(category).replace('&', 'and').strip().lower()
+
+
+def _is_known_category(category):
+    return _normalize_category(category) not in ("", _normalize_category(UNKNOWN_CATEGORY), "none", "nan")
+
+
+def evaluate_rules(row):
+    """
+    Computes the 10 evaluation rules of build_prompt for a preprocessed row.
+
+    Returns:
+        dict: {rule number: bool}, plus "key_hits" with the matched focus keywords.
+    """
+    inputs = get_rule_inputs(row)
+    prev_focuses, prev_cats = inputs["prev_focuses"], inputs["prev_cats"]
+    current_cat = inputs["current_cat"]
+    key_hits = inputs["key_hits"]
+
+    # an unmapped category never counts as a match
+    category_matches = [
+        _is_known_category(current_cat) and _normalize_category(prev_cat) == _normalize_category(current_cat)
+        for prev_cat in prev_cats
+    ]
+    focus_categories = {_normalize_category(cat) for cat in inputs["categories_list"] if _is_known_category(cat)}
+    focus_match = any(matches and focused for matches, focused in zip(category_matches, prev_focuses))
+
+    return {
+        1: any(prev_focuses),
+        2: focus_match,
+        3: _is_known_category(current_cat) and _normalize_category(current_cat) in focus_categories,
+        4: any(category_matches),
+        5: focus_match,
+        6: sum(category_matches) >= 2,
+        7: inputs["is_sub"],
+        8: "search" in inputs["intent_source"] or "channel" in inputs["intent_source"],
+        9: len(key_hits) > 0,
+        10: inputs["desc_wc"] > 50 and len(key_hits) > 0,
+        "key_hits": key_hits,
+    }
+
+
+def decide_locally(row):
+    """
+    Returns the categorize result for row when a decisive rule fires, in the same shape as the
+    model's answer plus "decision_path" (e.g. "rules:3"), or None when the model has to decide.
+    """
+    rules = evaluate_rules(row)
+    for rule_number, (confidence, evidence) in DECISIVE_RULES.items():
+        if not rules[rule_number]:
+            continue
+
+        fired = [number for number in range(1, 11) if rules[number]]
+        explanation = f"Rule {rule_number} is a strong signal: {evidence} Rules that hold: {', '.join(map(str, fired))}."
+        if rules["key_hits"]:
+            explanation += f" Focus keywords: {', '.join(rules['key_hits'])}."
+        return {
+            "category": "true",
+            "rule": [rules[number] for number in range(1, 11)],
+            "explanation": explanation,
+            "explanation_summary": f"Confidence: {confidence} | Key Evidence: {evidence}",
+            "confidence": confidence,
+            "decision_path": f"rules:{rule_number}",
+        }
+    return None
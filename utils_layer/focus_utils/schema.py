@@ -0,0 +1,43 @@
+"""
+Validators for the /collect data types, compiled once from data_types.yaml.
+
+A data type is a mapping of value name -> type name, where the type is one of
+FIELD_TYPES and may end in "?" when the value is optional.
+"""
+
+FIELD_TYPES = {"string": str, "int": int, "float": float, "bool": bool}
+OPTIONAL_SUFFIX = "?"
+
+
+class DataTypeValidator:
+    """ Checks a request body against one data type; every field error is reported in a single pass """
+
+    def __init__(self, name: str, values: dict):
+        self.name = name
+        self.fields = []
+        for value_name, type_name in values.items():
+            required = not type_name.endswith(OPTIONAL_SUFFIX)
+            base_type_name = type_name if required else type_name[:-len(OPTIONAL_SUFFIX)]
+            if base_type_name not in FIELD_TYPES:
+                raise ValueError(f"Unknown value type {type_name!r} for {name}.{value_name}")
+            self.fields.append((value_name, FIELD_TYPES[base_type_name], required, type_name))
+        self.fields = tuple(self.fields)
+
+    def validate(self, body: dict) -> list:
+        """ Returns the error messages for body, in data_types.yaml order (empty when body is valid) """
+        errors = []
+        for value_name, value_type, required, type_name in self.fields:
+            if value_name not in body:
+                if required:
+                    errors.append(f"Missing the value: {value_name}")
+            elif not isinstance(body[value_name], value_type):
+                errors.append(f"Invalid value type for value: {value_name}. Should be {type_name}")
+        return errors
+
+
+def compile_data_types(data_types: dict) -> dict:
+    """
+    Compiles the "data_types" section of data_types.yaml into {data type name: DataTypeValidator}.
+    Raises ValueError for a type name that isn't in FIELD_TYPES.
+    """
+    return {name: DataTypeValidator(name, values or {}) for name, values in data_types.items()}
@@ -0,0 +1,463 @@
+import json
+import threading
+
+from bisect import bisect_right
+from botocore.exceptions import ClientError # type: ignore
+from datetime import timedelta
+
+from focus_utils import tables
+from focus_utils.common import CORS_HEADERS, STAGE_LENGTH_SECONDS, decimal_to_int, get_current_datetime_str, get_datetime_obj, get_epoch_seconds
+
+
+def update_last_active_time(user_id : str):
+    user_context = UserContext(user_id)
+    missing_id_message = user_context.check_id()
+    if missing_id_message:
+        return missing_id_message
+
+    try:
+        user_context.touch()
+        response = user_context.save()
+        
+        # Return only the updated timestamp
+        return {"User_Id": user_id, "Last_Active_At_Time": response["Last_Active_At_Time"]}
+    except Exception as e:
+        return {"error": f"Failed to update Last_Active_At_Time: {str(e)}"}
+
+def get_next_stage(user_stage_orders, current_stage):
+    for i, stage_number in enumerate(user_stage_orders):
+        if stage_number == current_stage and i != len(user_stage_orders)-2:
+            return user_stage_orders[i+1]
+    return None
+
+def getStageResponseObject(response_object, user_id, is_stage_changed, is_study_completed, current_week=None):
+    if current_week is None:
+        try:
+            current_week = response_object["Stage_Order_List"].index(response_object["Current_Stage"]) + 1
+        except ValueError:
+            return None
+    data = {
+            "user_Id": user_id,
+            "current_stage": response_object["Current_Stage"],
+            "is_stage_changed": is_stage_changed,
+            "is_study_completed": is_study_completed,
+            "current_week": current_week
+        }
+    return data
+
+def get_current_study_stage(stage_start_times: dict[str, str], last_active_str: str) -> int:
+    last_active = get_datetime_obj(last_active_str)
+    
+    # Convert to list of tuples: (stage_number, datetime_object)
+    stage_entries = [
+        (stage, get_datetime_obj(start_time)) for stage, start_time in stage_start_times.items()
+    ]
+
+    # Sort by datetime so we can find the latest stage that started before last active
+    stage_entries.sort(key=lambda x: x[1])
+
+    current_stage = 0
+    for stage, start_dt in stage_entries:
+        if last_active >= start_dt:
+            current_stage = int(stage)
+        else:
+            break
+
+    return current_stage
+
+
+def is_study_over(stage_start_times: dict[str, str], stage_sequence: list[int], last_active_str: str) -> bool:
+    last_active = get_datetime_obj(last_active_str)
+    
+    final_stage = stage_sequence[-1]
+    final_start = get_datetime_obj(stage_start_times[str(final_stage)])
+    final_end = final_start + timedelta(days=7)
+
+    return last_active >= final_end
+
+
+def stage_schedule_from_start_times(stage_start_times: dict[str, str], stage_order: list[int]):
+    """
+    Builds the Stage_Schedule (see common.generate_stage_schedule) of a row onboarded before
+    the schedule was stored. Returns None when Stage_Start_Times doesn't follow stage_order week
+    by week, in which case the row keeps using get_current_study_stage / is_study_over.
+    """
+    if set(stage_start_times) != {str(stage) for stage in stage_order}:
+        return None
+    boundaries = [get_epoch_seconds(get_datetime_obj(stage_start_times[str(stage)])) for stage in stage_order]
+    boundaries.append(boundaries[-1] + STAGE_LENGTH_SECONDS)
+    if any(later - earlier != STAGE_LENGTH_SECONDS for earlier, later in zip(boundaries, boundaries[1:])):
+        return None
+    if any(boundary != int(boundary) for boundary in boundaries):
+        return None
+    return [int(boundary) for boundary in boundaries]
+
+
+def get_stage_schedule(user_item: dict):
+    """ The row's Stage_Schedule, built from Stage_Start_Times when the row predates it (None if it can't be) """
+    schedule = user_item.get("Stage_Schedule")
+    if schedule is None:
+        schedule = stage_schedule_from_start_times(user_item["Stage_Start_Times"], user_item["Stage_Order_List"])
+    return schedule
+
+
+def locate_in_schedule(schedule: list, stage_order: list[int], last_active_str: str) -> tuple:
+    """
+    Finds last_active_str in a Stage_Schedule with one bisect.
+
+    Returns:
+        tuple: (stage, week, is_study_completed), matching get_current_study_stage and
+        is_study_over. stage and week are 0 before the study starts; once it is over they
+        stay at the last stage.
+    """
+    position = bisect_right(schedule, get_epoch_seconds(get_datetime_obj(last_active_str)))
+    week = min(position, len(stage_order))
+    stage = int(stage_order[week - 1]) if week else 0
+    return stage, week, position == len(schedule)
+
+def update_user_stage(user_id : str):
+    user_context = UserContext(user_id)
+    missing_id_message = user_context.check_id()
+    if missing_id_message:
+        return missing_id_message
+
+    data, message = user_context.update_stage()
+    if data is None:
+        return  {
+            "statusCode": 500,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({
+                "message": message
+            }),
+        }
+    if "error" in data:
+        return {
+            "statusCode": 500,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({
+                "data": data,
+                "message": message
+            }),
+        }
+
+    try:
+        user_context.save()
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({
+                "data": {
+                    "error": f"Failed to update user stage information for user {user_id}: {str(e)}",
+                },
+                "message": "ERROR: Failed to update user stage information"
+            }),
+        }
+
+    return {
+        "statusCode": 200,
+        "headers": CORS_HEADERS,
+        "body": json.dumps({
+            "data": data,
+            "message": message
+        }, default=decimal_to_int),
+    }
+
+def check_id(prolific_id: str) -> bool:
+    return UserContext(prolific_id).check_id()
+
+
+def compute_stage_transition(user_item: dict, user_id: str):
+    """
+    Works out which stage the user should be in, based on the row's Last_Active_At_Time,
+    without touching the table. Uses the row's Stage_Schedule (or one built from
+    Stage_Start_Times for older rows).
+
+    Returns:
+        tuple: (new_stage, completed_stage, is_stage_changed, is_study_completed, message, current_week).
+        new_stage is None when Current_Stage stays as it is and completed_stage is None when
+        nothing has to be appended to User_Completed_Stages. current_week is the week of the
+        stage the user ends up in, or None when the schedule doesn't give it (getStageResponseObject
+        then looks it up in Stage_Order_List).
+    """
+    current_study_stage = user_item.get("Current_Stage")
+    user_stage_order_list = user_item["Stage_Order_List"]
+    stage_start_times = user_item["Stage_Start_Times"]
+    last_active_timestamp = user_item["Last_Active_At_Time"]
+    user_completed_stages = user_item["User_Completed_Stages"]
+
+    schedule = get_stage_schedule(user_item)
+    if schedule is not None:
+        stage, week, is_study_completed = locate_in_schedule(schedule, user_stage_order_list, last_active_timestamp)
+    else:
+        stage = get_current_study_stage(stage_start_times, last_active_timestamp)
+        is_study_completed = is_study_over(stage_start_times, user_stage_order_list, last_active_timestamp)
+        week = None
+    # week 0 (before the study starts) isn't a week of the response
+    week = week or None
+
+    if not current_study_stage and stage == 0:
+        return user_stage_order_list[0], None, True, False, "First stage for the user started successfully.", 1
+
+    if is_study_completed:
+        message = f"Study for the user with id: {user_id} completed."
+        if current_study_stage not in user_completed_stages:
+            return stage, current_study_stage, True, True, message, week
+        return None, None, False, True, message, week if current_study_stage == stage else None
+
+    if stage != current_study_stage:
+        return stage, current_study_stage, True, False, "started a new stage for the user as previous is completed", week
+
+    return None, None, False, False, "No stage update as user is still in the current stage time limit", week
+
+
+# idempotency keys remembered per attribute by claim_idempotency_key (oldest are dropped first)
+IDEMPOTENCY_KEYS_KEPT = 50
+
+
+class UserContext:
+    """
+    Per-invocation view of a single row in the user table.
+
+    The row is read once; the auth check, last active update and stage computation all run
+    against that in-memory copy and save() writes the pending changes back in a single
+    conditional update_item. round_trips counts the calls made to the user table; save() and the
+    preference helpers may run on worker threads, so they go through count_round_trip().
+    consistent_read makes load() a strongly consistent read (for retries after a conflict).
+    """
+
+    def __init__(self, user_id: str, table=None, consistent_read: bool = False):
+        self.user_id = user_id
+        self.table = table if table is not None else tables.user_table
+        self.consistent_read = consistent_read
+        self.item = None
+        self.round_trips = 0
+        self._round_trips_lock = threading.Lock()
+        self._loaded = False
+        self._pending = {}
+        # path -> amount added atomically by save()
+        self._increments = {}
+        # attribute -> the value save() expects to still be in the table (None: not there)
+        self._expected = {}
+        # (previous_stage, new_stage, completed_stage) waiting to be written by save()
+        self._stage_transition = None
+        # the data update_stage() returned for that transition, corrected by save() if it is dropped
+        self._stage_data = None
+
+    def load(self) -> dict:
+        if not self._loaded:
+            get_kwargs = {"Key": {"User_Id": self.user_id}}
+            if self.consistent_read:
+                get_kwargs["ConsistentRead"] = True
+            response = self.table.get_item(**get_kwargs)
+            self.count_round_trip()
+            self.item = response.get("Item")
+            self._loaded = True
+        return self.item
+
+    def count_round_trip(self):
+        with self._round_trips_lock:
+            self.round_trips += 1
+
+    def check_id(self):
+        if self.load():
+            # If a record with this User_Id exists, return None (meaning OK)
+            return None
+
+        # If no record exists, return a 401 Unauthorized response
+        return {
+            "statusCode": 401,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({
+                "message": "Unauthorized"
+            }),
+        }
+
+    def set_attribute(self, *path: str, value):
+        """
+        Sets a (possibly nested) attribute on the in-memory row and queues it for save().
+        E.g. set_attribute("StageWatchTimes", "2", value=120)
+        """
+        node = self.load()
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+        self._pending[path] = value
+
+    def add_to_attribute(self, *path: str, value):
+        """
+        Queues an atomic increment for save(), which writes path = if_not_exists(path, 0) + value,
+        so concurrent requests add up instead of overwriting each other. The in-memory row is
+        updated with the same sum. E.g. add_to_attribute("StageWatchTimes", "2", value=15)
+        """
+        node = self.load()
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = node.get(path[-1], 0) + value
+        self._increments[path] = self._increments.get(path, 0) + value
+
+    def claim_idempotency_key(self, attribute: str, key: str, keep: int = IDEMPOTENCY_KEYS_KEPT) -> bool:
+        """
+        Returns False when key is already in the row's attribute list (the request was applied
+        before). Otherwise appends it, keeping the last `keep` keys, and makes save() conditional
+        on the list being unchanged since it was read, so a concurrent writer can't drop the key;
+        save() then raises ConditionalCheckFailedException and the caller retries with a fresh read.
+        """
+        item = self.load()
+        seen = list(item.get(attribute, []))
+        if key in seen:
+            return False
+        # several keys can be claimed before one save(); the condition is on what was read
+        if attribute not in self._expected:
+            self._expected[attribute] = seen if attribute in item else None
+        self.set_attribute(attribute, value=(seen + [key])[-keep:])
+        return True
+
+    def touch(self):
+        self.set_attribute("Last_Active_At_Time", value=get_current_datetime_str())
+
+    def update_stage(self):
+        """
+        Applies any stage transition to the in-memory row. The transition is written by save()
+        with list_append and a condition on the stage that was read, so two concurrent requests
+        cannot both advance the participant. Rows onboarded before Stage_Schedule existed get it
+        written by the same save().
+
+        Returns:
+            tuple: (data, message) matching the body of update_user_stage's response.
+        """
+        try:
+            user_item = self.load()
+            previous_stage = user_item.get("Current_Stage")
+            if "Stage_Schedule" not in user_item:
+                schedule = get_stage_schedule(user_item)
+                if schedule is not None:
+                    self.set_attribute("Stage_Schedule", value=schedule)
+            new_stage, completed_stage, is_stage_changed, is_study_completed, message, current_week = compute_stage_transition(
+                user_item, self.user_id
+            )
+
+            if new_stage is not None:
+                user_item["Current_Stage"] = new_stage
+                if completed_stage is not None:
+                    user_item["User_Completed_Stages"] = list(user_item["User_Completed_Stages"]) + [completed_stage]
+                self._stage_transition = (previous_stage, new_stage, completed_stage)
+
+            data = getStageResponseObject(user_item, self.user_id, is_stage_changed, is_study_completed, current_week)
+            if data is None:
+                return None, "Internal Error: currnet stage not found"
+            if new_stage is not None:
+                self._stage_data = data
+            return data, message
+        except Exception as e:
+            return {
+                "error": f"Failed to update user stage information for user {self.user_id}: {str(e)}",
+            }, "ERROR: Failed to update user stage information"
+
+    def touch_and_advance(self):
+        """
+        Stamps Last_Active_At_Time with the current clock and advances the stage from
+        Stage_Start_Times. Both land in the same UpdateExpression on save().
+        """
+        self.touch()
+        return self.update_stage()
+
+    def save(self) -> dict:
+        """
+        Writes the pending changes. If a concurrent request moved the user on from the stage
+        that was read, only the other attributes are written and the data update_stage()
+        returned is rewritten in place from the row that request left (is_stage_changed False).
+        """
+        if not self._pending and not self._increments and self._stage_transition is None:
+            return self.item
+
+        try:
+            response = self._write(include_stage_transition=True)
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException" or self._stage_transition is None:
+                raise
+            # a concurrent request already moved the user on from the stage we read,
+            # so only the remaining attributes still need to be written
+            if self._pending or self._increments:
+                response = self._write(include_stage_transition=False)
+            else:
+                response = {"Attributes": self._read_consistent()}
+            if self._stage_data is not None:
+                data = getStageResponseObject(response["Attributes"], self.user_id, False, self._stage_data["is_study_completed"])
+                if data is not None:
+                    self._stage_data.update(data)
+
+        self._pending = {}
+        self._increments = {}
+        self._expected = {}
+        self._stage_transition = None
+        self._stage_data = None
+        self.item = response["Attributes"]
+        return self.item
+
+    def _read_consistent(self) -> dict:
+        response = self.table.get_item(Key={"User_Id": self.user_id}, ConsistentRead=True)
+        self.count_round_trip()
+        return response.get("Item")
+
+    def _write(self, include_stage_transition: bool) -> dict:
+        assignments = []
+        conditions = ["attribute_exists(User_Id)"]
+        attribute_names = {}
+        attribute_values = {}
+        for i, (path, value) in enumerate(self._pending.items()):
+            placeholders = []
+            for j, key in enumerate(path):
+                attribute_names[f"#a{i}_{j}"] = key
+                placeholders.append(f"#a{i}_{j}")
+            assignments.append(f"{'.'.join(placeholders)} = :v{i}")
+            attribute_values[f":v{i}"] = value
+
+        for i, (path, value) in enumerate(self._increments.items()):
+            placeholders = []
+            for j, key in enumerate(path):
+                attribute_names[f"#n{i}_{j}"] = key
+                placeholders.append(f"#n{i}_{j}")
+            # ADD only works on top-level attributes, so nested counters use SET arithmetic
+            path_expression = ".".join(placeholders)
+            assignments.append(f"{path_expression} = if_not_exists({path_expression}, :zero) + :d{i}")
+            attribute_values[f":d{i}"] = value
+            attribute_values[":zero"] = 0
+
+        for i, (attribute, expected) in enumerate(self._expected.items()):
+            attribute_names[f"#e{i}"] = attribute
+            if expected is None:
+                conditions.append(f"attribute_not_exists(#e{i})")
+            else:
+                conditions.append(f"#e{i} = :e{i}")
+                attribute_values[f":e{i}"] = expected
+
+        if include_stage_transition and self._stage_transition is not None:
+            previous_stage, new_stage, completed_stage = self._stage_transition
+            assignments.append("Current_Stage = :new_stage")
+            attribute_values[":new_stage"] = new_stage
+            if completed_stage is not None:
+                assignments.append("User_Completed_Stages = list_append(User_Completed_Stages, :last_stage)")
+                attribute_values[":last_stage"] = [completed_stage]
+            if previous_stage is None:
+                conditions.append("attribute_not_exists(Current_Stage)")
+            else:
+                conditions.append("Current_Stage = :previous_stage")
+                attribute_values[":previous_stage"] = previous_stage
+
+        if not assignments:
+            return {"Attributes": self.load()}
+
+        update_kwargs = {
+            "Key": {"User_Id": self.user_id},
+            "UpdateExpression": "SET " + ", ".join(assignments),
+            "ConditionExpression": " AND ".join(conditions),
+            "ExpressionAttributeValues": attribute_values,
+            "ReturnValues": "ALL_NEW"
+        }
+        if attribute_names:
+            update_kwargs["ExpressionAttributeNames"] = attribute_names
+
+        response = self.table.update_item(**update_kwargs)
+        self.count_round_trip()
+        return response
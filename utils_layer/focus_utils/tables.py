@@ -0,0 +1,97 @@
+"""
+DynamoDB resource and table handles shared by the layer.
+
+Nothing is created at import time: boto3 is imported and each Table built the first time
+it is used (tables.user_table, ...), and then kept for the life of the container. Handlers
+should always go through here rather than calling boto3.resource() per request, which
+reloads the service model and opens a new connection pool every time.
+"""
+import os
+import threading
+
+from focus_utils.common import (
+    ADMIN_TABLE_NAME,
+    USER_TABLE_NAME,
+    USER_PREFERENCE_DATA_TABLE_NAME,
+    VIDEO_RECORD_LOG_TABLE_NAME,
+    DAILY_SURVEY_DATA_TABLE_NAME,
+    POST_STAGE_SURVEY_DATA_TABLE_NAME,
+    POST_STUDY_SURVEY_DATA_TABLE_NAME,
+    POST_STAGE_RATING_SURVEY_DATA_TABLE_NAME,
+)
+from focus_utils.tracing import register_botocore_spans
+
+
+# one pool shared by the handler thread and the worker pool (focus_utils.tracing.WORKER_POOL_SIZE)
+DYNAMODB_MAX_POOL_CONNECTIONS = int(os.environ.get("DynamoDbMaxPoolConnections", 16))
+# DynamoDB answers in milliseconds; botocore's 60s defaults would outlive the Lambda timeout
+DYNAMODB_CONNECT_TIMEOUT = float(os.environ.get("DynamoDbConnectTimeout", 2))
+DYNAMODB_READ_TIMEOUT = float(os.environ.get("DynamoDbReadTimeout", 5))
+DYNAMODB_MAX_ATTEMPTS = 3
+
+VIDEO_METADATA_CACHE_TABLE_NAME = os.environ.get("VideoMetadataCacheTableName")
+DECISION_CACHE_TABLE_NAME = os.environ.get("DecisionCacheTableName")
+
+_TABLE_NAMES = {
+    "admin_table": ADMIN_TABLE_NAME,
+    "user_table": USER_TABLE_NAME,
+    "user_pref_data_table": USER_PREFERENCE_DATA_TABLE_NAME,
+    "video_record_log_table": VIDEO_RECORD_LOG_TABLE_NAME,
+    # optional, None when the cache table isn't configured
+    "video_metadata_table": VIDEO_METADATA_CACHE_TABLE_NAME,
+    "decision_cache_table": DECISION_CACHE_TABLE_NAME,
+    "daily_survey_data_table": DAILY_SURVEY_DATA_TABLE_NAME,
+    "post_stage_survey_data_table": POST_STAGE_SURVEY_DATA_TABLE_NAME,
+    "post_study_survey_data_table": POST_STUDY_SURVEY_DATA_TABLE_NAME,
+    "post_stage_rating_survey_data_table": POST_STAGE_RATING_SURVEY_DATA_TABLE_NAME,
+}
+
+# /collect data type (collect/data_types.yaml) -> the table its responses are saved in
+DATA_TYPE_TABLES = {
+    "daily_survey": "daily_survey_data_table",
+    "post_stage_survey": "post_stage_survey_data_table",
+    "post_study_survey": "post_study_survey_data_table",
+    "post_stage_rating_survey": "post_stage_rating_survey_data_table",
+}
+
+
+# handlers look tables up from worker threads too, and boto3's default session isn't thread safe
+_lock = threading.RLock()
+
+
+def _get_dynamodb():
+    with _lock:
+        if "dynamodb" not in globals():
+            import boto3 # type: ignore
+            from botocore.config import Config # type: ignore
+
+            config = Config(
+                max_pool_connections=DYNAMODB_MAX_POOL_CONNECTIONS,
+                tcp_keepalive=True,
+                connect_timeout=DYNAMODB_CONNECT_TIMEOUT,
+                read_timeout=DYNAMODB_READ_TIMEOUT,
+                retries={"mode": "standard", "max_attempts": DYNAMODB_MAX_ATTEMPTS},
+            )
+            resource = boto3.resource("dynamodb", config=config)
+            register_botocore_spans(resource.meta.client, "dynamodb", "DynamoDBRetries")
+            globals()["dynamodb"] = resource
+        return globals()["dynamodb"]
+
+
+def get_table_for_data_type(data_type: str):
+    """ Returns the table /collect saves data_type in, or None when no table is routed for it """
+    name = DATA_TYPE_TABLES.get(data_type)
+    return __getattr__(name) if name else None
+
+
+def __getattr__(name):
+    if name == "dynamodb":
+        return _get_dynamodb()
+    if name not in _TABLE_NAMES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    with _lock:
+        if name not in globals():
+            table_name = _TABLE_NAMES[name]
+            globals()[name] = _get_dynamodb().Table(table_name) if table_name else None
+        return globals()[name]
@@ -0,0 +1,258 @@
+"""
+Per-invocation latency trace and the shared worker pool the handlers run independent I/O on.
+
+    trace = LatencyTrace("categorize")
+    youtube_future = trace.submit("youtube", fetch_youtube_data, video_id)
+    user_item = trace.run("user_load", user_context.load)
+    ...
+    trace.log()
+
+Every stage is recorded with its start offset and duration, so overlapping stages are visible
+and the end-to-end time can be compared with the slowest dependency.
+
+Handlers wrapped with instrument_handler also collect per-invocation metrics: every span
+(DynamoDB, YouTube and OpenAI calls), trace stage and count (retries, cache hits) is emitted
+at the end of the invocation as CloudWatch Embedded Metric Format log lines, so the p99 of
+each dependency can be graphed without X-Ray.
+
+    @instrument_handler("stage")
+    def lambda_handler(event, context):
+        with span("youtube"):
+            ...
+        add_count("OpenAIRetries")
+"""
+import contextvars
+import functools
+import logging
+import os
+import re
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+logger = logging.getLogger(__name__)
+
+WORKER_POOL_SIZE = 8
+
+METRICS_NAMESPACE = os.environ.get("MetricsNamespace", "FocusMode")
+METRICS_ENABLED = os.environ.get("MetricsEnabled", "true").lower() == "true"
+# EMF accepts at most 100 values per metric in one log line
+EMF_MAX_VALUES = 100
+
+# the invocation metrics of the running handler; LatencyTrace.submit carries it to the worker pool
+_current_metrics = contextvars.ContextVar("focus_utils_invocation_metrics", default=None)
+_cold_start = True
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """ The worker pool, created on first use and kept across warm invocations """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=WORKER_POOL_SIZE, thread_name_prefix="focus-utils")
+        return _executor
+
+
+class LatencyTrace:
+    def __init__(self, name: str):
+        self.name = name
+        self.started_at = time.perf_counter()
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, started_at: float, finished_at: float):
+        with self._lock:
+            self.stages[stage] = {
+                "start_ms": round((started_at - self.started_at) * 1000, 2),
+                "duration_ms": round((finished_at - started_at) * 1000, 2),
+            }
+        metrics = _current_metrics.get()
+        if metrics is not None:
+            metrics.add_stage(stage, (finished_at - started_at) * 1000)
+
+    def run(self, stage: str, fn, *args, **kwargs):
+        """ Calls fn on the current thread and records it as stage """
+        started_at = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.record(stage, started_at, time.perf_counter())
+
+    def submit(self, stage: str, fn, *args, **kwargs):
+        """ Runs fn on the worker pool and records it as stage; returns the Future """
+        return get_executor().submit(contextvars.copy_context().run, self.run, stage, fn, *args, **kwargs)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            stages = dict(self.stages)
+        return {
+            "name": self.name,
+            "total_ms": round((time.perf_counter() - self.started_at) * 1000, 2),
+            "stages": stages,
+        }
+
+    def log(self) -> dict:
+        trace = self.as_dict()
+        logger.info("latency trace", extra={"latency_trace": trace})
+        return trace
+
+
+class InvocationMetrics:
+    """ Span durations, stage durations and counts of one handler invocation """
+
+    def __init__(self, service: str, cold_start: bool = False):
+        self.service = service
+        self.cold_start = cold_start
+        self.started_at = time.perf_counter()
+        self.spans = {}
+        self.stages = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, dependency: str, duration_ms: float):
+        with self._lock:
+            self.spans.setdefault(dependency, []).append(round(duration_ms, 2))
+
+    def add_stage(self, stage: str, duration_ms: float):
+        # "openai_2" is the second attempt of the openai stage
+        stage = re.sub(r"_\d+$", "", stage)
+        with self._lock:
+            self.stages.setdefault(stage, []).append(round(duration_ms, 2))
+
+    def add_count(self, name: str, value: int = 1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + value
+
+    def to_emf(self, status_code=None) -> list:
+        """ The invocation as EMF documents: one for the invocation, then one per dependency and stage """
+        timestamp = int(time.time() * 1000)
+        with self._lock:
+            counts = dict(self.counts)
+            spans = {dependency: list(values) for dependency, values in self.spans.items()}
+            stages = {stage: list(values) for stage, values in self.stages.items()}
+
+        invocation = {
+            "Service": self.service,
+            "InvocationLatency": round((time.perf_counter() - self.started_at) * 1000, 2),
+            "ColdStart": int(self.cold_start),
+            **counts,
+        }
+        if status_code is not None:
+            invocation["StatusCode"] = status_code
+        units = {"InvocationLatency": "Milliseconds", **{name: "Count" for name in ["ColdStart", *counts]}}
+        documents = [_emf_document(timestamp, ["Service"], units, invocation)]
+
+        for dimension, metric, groups in (("Dependency", "DependencyLatency", spans), ("Stage", "StageLatency", stages)):
+            for name, values in groups.items():
+                for i in range(0, len(values), EMF_MAX_VALUES):
+                    documents.append(_emf_document(timestamp, ["Service", dimension], {metric: "Milliseconds"}, {
+                        "Service": self.service, dimension: name, metric: values[i:i + EMF_MAX_VALUES],
+                    }))
+        return documents
+
+    def emit(self, status_code=None):
+        """ Logs the EMF documents; with the JSON log format the extra fields land at the top level of each line """
+        for document in self.to_emf(status_code):
+            logger.info("metrics", extra=document)
+
+
+def _emf_document(timestamp: int, dimensions: list, units: dict, values: dict) -> dict:
+    return {
+        "_aws": {
+            "Timestamp": timestamp,
+            "CloudWatchMetrics": [{
+                "Namespace": METRICS_NAMESPACE,
+                "Dimensions": [dimensions],
+                "Metrics": [{"Name": name, "Unit": unit} for name, unit in units.items()],
+            }],
+        },
+        **values,
+    }
+
+
+def get_invocation_metrics():
+    """ The metrics of the invocation running on this thread, or None outside instrument_handler """
+    return _current_metrics.get()
+
+
+@contextmanager
+def span(dependency: str):
+    """ Times the block as one call to dependency ("dynamodb", "youtube", "openai", ...) """
+    metrics = _current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_span(dependency, (time.perf_counter() - started_at) * 1000)
+
+
+def add_count(name: str, value: int = 1):
+    """ Adds value to the invocation's count name (emitted as a Count metric) """
+    metrics = _current_metrics.get()
+    if metrics is not None and value:
+        metrics.add_count(name, value)
+
+
+def instrument_handler(service: str):
+    """
+    Decorator for lambda_handler: collects the invocation's spans, stages and counts and emits
+    them as EMF when the handler returns (or raises), with the cold-start flag and status code.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            global _cold_start
+            if not METRICS_ENABLED:
+                return handler(event, context)
+
+            metrics = InvocationMetrics(service, cold_start=_cold_start)
+            _cold_start = False
+            token = _current_metrics.set(metrics)
+            status_code = None
+            try:
+                response = handler(event, context)
+                if isinstance(response, dict):
+                    status_code = response.get("statusCode")
+                return response
+            except Exception:
+                status_code = "error"
+                raise
+            finally:
+                _current_metrics.reset(token)
+                try:
+                    metrics.emit(status_code)
+                except Exception as e:
+                    print(f"Metrics emission failed: {str(e)}")
+        return wrapper
+    return decorator
+
+
+def _start_botocore_span(context, **kwargs):
+    context["focus_utils_started_at"] = time.perf_counter()
+
+
+def _finish_botocore_span(dependency: str, retry_count: str, parsed=None, context=None, **kwargs):
+    metrics = _current_metrics.get()
+    started_at = (context or {}).get("focus_utils_started_at")
+    if metrics is None or started_at is None:
+        return
+    metrics.add_span(dependency, (time.perf_counter() - started_at) * 1000)
+    retries = ((parsed or {}).get("ResponseMetadata") or {}).get("RetryAttempts", 0)
+    if retries:
+        metrics.add_count(retry_count, retries)
+
+
+def register_botocore_spans(client, dependency: str, retry_count: str):
+    """ Records every API call of a botocore client as a dependency span, and its retries as the count retry_count """
+    service = client.meta.service_model.service_id.hyphenize()
+    client.meta.events.register(f"before-parameter-build.{service}", _start_botocore_span)
+    client.meta.events.register(f"after-call.{service}", functools.partial(_finish_botocore_span, dependency, retry_count))
@@ -0,0 +1,168 @@
+"""
+Watch-time deltas: applying them to the user row, and coalescing them through a queue.
+
+/updateWatchTime enqueues each delta (SQS when WatchTimeQueueUrl is set) and returns; the
+watchTimeConsumer function receives them in batches collected over the SQS batching window
+(WatchTimeFlushIntervalSeconds) and writes one update_item per participant for the whole batch.
+That window is what bounds how long a delta waits before it is in the user table (plus the
+visibility timeout for each redelivery of a failed write):
+
+    coalescer = WatchTimeCoalescer()
+    for record in event["Records"]:
+        coalescer.add_record(record)
+    failed_message_ids = coalescer.flush()
+
+focus_utils.queues.LocalQueue stands in for the SQS queue locally.
+"""
+import os
+import json
+import time
+
+from decimal import Decimal
+from botocore.exceptions import ClientError # type: ignore
+
+from focus_utils.queues import get_queue
+from focus_utils.stage import IDEMPOTENCY_KEYS_KEPT, UserContext
+
+
+WATCH_TIME_QUEUE_URL = os.environ.get("WatchTimeQueueUrl")
+# the last idempotency keys of applied deltas are kept on the user row
+WATCH_TIME_KEYS_ATTRIBUTE = "Watch_Time_Idempotency_Keys"
+# a write is retried after a concurrent delta changed the keys it read
+WATCH_TIME_MAX_ATTEMPTS = 3
+
+
+def make_watch_time_message(prolific_id: str, stage: str, watch_time_delta, idempotency_key: str = None, enqueued_at: int = None) -> dict:
+    return {
+        "prolificId": prolific_id,
+        "stage": str(stage),
+        "watchTimeDelta": watch_time_delta,
+        "idempotencyKey": idempotency_key,
+        "enqueuedAt": enqueued_at if enqueued_at is not None else int(time.time() * 1000),
+    }
+
+
+def apply_watch_time(user_id: str, deltas: list, table=None, advance_stage: bool = True):
+    """
+    Adds every delta ({"stage", "watchTimeDelta", "idempotencyKey"}) to StageWatchTimes.<stage>,
+    in the same single update_item as the activity and stage changes. Deltas whose key was
+    applied before are skipped; deltas for the same stage are summed into one increment.
+
+    With advance_stage=False (the queue consumer) only the increments are written: neither
+    Last_Active_At_Time nor the stage is touched, since the flush time says nothing about
+    when the participant was active.
+
+    Returns:
+        tuple: (user_context, data, message, applied) where applied counts the deltas added
+        (data and message are None without advance_stage), or None when the user has not onboarded.
+    """
+    for attempt in range(WATCH_TIME_MAX_ATTEMPTS):
+        user_context = UserContext(user_id, table=table, consistent_read=attempt > 0)
+        if user_context.check_id():
+            return None
+
+        data, message = user_context.touch_and_advance() if advance_stage else (None, None)
+        applied = 0
+        for delta in deltas:
+            key = delta.get("idempotencyKey")
+            if key is not None and not user_context.claim_idempotency_key(WATCH_TIME_KEYS_ATTRIBUTE, key):
+                continue
+            value = delta["watchTimeDelta"]
+            # DynamoDB takes Decimal, not float
+            if isinstance(value, float):
+                value = Decimal(str(value))
+            user_context.add_to_attribute("StageWatchTimes", str(delta["stage"]), value=value)
+            applied += 1
+
+        try:
+            user_context.save()
+            return user_context, data, message, applied
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException" or attempt + 1 == WATCH_TIME_MAX_ATTEMPTS:
+                raise
+
+
+def get_watch_time_queue():
+    """ The SQS queue when WatchTimeQueueUrl is configured, else None (deltas are written directly) """
+    return get_queue(WATCH_TIME_QUEUE_URL)
+
+
+class WatchTimeCoalescer:
+    """
+    Merges queued deltas per participant until flush(), which writes each participant once
+    (or once per keys_per_write idempotency keys, so that one write never pushes the keys it
+    claims itself off the row's list). How long deltas are collected is up to the SQS batching window.
+    """
+
+    def __init__(self, table=None, keys_per_write: int = IDEMPOTENCY_KEYS_KEPT):
+        self.table = table
+        self.keys_per_write = keys_per_write
+        # prolificId -> {"deltas": [...], "message_ids": [...]}, message_ids[i] of deltas[i] (or None)
+        self.pending = {}
+
+    def add(self, message: dict, message_id: str = None):
+        """ Queues one message (see make_watch_time_message); raises ValueError for a malformed one """
+        delta = message.get("watchTimeDelta")
+        if not message.get("prolificId") or message.get("stage") is None or isinstance(delta, bool) \
+                or not isinstance(delta, (int, float, Decimal)) or delta < 0:
+            raise ValueError(f"Malformed watch time message: {message}")
+
+        entry = self.pending.setdefault(str(message["prolificId"]), {"deltas": [], "message_ids": []})
+        entry["deltas"].append(message)
+        entry["message_ids"].append(message_id)
+
+    def add_record(self, record: dict) -> bool:
+        """ Queues an SQS event record. A malformed one is logged and dropped (returns False) """
+        try:
+            self.add(json.loads(record["body"], parse_float=Decimal), record.get("messageId"))
+            return True
+        except (ValueError, TypeError, KeyError) as e:
+            print(f"Dropping watch time record {record.get('messageId')}: {str(e)}")
+            return False
+
+    def merged_deltas(self) -> dict:
+        """ {(prolificId, stage): total seconds pending} """
+        merged = {}
+        for user_id, entry in self.pending.items():
+            for delta in entry["deltas"]:
+                key = (user_id, str(delta["stage"]))
+                merged[key] = merged.get(key, 0) + delta["watchTimeDelta"]
+        return merged
+
+    def chunks(self, entry: dict) -> list:
+        """ Splits a participant's pending deltas into (deltas, message_ids) writes of at most keys_per_write keyed deltas """
+        chunks, keys = [([], [])], 0
+        for delta, message_id in zip(entry["deltas"], entry["message_ids"]):
+            if delta.get("idempotencyKey") is not None:
+                if keys == self.keys_per_write:
+                    chunks.append(([], []))
+                    keys = 0
+                keys += 1
+            chunks[-1][0].append(delta)
+            chunks[-1][1].append(message_id)
+        return chunks
+
+    def flush(self) -> list:
+        """
+        Writes the pending deltas, one update_item per participant and chunk (see chunks()).
+        Returns the message ids of the chunk whose write failed and of the participant's later
+        chunks, so they are redelivered; the chunks written before stay acknowledged, since their
+        keys may already be off the row's list.
+        """
+        failed_message_ids = []
+        for user_id, entry in self.pending.items():
+            chunks = self.chunks(entry)
+            for i, (deltas, _) in enumerate(chunks):
+                try:
+                    if apply_watch_time(user_id, deltas, table=self.table, advance_stage=False) is None:
+                        print(f"Dropping watch time for {user_id}: user is not onboarded")
+                        break
+                except Exception as e:
+                    print(f"Watch time update failed for {user_id}: {str(e)}")
+                    failed_message_ids.extend(
+                        message_id for _, message_ids in chunks[i:] for message_id in message_ids if message_id is not None
+                    )
+                    break
+
+        self.pending = {}
+        return failed_message_ids
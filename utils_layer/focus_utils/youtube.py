@@ -0,0 +1,236 @@
+import os
+import copy
+import json
+import time
+import requests # type: ignore
+
+from collections import OrderedDict
+
+from focus_utils import http_client, tables
+from focus_utils.tracing import add_count, span
+
+
+YOUTUBE_API_KEY = os.environ["YouTubeApiKey"]
+
+# YouTube video categories barely change, so the mapping is kept for the life of a warm container
+VIDEO_CATEGORY_CACHE_TTL_SECONDS = int(os.environ.get("VideoCategoryCacheTtlSeconds", 24 * 60 * 60))
+VIDEO_CATEGORY_RETRY_SECONDS = 5 * 60
+VIDEO_CATEGORY_SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "video_categories.json")
+_video_category_cache = {"value": None, "expires_at": 0.0}
+video_category_cache_stats = {"hits": 0, "misses": 0, "fallbacks": 0}
+
+# Video metadata is cached in-process (LRU) and, when the table is configured, in DynamoDB
+VIDEO_METADATA_CACHE_TTL_SECONDS = int(os.environ.get("VideoMetadataCacheTtlSeconds", 6 * 60 * 60))
+VIDEO_METADATA_TABLE_RETENTION_SECONDS = 30 * 24 * 60 * 60
+VIDEO_METADATA_CACHE_SIZE = 512
+# the bulk of a snippet that neither the prompt nor the preference log analysis reads
+# (preprocess drops both); everything else is kept, since the item is stored in the preference row
+VIDEO_METADATA_DROPPED_SNIPPET_FIELDS = ("thumbnails", "localized")
+YOUTUBE_REQUEST_TIMEOUT = http_client.HOST_SETTINGS[http_client.YOUTUBE_API_HOST]["timeout"] # (connect, read) seconds
+youtube_session = http_client.get_session(http_client.YOUTUBE_API_HOST)
+_video_metadata_cache = OrderedDict()
+video_metadata_cache_stats = {"memory_hits": 0, "table_hits": 0, "misses": 0, "not_modified": 0}
+
+
+def trim_youtube_video_item(item: dict) -> dict:
+    """ The videos.list item without the snippet fields in VIDEO_METADATA_DROPPED_SNIPPET_FIELDS """
+    trimmed = dict(item)
+    trimmed["snippet"] = {
+        field: value for field, value in item.get("snippet", {}).items() if field not in VIDEO_METADATA_DROPPED_SNIPPET_FIELDS
+    }
+    return trimmed
+
+
+def get_video_metadata_cache_hit_ratio() -> float:
+    stats = video_metadata_cache_stats
+    hits = stats["memory_hits"] + stats["table_hits"]
+    total = hits + stats["misses"]
+    return hits / total if total else 0.0
+
+
+def reset_video_metadata_cache():
+    _video_metadata_cache.clear()
+    for key in video_metadata_cache_stats:
+        video_metadata_cache_stats[key] = 0
+
+
+def _remember_video_metadata(video_id: str, entry: dict):
+    _video_metadata_cache[video_id] = entry
+    _video_metadata_cache.move_to_end(video_id)
+    while len(_video_metadata_cache) > VIDEO_METADATA_CACHE_SIZE:
+        _video_metadata_cache.popitem(last=False)
+
+
+def _load_persisted_video_metadata(video_id: str):
+    if tables.video_metadata_table is None:
+        return None
+    try:
+        response = tables.video_metadata_table.get_item(Key={"video_id": video_id})
+    except Exception as e:
+        print(f"Video metadata cache read failed: {str(e)}")
+        return None
+
+    persisted = response.get("Item")
+    if not persisted:
+        return None
+    return {"item": persisted["item"], "etag": persisted.get("etag"), "fetched_at": int(persisted["fetched_at"])}
+
+
+def _persist_video_metadata(video_id: str, entry: dict):
+    if tables.video_metadata_table is None:
+        return
+    try:
+        tables.video_metadata_table.put_item(Item={
+            "video_id": video_id,
+            "item": entry["item"],
+            "etag": entry["etag"],
+            "fetched_at": entry["fetched_at"],
+            # DynamoDB TTL, so rows for videos nobody watches anymore go away on their own
+            "expires_at": entry["fetched_at"] + VIDEO_METADATA_TABLE_RETENTION_SECONDS
+        })
+    except Exception as e:
+        print(f"Video metadata cache write failed: {str(e)}")
+
+
+# Function to retrive the youtube data for given youtube video_id
+def fetch_youtube_data(video_id):
+    """
+    Returns the videos.list item for video_id (see trim_youtube_video_item).
+
+    Looks in the in-process LRU first, then in the DynamoDB cache table, and only calls the
+    YouTube API when neither has an entry younger than VIDEO_METADATA_CACHE_TTL_SECONDS.
+    A stale entry is refetched with If-None-Match and the ETag of the videos.list response
+    it came from, so unchanged videos come back as a 304.
+    """
+    if not video_id:
+        return None
+
+    now = int(time.time())
+    entry = _video_metadata_cache.get(video_id)
+    if entry is not None and now - entry["fetched_at"] < VIDEO_METADATA_CACHE_TTL_SECONDS:
+        video_metadata_cache_stats["memory_hits"] += 1
+        add_count("VideoMetadataCacheHits")
+        _video_metadata_cache.move_to_end(video_id)
+        return copy.deepcopy(entry["item"])
+
+    if entry is None:
+        entry = _load_persisted_video_metadata(video_id)
+        if entry is not None and now - entry["fetched_at"] < VIDEO_METADATA_CACHE_TTL_SECONDS:
+            video_metadata_cache_stats["table_hits"] += 1
+            add_count("VideoMetadataCacheHits")
+            _remember_video_metadata(video_id, entry)
+            return copy.deepcopy(entry["item"])
+
+    video_metadata_cache_stats["misses"] += 1
+    add_count("VideoMetadataCacheMisses")
+
+    url = "https://www.googleapis.com/youtube/v3/videos"
+    params = {"part": "snippet,statistics", "id": video_id, "key": YOUTUBE_API_KEY}
+    headers = {}
+    if entry is not None and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+
+    try:
+        with span("youtube"):
+            response = youtube_session.get(url, params=params, headers=headers, timeout=YOUTUBE_REQUEST_TIMEOUT)
+        if response.status_code == 304:
+            video_metadata_cache_stats["not_modified"] += 1
+            entry = {"item": entry["item"], "etag": entry.get("etag"), "fetched_at": now}
+        else:
+            response.raise_for_status()
+            data = response.json()
+            if not data.get("items"):
+                return None
+            item = trim_youtube_video_item(data["items"][0])
+            # the list response's ETag, which is what videos.list compares If-None-Match with
+            entry = {"item": item, "etag": data.get("etag") or response.headers.get("ETag"), "fetched_at": now}
+
+    except requests.exceptions.RequestException as e:
+        print(f"YouTube API request failed: {str(e)}")
+        if entry is None:
+            return None
+        # serve the stale copy rather than failing the request
+        return copy.deepcopy(entry["item"])
+
+    _remember_video_metadata(video_id, entry)
+    _persist_video_metadata(video_id, entry)
+    return copy.deepcopy(entry["item"])
+
+
+def normalize_category_names(cat):
+    return cat.replace('&', 'and').strip()
+
+def get_unique_video_categories():
+  """
+  Retrieves a unique list of video categories from the YouTube Data API.
+
+  Returns:
+    A set of unique video category titles.
+  """
+  # imported here so only the cache misses pay for googleapiclient
+  from googleapiclient.discovery import build # type: ignore
+
+  youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
+  region_code = "US"
+  category_request = youtube.videoCategories().list(part="snippet", regionCode=region_code)
+  category_response = category_request.execute()
+
+  return parse_video_categories(category_response['items'])
+
+
+def parse_video_categories(category_items):
+  unique_categories = set()
+  category_id_to_name = {}
+  for category in category_items:
+    formattedCategory = normalize_category_names(category['snippet']['title'])
+    unique_categories.add(formattedCategory)
+    category_id_to_name[category['id']] = formattedCategory
+
+  return list(unique_categories), category_id_to_name
+
+
+def load_video_category_snapshot():
+  """
+  Loads the category list bundled with the layer (video_categories.json), in the same shape
+  as the videoCategories.list response. Used when the YouTube API can't be reached.
+  """
+  with open(VIDEO_CATEGORY_SNAPSHOT_PATH) as snapshot:
+    return parse_video_categories(json.load(snapshot)['items'])
+
+
+def get_cached_video_categories():
+  """
+  Same result as get_unique_video_categories, but kept in the container between warm
+  invocations for VIDEO_CATEGORY_CACHE_TTL_SECONDS. Falls back to the bundled snapshot
+  when the API call fails, and retries the API after VIDEO_CATEGORY_RETRY_SECONDS.
+  Hits, misses and fallbacks are counted in video_category_cache_stats.
+  """
+  now = time.monotonic()
+  if _video_category_cache["value"] is not None and now < _video_category_cache["expires_at"]:
+    video_category_cache_stats["hits"] += 1
+    add_count("VideoCategoryCacheHits")
+    return _video_category_cache["value"]
+
+  video_category_cache_stats["misses"] += 1
+  add_count("VideoCategoryCacheMisses")
+  try:
+    with span("youtube"):
+      value = get_unique_video_categories()
+    ttl = VIDEO_CATEGORY_CACHE_TTL_SECONDS
+  except Exception as e:
+    print(f"YouTube category request failed, using bundled snapshot: {str(e)}")
+    video_category_cache_stats["fallbacks"] += 1
+    add_count("VideoCategoryCacheFallbacks")
+    value = load_video_category_snapshot()
+    ttl = VIDEO_CATEGORY_RETRY_SECONDS
+
+  _video_category_cache["value"] = value
+  _video_category_cache["expires_at"] = now + ttl
+  return value
+
+
+def reset_video_category_cache():
+  _video_category_cache["value"] = None
+  _video_category_cache["expires_at"] = 0.0
+  for key in video_category_cache_stats:
+    video_category_cache_stats[key] = 0
@@ -1,9 +1,23 @@
 import json
 import time
 import random
-from focus_utils import video_record_log_table, CORS_HEADERS, check_id, update_last_active_time, update_user_stage, decimal_to_int
+from focus_utils import tables, CORS_HEADERS, UserContext, decimal_to_int, batch_put_items, RetryScheduler, BATCH_WRITE_RETRY, instrument_handler
 
+# most records a single batch POST may carry
+VIDEO_RECORD_BATCH_MAX_RECORDS = 100
+
+
+@instrument_handler("videoRecordLog")
 def lambda_handler(event, context):
+    """
+    Logs video records for a participant. The body is either one record, or a batch:
+
+        {"prolificId": "...", "records": [{...}, {...}]}
+
+    A batch runs the user/stage update once and writes the records with BatchWriteItem. Its
+    response has a status for each record ("saved", "failed" or "invalid"), in request order,
+    and is a 207 when any record wasn't saved.
+    """
     try:
         requested_body: dict = json.loads(event["body"])
     except (ValueError, TypeError) as e:
@@ -27,21 +41,28 @@ def lambda_handler(event, context):
 
     # get query parameters and body
     id: str = str(requested_body.get("prolificId"))
+    records = requested_body.get("records")
+
+    if records is not None and (not isinstance(records, list) or not records or len(records) > VIDEO_RECORD_BATCH_MAX_RECORDS):
+        return {
+            "statusCode": 400,
+            "headers": CORS_HEADERS,
+            "body": json.dumps({
+                "message": f"records must be a list of 1 to {VIDEO_RECORD_BATCH_MAX_RECORDS} video records"
+            }),
+        }
 
-    is_missing = check_id(id)
+    user_context = UserContext(id)
+    is_missing = user_context.check_id()
     if is_missing: 
         return is_missing
 
-    # update the last active timestamp for user
-    update_last_active_time(id)
-
-    # update the stgae info if it in time stamp.
-    Stage_Status_Response = update_user_stage(id)
-    parsed_body = json.loads(Stage_Status_Response["body"]) 
+    # update the last active timestamp and the stgae info if it in time stamp.
+    data, message = user_context.touch_and_advance()
+    user_context.save()
 
-    # Now you can safely access "data"
-    data = parsed_body["data"]
-    message = parsed_body["message"]
+    if records is not None:
+        return log_video_records(id, records, data, message, context)
 
     entry_id = f"{int(time.time() * 1000)}-{random.randint(1000, 9999)}"
     item_to_insert = {
@@ -49,7 +70,7 @@ def lambda_handler(event, context):
         **requested_body
     }
 
-    result = video_record_log_table.put_item(Item=item_to_insert)
+    result = tables.video_record_log_table.put_item(Item=item_to_insert)
 
     return {
         "statusCode": 200,
@@ -59,4 +80,43 @@ def lambda_handler(event, context):
             "stage_status_message": message,
             "message": "Video record logged successfully"
         }, default=decimal_to_int),
-    }
\ No newline at end of file
+    }
+
+
+def log_video_records(id: str, records: list, data: dict, message: str, context):
+    """ Writes a batch of records for the participant id and returns the per-record statuses """
+    # one timestamp for the batch, so the random suffixes must not repeat
+    timestamp = int(time.time() * 1000)
+    suffixes = random.sample(range(1000, 10000), len(records))
+
+    statuses = []
+    items = []
+    for index, record in enumerate(records):
+        if not isinstance(record, dict) or str(record.get("prolificId", id)) != id:
+            statuses.append({"index": index, "status": "invalid", "error": "A record must be an object for the batch's prolificId"})
+            continue
+        # the generated Id goes last: a client "Id" would repeat within the batch and fail its chunk
+        item = {'prolificId': id, **record, 'Id': f"{timestamp}-{suffixes[index]}"}
+        statuses.append({"index": index, "Id": item["Id"]})
+        items.append(item)
+
+    retry = RetryScheduler.from_lambda_context(context, **BATCH_WRITE_RETRY)
+    errors = iter(batch_put_items(tables.video_record_log_table, items, retry))
+    for status in statuses:
+        if "Id" in status:
+            error = next(errors)
+            status["status"] = "failed" if error else "saved"
+            if error:
+                status["error"] = error
+
+    saved = sum(status["status"] == "saved" for status in statuses)
+    return {
+        "statusCode": 200 if saved == len(records) else 207,
+        "headers": CORS_HEADERS,
+        "body": json.dumps({
+            "stage_status": data,
+            "stage_status_message": message,
+            "message": f"Logged {saved} of {len(records)} video records",
+            "records": statuses
+        }, default=decimal_to_int),
+    }
@@ -0,0 +1,34 @@
+from focus_utils import WatchTimeCoalescer, instrument_handler
+
+
+@instrument_handler("watchTimeConsumer")
+def lambda_handler(event, context):
+    """Writes the watch-time deltas queued by /updateWatchTime, coalesced per participant
+
+    Parameters
+    ----------
+    event: dict, required
+        SQS event: the messages collected over the batching window (WatchTimeFlushIntervalSeconds)
+
+        Event doc: https://docs.aws.amazon.com/lambda/latest/dg/with-sqs.html
+
+    context: object, required
+        Lambda Context runtime methods and attributes
+
+        Context doc: https://docs.aws.amazon.com/lambda/latest/dg/python-context-object.html
+
+    Returns
+    ------
+    Partial batch response: dict
+
+        The messages of participants whose write failed are reported so that SQS redelivers
+        only those: https://docs.aws.amazon.com/lambda/latest/dg/services-sqs-errorhandling.html
+    """
+    coalescer = WatchTimeCoalescer()
+    for record in event["Records"]:
+        coalescer.add_record(record)
+
+    failed_message_ids = coalescer.flush()
+    return {
+        "batchItemFailures": [{"itemIdentifier": message_id} for message_id in failed_message_ids]
+    }